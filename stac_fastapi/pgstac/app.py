@@ -27,8 +27,11 @@ from starlette.middleware.cors import CORSMiddleware
 from stac_fastapi.pgstac.config import Settings
 from stac_fastapi.pgstac.core import CoreCrudClient, health_check
 from stac_fastapi.pgstac.db import close_db_connection, connect_to_db
+from stac_fastapi.pgstac.jobs import close_job_queue
+from stac_fastapi.pgstac.middleware import CacheStatusMiddleware, IdempotencyMiddleware
 from stac_fastapi.pgstac.models.extensions import Extensions
 from stac_fastapi.pgstac.types.search import PgstacSearch
+from stac_fastapi.pgstac.validation import close_validation_pool
 
 
 def instantiate_api(
@@ -97,7 +100,29 @@ def instantiate_api(
             add_write_connection_pool=bool(transaction_extensions),
         )
         yield
+        await close_job_queue(app)
         await close_db_connection(app)
+        close_validation_pool(app)
+
+    middlewares = [
+        Middleware(BrotliMiddleware),
+        Middleware(ProxyHeaderMiddleware),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=settings.cors_origins,
+            allow_origin_regex=settings.cors_origin_regex,
+            allow_methods=settings.cors_methods,
+            allow_credentials=settings.cors_credentials,
+            allow_headers=settings.cors_headers,
+            max_age=600,
+        ),
+    ]
+    if settings.search_cache_size > 0:
+        middlewares.append(Middleware(CacheStatusMiddleware))
+    if transaction_extensions and settings.idempotency_key_ttl > 0:
+        middlewares.append(
+            Middleware(IdempotencyMiddleware, ttl=settings.idempotency_key_ttl)
+        )
 
     api = StacApi(
         app=FastAPI(
@@ -119,19 +144,7 @@ def instantiate_api(
         search_get_request_model=get_request_model,
         search_post_request_model=post_request_model,
         collections_get_request_model=collections_get_request_model,
-        middlewares=[
-            Middleware(BrotliMiddleware),
-            Middleware(ProxyHeaderMiddleware),
-            Middleware(
-                CORSMiddleware,
-                allow_origins=settings.cors_origins,
-                allow_origin_regex=settings.cors_origin_regex,
-                allow_methods=settings.cors_methods,
-                allow_credentials=settings.cors_credentials,
-                allow_headers=settings.cors_headers,
-                max_age=600,
-            ),
-        ],
+        middlewares=middlewares,
         health_check=health_check,  # type: ignore [arg-type]
     )
 
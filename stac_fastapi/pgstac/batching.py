@@ -0,0 +1,174 @@
+"""Batching of concurrent writes."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import attr
+from asyncpg import Connection
+from fastapi import FastAPI, Request
+
+from stac_fastapi.pgstac.db import dbfunc
+
+
+async def create_items(conn: Connection, items: list[Any]) -> None:
+    """Create items with a single pgstac `create_items` call."""
+    await dbfunc(conn, "create_items", items)
+
+
+async def create_item(conn: Connection, item: Any) -> None:
+    """Create an item with pgstac `create_item`."""
+    await dbfunc(conn, "create_item", item)
+
+
+@attr.s
+class _Write:
+    """A write waiting in a batch."""
+
+    request: Request = attr.ib()
+    value: Any = attr.ib()
+    future: asyncio.Future = attr.ib()
+
+
+@attr.s
+class WriteBatcher:
+    """Group concurrent writes into batches, written at once (group commit).
+
+    Writes wait for up to `delay` seconds, or until `max_size` writes are waiting, to
+    be written with a single `write_batch` call, on a connection of the write pool.
+    Each caller gets the result of its own write: when the batch fails (e.g. one of
+    its items already exists), its writes are retried one by one with `write_one`.
+
+    A write whose caller is cancelled before the batch is written is dropped.
+
+    Attributes:
+        max_size: maximum number of writes of a batch.
+        delay: maximum number of seconds a write waits for other writes.
+        write_batch: write a batch of values.
+        write_one: write a single value.
+        batches: number of batches written.
+        writes: number of writes made in batches.
+        retries: number of writes retried one by one after a failed batch.
+    """
+
+    max_size: int = attr.ib(default=100)
+    delay: float = attr.ib(default=0.005)
+    write_batch: Callable[[Connection, list[Any]], Awaitable[Any]] = attr.ib(
+        default=create_items
+    )
+    write_one: Callable[[Connection, Any], Awaitable[Any]] = attr.ib(default=create_item)
+    batches: int = attr.ib(init=False, default=0)
+    writes: int = attr.ib(init=False, default=0)
+    retries: int = attr.ib(init=False, default=0)
+    _pending: list[_Write] = attr.ib(init=False, factory=list)
+    _timer: asyncio.TimerHandle | None = attr.ib(init=False, default=None)
+    _tasks: set[asyncio.Task] = attr.ib(init=False, factory=set)
+
+    async def write(self, request: Request, value: Any) -> None:
+        """Write a value with the next batch."""
+        loop = asyncio.get_running_loop()
+        write = _Write(request=request, value=value, future=loop.create_future())
+        self._pending.append(write)
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._flush)
+
+        await write.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Drop the writes of the cancelled callers
+        batch = [write for write in self._pending if not write.future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: list[_Write]) -> None:
+        request = batch[0].request
+        try:
+            async with request.app.state.get_connection(request, "w") as conn:
+                await self._write_batch(conn, batch)
+
+        except Exception as err:
+            for write in batch:
+                _set_exception(write.future, err)
+
+        finally:
+            # e.g. the task was cancelled
+            for write in batch:
+                write.future.cancel()
+
+    async def _write_batch(self, conn: Connection, batch: list[_Write]) -> None:
+        try:
+            if len(batch) == 1:
+                await self.write_one(conn, batch[0].value)
+            else:
+                await self.write_batch(conn, [write.value for write in batch])
+        except Exception:
+            if len(batch) == 1:
+                raise
+
+            # Find which writes failed the batch
+            self.retries += len(batch)
+            for write in batch:
+                try:
+                    await self.write_one(conn, write.value)
+                except Exception as err:
+                    _set_exception(write.future, err)
+                else:
+                    _set_result(write.future)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for write in batch:
+            _set_result(write.future)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the batching statistics."""
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "writes": self.writes,
+            "retries": self.retries,
+        }
+
+
+def _set_result(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _set_exception(future: asyncio.Future, err: Exception) -> None:
+    if not future.done():
+        future.set_exception(err)
+
+
+def get_write_batcher(app: FastAPI) -> WriteBatcher | None:
+    """Return the item creations batcher of the application, if enabled.
+
+    The batcher is created on first use, following the `write_batch_size` and
+    `write_batch_delay` application settings.
+    """
+    batcher = getattr(app.state, "write_batcher", None)
+    if batcher is None:
+        settings = app.state.settings
+        if settings.write_batch_size <= 1:
+            return None
+
+        batcher = WriteBatcher(
+            max_size=settings.write_batch_size,
+            delay=settings.write_batch_delay,
+        )
+        app.state.write_batcher = batcher
+
+    return batcher
@@ -0,0 +1,392 @@
+"""In-process caches."""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import Any
+
+import attr
+import orjson
+from starlette.requests import Request
+
+
+@attr.s
+class LRUCache:
+    """A bounded Least Recently Used cache, with an optional time-to-live.
+
+    The cache lives in the process memory (e.g. on the application state) and is
+    shared by all the requests handled by the process.
+
+    Attributes:
+        maxsize: maximum number of entries kept in the cache. `0` disables the cache.
+        ttl: number of seconds after which an entry expires. `None` for no expiry.
+        hits: number of lookups which returned a cached value.
+        misses: number of lookups which did not find a (valid) cached value.
+    """
+
+    maxsize: int = attr.ib(default=128)
+    ttl: float | None = attr.ib(default=None)
+    hits: int = attr.ib(init=False, default=0)
+    misses: int = attr.ib(init=False, default=0)
+    _entries: OrderedDict[Hashable, tuple[float | None, Any]] = attr.ib(
+        init=False, factory=OrderedDict
+    )
+
+    def __len__(self) -> int:
+        """Return the number of entries in the cache."""
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Check if a valid entry exists for the key, without updating the stats."""
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry[0])
+
+    @staticmethod
+    def _expired(expires: float | None) -> bool:
+        return expires is not None and expires <= time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for the key, or `default`."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if not self._expired(expires):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            del self._entries[key]
+
+        self.misses += 1
+        return default
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for the key, without updating the stats."""
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry[0]):
+            return default
+
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Add (or replace) an entry, evicting the least recently used ones."""
+        if self.maxsize <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove the entry for the key, if any."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the cache statistics."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@attr.s
+class Generations:
+    """Generation counters of the collections, incremented when they are written.
+
+    A value read from the database is cached (or shared with other requests) only
+    while the generation of its collections is the one taken before the read, so a
+    value read before a write is never used after it. `None` stands for all the
+    collections (e.g. the searches without `collections`), and is incremented by
+    the write of any collection.
+    """
+
+    _counters: dict[str | None, int] = attr.ib(init=False, factory=dict)
+
+    def get(self, tags: tuple[str | None, ...]) -> tuple[int, ...]:
+        """Return the current generation of tags."""
+        return tuple(self._counters.get(tag, 0) for tag in tags)
+
+    def invalidate(self, collection_id: str) -> None:
+        """Increment the generation of a collection, and of all the collections."""
+        for tag in (collection_id, None):
+            self._counters[tag] = self._counters.get(tag, 0) + 1
+
+
+@attr.s
+class SearchCache:
+    """A cache of pgstac search results, keyed on the normalized search request.
+
+    Results are stored JSON encoded, so every hit returns a new copy which can be
+    modified by the caller. Each entry is tagged with the collections of the search
+    (or all the collections, for searches without `collections`). Entries are
+    invalidated when a collection they are tagged with is written, using generation
+    counters, so an invalidation doesn't need to find the entries of a collection.
+
+    Attributes:
+        maxsize: maximum number of entries kept in the cache. `0` disables the cache.
+        ttl: number of seconds after which an entry expires. `None` for no expiry.
+        generations: generation counters of the collections (shared with the other
+            caches of the application).
+        hits: number of lookups which returned a cached value.
+        misses: number of lookups which did not find a (valid) cached value.
+    """
+
+    maxsize: int = attr.ib(default=128)
+    ttl: float | None = attr.ib(default=None)
+    generations: Generations = attr.ib(factory=Generations)
+    hits: int = attr.ib(init=False, default=0)
+    misses: int = attr.ib(init=False, default=0)
+    _entries: LRUCache = attr.ib(init=False)
+
+    @_entries.default
+    def _create_entries(self) -> LRUCache:
+        return LRUCache(maxsize=self.maxsize, ttl=self.ttl)
+
+    @staticmethod
+    def key(base_url: str, search: str) -> str:
+        """Create the cache key of a (JSON encoded) search request."""
+        # Sort the keys of nested objects (e.g `query` or `filter`) so equivalent
+        # searches share the same key.
+        search_json = orjson.dumps(orjson.loads(search), option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(base_url.encode() + b"\n" + search_json).hexdigest()
+
+    @staticmethod
+    def tags(collections: Iterable[str] | None) -> tuple[str | None, ...]:
+        """Return the tags of a search, `None` standing for all the collections."""
+        return tuple(sorted(set(collections))) if collections else (None,)
+
+    def generation(self, tags: tuple[str | None, ...]) -> tuple[int, ...]:
+        """Return the current generation of tags.
+
+        The generation must be taken *before* querying the database, so a result
+        read before an invalidation can't be cached as valid after it.
+        """
+        return self.generations.get(tags)
+
+    def __contains__(self, key: str) -> bool:
+        """Check if a valid entry exists for the key, without updating the stats."""
+        entry = self._entries.peek(key)
+        if entry is None:
+            return False
+
+        tags, generation, _ = entry
+        return self.generation(tags) == generation
+
+    def get(self, key: str) -> Any:
+        """Return a copy of the cached search result, or `None`."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            tags, generation, content = entry
+            if self.generation(tags) == generation:
+                self.hits += 1
+                return orjson.loads(content)
+
+            # Invalidated since it was cached
+            self._entries.pop(key)
+
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        tags: tuple[str | None, ...],
+        generation: tuple[int, ...],
+    ) -> None:
+        """Cache a search result, unless invalidated since `generation` was taken."""
+        if self.maxsize <= 0 or self.generation(tags) != generation:
+            return
+
+        self._entries.set(key, (tags, generation, orjson.dumps(value)))
+
+    def invalidate(self, collection_id: str) -> None:
+        """Invalidate the entries of a collection, and of the cross-collection searches."""
+        self.generations.invalidate(collection_id)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the cache statistics."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+@attr.s
+class _Flight:
+    """A call running for a SingleFlight key."""
+
+    task: asyncio.Future = attr.ib(init=False)
+    callers: int = attr.ib(default=1)
+    waiting: int = attr.ib(default=1)
+
+
+@attr.s
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto a single call.
+
+    While a call is running, the calls made with the same key wait for its result
+    instead of making their own. When the result is shared by several callers, it is
+    JSON encoded once and each caller gets its own (decoded) copy, so it can be
+    modified.
+
+    The call runs in its own task: a cancelled caller doesn't cancel it for the
+    others. The call is cancelled once all its callers are.
+
+    Attributes:
+        coalesced: number of calls which waited for the result of another call.
+    """
+
+    coalesced: int = attr.ib(init=False, default=0)
+    _flights: dict[Hashable, _Flight] = attr.ib(init=False, factory=dict)
+
+    def __len__(self) -> int:
+        """Return the number of running calls."""
+        return len(self._flights)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result of `call`, or of the running call with the same key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._run(key, flight, call))
+            # Retrieve the exception of a call whose callers were all cancelled
+            flight.task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+            self._flights[key] = flight
+        else:
+            flight.callers += 1
+            flight.waiting += 1
+            self.coalesced += 1
+
+        try:
+            shared, value = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            flight.waiting -= 1
+            if flight.waiting == 0 and not flight.task.done():
+                # Nobody waits for the result anymore
+                flight.task.cancel()
+                self._remove(key, flight)
+            raise
+
+        return orjson.loads(value) if shared else value
+
+    def _remove(self, key: Hashable, flight: _Flight) -> None:
+        # Callers can't join the flight anymore
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _run(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        call: Callable[[], Awaitable[Any]],
+    ) -> tuple[bool, Any]:
+        try:
+            value = await call()
+        finally:
+            self._remove(key, flight)
+
+        if flight.callers > 1:
+            return True, orjson.dumps(value)
+
+        return False, value
+
+
+def get_cache_generations(app: Any) -> Generations:
+    """Return the generation counters of the collections of the application."""
+    generations = getattr(app.state, "cache_generations", None)
+    if generations is None:
+        generations = Generations()
+        app.state.cache_generations = generations
+
+    return generations
+
+
+def get_search_cache(app: Any) -> SearchCache | None:
+    """Return the search cache of the application, if enabled.
+
+    The cache is created on first use, bounded and expired following the
+    `search_cache_size` and `search_cache_ttl` application settings.
+    """
+    cache = getattr(app.state, "search_cache", None)
+    if cache is None:
+        settings = app.state.settings
+        if settings.search_cache_size <= 0:
+            return None
+
+        cache = SearchCache(
+            maxsize=settings.search_cache_size,
+            ttl=settings.search_cache_ttl,
+            generations=get_cache_generations(app),
+        )
+        app.state.search_cache = cache
+
+    return cache
+
+
+def get_collection_cache(app: Any) -> LRUCache | None:
+    """Return the collections cache of the application, if enabled.
+
+    The cache is created on first use, bounded and expired following the
+    `collection_cache_size` and `collection_cache_ttl` application settings.
+    """
+    cache = getattr(app.state, "collection_store", None)
+    if cache is None:
+        settings = app.state.settings
+        if settings.collection_cache_size <= 0:
+            return None
+
+        cache = LRUCache(
+            maxsize=settings.collection_cache_size,
+            ttl=settings.collection_cache_ttl,
+        )
+        app.state.collection_store = cache
+
+    return cache
+
+
+def invalidate_items(request: Request, collection_id: str) -> None:
+    """Invalidate the cached data depending on the items of a collection."""
+    get_cache_generations(request.app).invalidate(collection_id)
+
+
+def invalidate_collection(request: Request, collection_id: str) -> None:
+    """Invalidate the cached data depending on a collection (and its items)."""
+    state = request.app.state
+    for name in ("collection_store", "base_item_store"):
+        if (cache := getattr(state, name, None)) is not None:
+            cache.pop(collection_id)
+
+    invalidate_items(request, collection_id)
+
+
+def get_search_flights(app: Any) -> SingleFlight | None:
+    """Return the coalescing of the application searches, if enabled."""
+    flights = getattr(app.state, "search_flights", None)
+    if flights is None:
+        if not app.state.settings.coalesce_searches:
+            return None
+
+        flights = SingleFlight()
+        app.state.search_flights = flights
+
+    return flights
@@ -3,7 +3,7 @@
 import json
 import warnings
 from collections.abc import Sequence
-from typing import Annotated, Any, Self
+from typing import Annotated, Any, Literal, Self
 from urllib.parse import quote_plus as quote
 
 from pydantic import BaseModel, BeforeValidator, Field, model_validator
@@ -37,6 +37,16 @@ DEFAULT_INVALID_ID_CHARS = [
 ]
 
 
+def str_to_list(value: Any) -> Any:
+    if isinstance(value, str):
+        if value.startswith("["):
+            return json.loads(value)
+        else:
+            return [v.strip() for v in value.split(",")]
+    else:
+        return value
+
+
 class ServerSettings(BaseModel):
     """Server runtime parameters.
 
@@ -60,6 +70,22 @@ class PostgresSettings(BaseSettings):
         pghost: hostname for the connection.
         pgport: database port.
         pgdatabase: database name.
+        db_statement_cache_size: number of prepared statements cached by each
+            connection. `0` disables the cache.
+        db_pgbouncer_mode: don't cache prepared statements, for connections made
+            through a PgBouncer pool in `transaction` (or `statement`) mode.
+        db_reader_hosts: hosts (`host` or `host:port`) of the read replicas. Read
+            connections are balanced over the replicas, falling back to `pghost`.
+        db_reader_eject_time: number of seconds a failing read replica is ejected
+            from the balancing.
+        db_acquire_timeout: maximum number of seconds to wait for a connection of
+            the pool. `None` to wait without limit.
+        db_max_waiters: maximum number of requests waiting for a connection of the
+            pool. `None` for no limit.
+        db_retry_after: number of seconds sent in the `Retry-After` header of the
+            responses to the requests which could not get a connection.
+        db_json_codec: transport format of the json/jsonb values, `text` or
+            `binary` (decoded without intermediate `str` objects).
 
     """
 
@@ -114,6 +140,14 @@ class PostgresSettings(BaseSettings):
     db_max_conn_size: int = 10
     db_max_queries: int = 50000
     db_max_inactive_conn_lifetime: float = 300
+    db_statement_cache_size: int = 100
+    db_pgbouncer_mode: bool = False
+    db_reader_hosts: Annotated[Sequence[str], BeforeValidator(str_to_list), NoDecode] = []
+    db_reader_eject_time: float = 30
+    db_acquire_timeout: float | None = None
+    db_max_waiters: int | None = None
+    db_retry_after: int = 1
+    db_json_codec: Literal["text", "binary"] = "text"
 
     server_settings: ServerSettings = ServerSettings()
 
@@ -156,15 +190,21 @@ class PostgresSettings(BaseSettings):
         """Create reader psql connection string."""
         return f"postgresql://{self.pguser}:{quote(self.pgpassword)}@{self.pghost}:{self.pgport}/{self.pgdatabase}"
 
+    @property
+    def reader_connection_strings(self) -> list[str]:
+        """Create the psql connection strings of the read replicas."""
+        connection_strings = []
+        for reader in self.db_reader_hosts:
+            host, port = reader, str(self.pgport)
+            # NOTE: IPv6 addresses must be enclosed in brackets (e.g `[::1]:5432`)
+            if ":" in reader and not reader.endswith("]"):
+                host, _, port = reader.rpartition(":")
+
+            connection_strings.append(
+                f"postgresql://{self.pguser}:{quote(self.pgpassword)}@{host}:{port}/{self.pgdatabase}"
+            )
 
-def str_to_list(value: Any) -> Any:
-    if isinstance(value, str):
-        if value.startswith("["):
-            return json.loads(value)
-        else:
-            return [v.strip() for v in value.split(",")]
-    else:
-        return value
+        return connection_strings
 
 
 class ExtensionsSettings(BaseModel):
@@ -175,6 +215,13 @@ class ExtensionsSettings(BaseModel):
     ) = None
     enable_transactions_extensions: bool = False
     enable_catalogs_extension: bool = False
+    enable_jobs_extension: bool = False
+    """
+    Write the bulk transactions sent with a `Prefer: respond-async` header in
+    asynchronous ingestion jobs, whose state is returned by `GET /jobs/{job_id}`.
+    Implies that the `Transactions` extension is enabled. The jobs are recorded in
+    a `stac_fastapi_jobs` table (see `jobs.JOBS_TABLE`).
+    """
     hide_alternate_parents: bool = False
     validate_extensions: bool = False
     """
@@ -182,6 +229,30 @@ class ExtensionsSettings(BaseModel):
 
     Implies that the `Transactions` extension is enabled.
     """
+    validation_workers: int = 0
+    """
+    Number of worker processes validating the `stac_extensions` of the items of bulk
+    writes, so the validation doesn't block the event loop. `0` validates the items
+    in the API process.
+    """
+    validation_chunk_size: int = 100
+    """
+    Number of items validated at once by a validation worker process. Smaller
+    batches are validated in the API process.
+    """
+    validation_schema_dir: str | None = None
+    """
+    Local directory of the `stac_extensions` schemas, mirroring their URLs (e.g
+    `{dir}/stac-extensions.github.io/eo/v1.1.0/schema.json`). Fetched schemas are
+    written to the directory.
+    """
+    validation_schema_fetch: bool = True
+    """
+    Fetch the `stac_extensions` schemas missing from `validation_schema_dir`. Set to
+    `False` to validate offline.
+    """
+    validation_cache_size: int = 64
+    """Number of compiled `stac_extensions` schema validators kept in memory."""
 
 
 class Settings(ApiSettings, ExtensionsSettings):
@@ -215,6 +286,124 @@ class Settings(ApiSettings, ExtensionsSettings):
 
     invalid_id_chars: list[str] = DEFAULT_INVALID_ID_CHARS
     base_item_cache: type[BaseItemCache] = DefaultBaseItemCache
+    base_item_cache_size: int = 1000
+    base_item_cache_ttl: float | None = 300
+    """
+    Maximum number of entries and time-to-live (in seconds) of the process-wide
+    cache used by `types.base_item_cache.LRUBaseItemCache`.
+    """
+
+    search_cache_size: int = 0
+    search_cache_ttl: float | None = 60
+    """
+    Maximum number of entries (`0` disables the cache) and time-to-live (in seconds)
+    of the in-memory cache of search results (`/search`, `/collections/{id}/items`).
+    Entries are invalidated when items or collections are written through the
+    Transactions extensions. The invalidation is per process: with several workers
+    (or instances), a write only invalidates the cache of the process handling it,
+    and the others may return stale results until their entries expire.
+    """
+
+    collection_cache_size: int = 0
+    collection_cache_ttl: float | None = 60
+    """
+    Maximum number of entries (`0` disables the cache) and time-to-live (in seconds)
+    of the in-memory cache of collections, used by `/collections/{collection_id}` and
+    the collection existence checks. Not found collections are not cached.
+    """
+
+    concurrent_collection_check: bool = False
+    """
+    Check that the collection exists concurrently with the items search in
+    `/collections/{collection_id}/items` (using two connections of the pool), instead
+    of running both queries one after the other.
+    """
+
+    coalesce_searches: bool = False
+    """
+    Concurrent identical searches (`/search`, `/collections/{id}/items`) wait for the
+    result of the query already running, instead of each running its own query. A
+    search made after a write (in the same process) to one of its collections
+    doesn't wait for a query started before the write. Must stay disabled when the
+    results depend on the request (e.g. a custom `get_conn` setting a role or
+    row-level security state on the connection): the searches of different users
+    would share their results.
+    """
+
+    use_search_passthrough: bool = False
+    """
+    When USE_SEARCH_PASSTHROUGH=TRUE, the features of `/search` responses are not
+    decoded/re-encoded within the API: pgstac encoded features are passed through
+    and only the API generated links are added. Not used when `use_api_hydrate` or
+    `enable_response_models` are enabled, or when the fields extension is used.
+    """
+
+    stream_chunk_size: int = 100
+    """
+    Number of items fetched from the database cursor at once when streaming search
+    results (`Accept: application/geo+json-seq` or `Accept: application/x-ndjson`).
+    """
+
+    statement_timeouts: dict[str, float] = {}
+    """
+    Maximum execution time, in seconds, of the statements run on the read connections
+    of a request, keyed on the endpoint (route) name, e.g. `{"Search": 30}`. The `*`
+    key sets the timeout of the other endpoints. Requests whose statements time out
+    get a `504` response. The statements of these endpoints are run in a transaction,
+    the timeout being set for the transaction only.
+    """
+
+    cancel_on_disconnect: bool = False
+    """
+    Cancel the search queries (`/search`, `/collections/{id}/items`) of the clients
+    which disconnect before getting the response, with a `499` response.
+    """
+
+    use_copy_ingest: bool = False
+    """
+    Load the items of the bulk transactions (`POST /collections/{id}/bulk_items`)
+    and of the item collections (`POST /collections/{id}/items`) into the pgstac
+    staging tables with `COPY`, instead of sending them as a single JSON document to
+    `create_items`/`upsert_items`.
+    """
+
+    bulk_stream_batch_size: int = 1000
+    """
+    Number of items written at once by the streaming bulk ingestion endpoint
+    (`POST /collections/{id}/items/bulk-stream`).
+    """
+
+    write_batch_size: int = 0
+    """
+    Group the concurrent creations of single items (`POST /collections/{id}/items`)
+    into a single `create_items` call of up to `write_batch_size` items. `0`
+    disables the batching.
+    """
+
+    write_batch_delay: float = 0.005
+    """
+    Maximum number of seconds an item creation waits for others to be batched with.
+    """
+
+    job_queue_size: int = 100
+    """
+    Maximum number of asynchronous ingestion jobs (bulk transactions sent with a
+    `Prefer: respond-async` header) waiting to be run, per process.
+    """
+
+    job_workers: int = 2
+    """Number of asynchronous ingestion jobs run concurrently, per process."""
+
+    job_batch_size: int = 1000
+    """Number of items written at once by an asynchronous ingestion job."""
+
+    idempotency_key_ttl: int = 0
+    """
+    Number of seconds the response of a write request sent with an `Idempotency-Key`
+    header is replayed to the retries of the request. `0` disables the
+    `Idempotency-Key` support. The responses are recorded in a
+    `stac_fastapi_idempotency_keys` table (see `middleware.IDEMPOTENCY_KEYS_TABLE`).
+    """
 
     cors_origins: Annotated[Sequence[str], BeforeValidator(str_to_list), NoDecode] = (
         "*",
@@ -1,14 +1,15 @@
 """Item crud client."""
 
+import asyncio
 import json
 import re
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable
 from typing import Any, cast
 from urllib.parse import unquote_plus, urljoin
 
 import attr
 import orjson
 from asyncpg.exceptions import InvalidDatetimeFormatError
-from buildpg import render
 from cql2 import Expr
 from fastapi import HTTPException, Request
 from hydraters import hydrate
@@ -25,21 +26,68 @@ from stac_fastapi.types.stac import (
     LandingPage,
 )
 from stac_pydantic.shared import BBox, MimeTypes
-
+from starlette.responses import Response, StreamingResponse
+
+from stac_fastapi.pgstac.cache import (
+    SearchCache,
+    get_cache_generations,
+    get_collection_cache,
+    get_search_cache,
+    get_search_flights,
+)
 from stac_fastapi.pgstac.config import Settings
+from stac_fastapi.pgstac.db import cancel_on_disconnect
 from stac_fastapi.pgstac.models.links import (
     CollectionLinks,
     CollectionSearchPagingLinks,
     ItemCollectionLinks,
-    ItemLinks,
+    ItemLinksBuilder,
     PagingLinks,
     SearchLinks,
 )
+from stac_fastapi.pgstac.queries import (
+    COLLECTION_BASE_ITEM,
+    COLLECTION_SEARCH,
+    GET_COLLECTION,
+    GET_ITEM,
+    GET_VERSION,
+    SEARCH,
+    SEARCH_PASSTHROUGH,
+    SEARCH_ROWS,
+)
+from stac_fastapi.pgstac.types.base_item_cache import BaseItemCache
 from stac_fastapi.pgstac.types.search import PgstacSearch
-from stac_fastapi.pgstac.utils import filter_fields
+from stac_fastapi.pgstac.utils import FieldsProjection
 
 NumType = float | int
 
+# Media types which can be requested (`Accept` header) to stream search results,
+# mapped to the separator written before each feature.
+# ref: https://datatracker.ietf.org/doc/html/rfc8142
+STREAMING_MEDIA_TYPES = {
+    "application/geo+json-seq": b"\x1e",
+    "application/x-ndjson": b"",
+}
+
+
+def get_stream_media_type(request: Request) -> str | None:
+    """Return the streaming media type requested by the client, if any."""
+    for value in request.headers.get("accept", "").split(","):
+        media_type = value.split(";")[0].strip().lower()
+        if media_type in STREAMING_MEDIA_TYPES:
+            return media_type
+
+    return None
+
+
+def add_json_links(feature: bytes, links: list[dict[str, Any]]) -> bytes:
+    """Add a `links` member to a JSON encoded (object) feature."""
+    links_member = b'"links":' + orjson.dumps(links)
+    if feature == b"{}":
+        return b"{" + links_member + b"}"
+
+    return feature[:-1] + b"," + links_member + b"}"
+
 
 @attr.s
 class CoreCrudClient(AsyncBaseCoreClient):
@@ -143,13 +191,9 @@ class CoreCrudClient(AsyncBaseCoreClient):
             clean_args["q"] = " OR ".join(q) if isinstance(q, list) else q
 
         async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                SELECT * FROM collection_search(:req::text::jsonb);
-                """,
-                req=json.dumps(clean_args),
+            collections = await COLLECTION_SEARCH.fetchval(
+                conn, req=json.dumps(clean_args)
             )
-            collections = await conn.fetchval(q, *p)
 
         if links := collections.get("links"):
             for link in links:
@@ -200,6 +244,61 @@ class CoreCrudClient(AsyncBaseCoreClient):
 
         return collections
 
+    async def _fetch_collection(
+        self,
+        collection_id: str,
+        request: Request,
+    ) -> Collection | None:
+        """Get a collection (or catalog) by id, from the collections cache if enabled.
+
+        The returned object may be shared with other requests, and must not be
+        modified.
+        """
+        collection_cache = get_collection_cache(request.app)
+        if collection_cache is not None:
+            if (collection := collection_cache.get(collection_id)) is not None:
+                return collection
+
+        # Take the generation before querying the database, a write happening
+        # meanwhile then prevents caching the collection.
+        generations = get_cache_generations(request.app)
+        generation = generations.get((collection_id,))
+
+        async with request.app.state.get_connection(request, "r") as conn:
+            collection = await GET_COLLECTION.fetchval(conn, id=collection_id)
+
+        # NOTE: collections not found are not cached, so they can be created by
+        # other processes.
+        if (
+            collection_cache is not None
+            and collection is not None
+            and generations.get((collection_id,)) == generation
+        ):
+            collection_cache.set(collection_id, collection)
+
+        return collection
+
+    async def _check_collection(
+        self,
+        collection_id: str,
+        request: Request,
+    ) -> Collection:
+        """Check that a collection exists.
+
+        Raises:
+            NotFoundError: if the collection doesn't exist.
+
+        Returns:
+            The collection (without links), which must not be modified.
+        """
+        collection = await self._fetch_collection(collection_id, request=request)
+
+        # Ensure the returned object is actually a Collection
+        if collection is None or collection.get("type") != "Collection":
+            raise NotFoundError(f"Collection {collection_id} does not exist.")
+
+        return collection
+
     async def get_collection(  # type: ignore [override]
         self,
         collection_id: str,
@@ -216,22 +315,10 @@ class CoreCrudClient(AsyncBaseCoreClient):
         Returns:
             Collection.
         """
-        async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                SELECT * FROM get_collection(:id::text);
-                """,
-                id=collection_id,
-            )
-            collection: Collection | None = await conn.fetchval(q, *p)
-
-        if collection is None:
-            raise NotFoundError(f"Collection {collection_id} does not exist.")
-
-        # Ensure the returned object is actually a Collection
-        if collection.get("type") != "Collection":
-            raise NotFoundError(f"Collection {collection_id} does not exist.")
+        collection = await self._check_collection(collection_id, request=request)
 
+        # Copy the (possibly cached) collection before adding the links
+        collection = cast(Collection, dict(collection))
         collection["links"] = await CollectionLinks(
             collection_id=collection_id, request=request
         ).get_links(extra_links=collection.get("links"))
@@ -270,19 +357,142 @@ class CoreCrudClient(AsyncBaseCoreClient):
         item: dict[str, Any] | None
 
         async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                SELECT * FROM collection_base_item(:collection_id::text);
-                """,
-                collection_id=collection_id,
-            )
-            item = await conn.fetchval(q, *p)
+            item = await COLLECTION_BASE_ITEM.fetchval(conn, collection_id=collection_id)
 
         if item is None:
             raise NotFoundError(f"A base item for {collection_id} does not exist.")
 
         return item
 
+    def _get_base_item_cache(self, request: Request) -> BaseItemCache:
+        """Create the base item cache used to hydrate items within the API."""
+        settings: Settings = request.app.state.settings
+
+        async def _get_base_item(collection_id: str) -> dict[str, Any]:
+            return await self._get_base_item(collection_id, request=request)
+
+        return settings.base_item_cache(fetch_base_item=_get_base_item, request=request)
+
+    async def _hydrate_items(
+        self,
+        items: list[Item],
+        request: Request,
+        base_item_cache: BaseItemCache,
+    ) -> list[Item]:
+        """Hydrate a page of (non-hydrated) items returned by pgstac within the API.
+
+        The base item of each collection present in the page is retrieved from the
+        cache and cleaned only once, then used to hydrate all the items of the page.
+        Each item is hydrated with its own copy of the base item: the hydrated items
+        reference the nested values of the base item, which must not be modified
+        in the (shared) cache by the filtering of an item.
+        """
+        settings: Settings = request.app.state.settings
+
+        base_items: dict[str | None, bytes] = {}
+        for collection_id in dict.fromkeys(item.get("collection") for item in items):
+            base_item = await base_item_cache.get(collection_id)
+            # Exclude None values
+            base_items[collection_id] = orjson.dumps(
+                {k: v for k, v in base_item.items() if v is not None}
+            )
+
+        strip_unmatched_markers = settings.exclude_hydrate_markers
+        return [
+            hydrate(  # type: ignore
+                orjson.loads(base_items[item.get("collection")]),
+                dict(item),
+                strip_unmatched_markers=strip_unmatched_markers,
+            )
+            for item in items
+        ]
+
+    def _format_item(
+        self,
+        item: Item,
+        item_links: ItemLinksBuilder,
+        fields: FieldsProjection,
+        api_hydrated: bool = False,
+    ) -> Item:
+        """Prepare an Item returned by pgstac for the response.
+
+        When the item was hydrated within the API (`api_hydrated`), it is also filtered
+        with the compiled fields extension include/exclude sets. ItemLinks are then
+        added, unless the fields extension is excluding them or the item doesn't provide
+        collection and item ids.
+        """
+        collection_id: str | None = None
+        item_id: str | None = None
+
+        if api_hydrated:
+            # Grab ids needed for links that may be removed by the fields extension.
+            collection_id = item.get("collection")
+            item_id = item.get("id")
+
+            item = fields.apply(item)
+
+        collection_id = item.get("collection") or collection_id
+        item_id = item.get("id") or item_id
+
+        exclude = fields.exclude
+        if not exclude or "links" not in exclude and all([collection_id, item_id]):
+            item["links"] = item_links.get_links(
+                collection_id=collection_id,  # type: ignore
+                item_id=item_id,  # type: ignore
+                extra_links=item.get("links"),
+            )
+
+        return item
+
+    @staticmethod
+    def _pop_paging_tokens(
+        item_collection: ItemCollection | dict[str, Any],
+    ) -> tuple[str | None, str | None]:
+        """Remove and return the `next` and `prev` tokens of a pgstac search result."""
+        # Starting in pgstac 0.9.0, the `next` and `prev` tokens are returned in spec-compliant links with method GET
+        next_from_link: str | None = None
+        prev_from_link: str | None = None
+
+        for link in item_collection.get("links", []):
+            if link.get("rel") == "next":
+                next_from_link = link["href"].split("token=next:")[1]
+            if link.get("rel") == "prev":
+                prev_from_link = link["href"].split("token=prev:")[1]
+
+        # NOTE: Old version of pgstac returned `next` and `prev` links directly in the response
+        next: str | None = item_collection.pop("next", next_from_link)  # type: ignore [typeddict-item]
+        prev: str | None = item_collection.pop("prev", prev_from_link)  # type: ignore [typeddict-item]
+
+        return next, prev
+
+    async def _fetch_search(
+        self,
+        search_request: PgstacSearch,
+        search_request_json: str,
+        request: Request,
+    ) -> ItemCollection:
+        """Run the pgstac search.
+
+        Args:
+            search_request: search request parameters.
+            search_request_json: the JSON encoded search request sent to pgstac.
+
+        Returns:
+            ItemCollection returned by pgstac.
+        """
+        try:
+            async with request.app.state.get_connection(request, "r") as conn:
+                item_collection: ItemCollection = await SEARCH.fetchval(
+                    conn, req=search_request_json
+                )
+
+        except InvalidDatetimeFormatError as e:
+            raise InvalidQueryParameter(
+                f"Datetime parameter {search_request.datetime} is invalid."
+            ) from e
+
+        return item_collection
+
     async def _search_base(  # noqa: C901  # type: ignore [override]
         self,
         search_request: PgstacSearch,
@@ -307,101 +517,266 @@ class CoreCrudClient(AsyncBaseCoreClient):
             exclude_none=True, by_alias=True
         )
 
-        try:
-            async with request.app.state.get_connection(request, "r") as conn:
-                q, p = render(
-                    """
-                    SELECT * FROM search(:req::text::jsonb);
-                    """,
-                    req=search_request_json,
+        search_cache = get_search_cache(request.app)
+        search_flights = get_search_flights(request.app)
+        search_key = ""
+        if search_cache is not None or search_flights is not None:
+            search_key = SearchCache.key(get_base_url(request), search_request_json)
+
+        item_collection: ItemCollection | None = None
+        if search_cache is not None:
+            item_collection = search_cache.get(search_key)
+            request.state.cache_status = "miss" if item_collection is None else "hit"
+
+        if item_collection is None:
+            # Take the generation before querying the database: a write happening
+            # meanwhile then prevents caching the result as valid, or sharing it with
+            # the searches made after the write.
+            tags = SearchCache.tags(search_request.collections)
+            generation = get_cache_generations(request.app).get(tags)
+
+            async def _fetch() -> ItemCollection:
+                result = await self._fetch_search(
+                    search_request, search_request_json, request=request
                 )
-                item_collection: ItemCollection = await conn.fetchval(q, *p)
+                if search_cache is not None:
+                    search_cache.set(search_key, result, tags, generation)
+                return result
+
+            fetch: Awaitable[ItemCollection] = (
+                search_flights.run((search_key, generation), _fetch)
+                if search_flights is not None
+                else _fetch()
+            )
+            if settings.cancel_on_disconnect:
+                fetch = cancel_on_disconnect(request, fetch)
 
-        except InvalidDatetimeFormatError as e:
-            raise InvalidQueryParameter(
-                f"Datetime parameter {search_request.datetime} is invalid."
-            ) from e
+            item_collection = await fetch
+            if search_cache is not None and search_key in search_cache:
+                request.state.cache_status = "stored"
 
-        # Starting in pgstac 0.9.0, the `next` and `prev` tokens are returned in spec-compliant links with method GET
-        next_from_link: str | None = None
-        prev_from_link: str | None = None
+        next, prev = self._pop_paging_tokens(item_collection)
 
-        for link in item_collection.get("links", []):
-            if link.get("rel") == "next":
-                next_from_link = link["href"].split("token=next:")[1]
-            if link.get("rel") == "prev":
-                prev_from_link = link["href"].split("token=prev:")[1]
+        fields = getattr(search_request, "fields", None)
+        fields_projection = FieldsProjection(
+            include=fields.include if fields and fields.include else set(),
+            exclude=fields.exclude if fields and fields.exclude else set(),
+        )
 
-        # NOTE: Old version of pgstac returned `next` and `prev` links directly in the response
-        next: str | None = item_collection.pop("next", next_from_link)  # type: ignore [typeddict-item]
-        prev: str | None = item_collection.pop("prev", prev_from_link)  # type: ignore [typeddict-item]
+        base_item_cache = (
+            self._get_base_item_cache(request) if settings.use_api_hydrate else None
+        )
+        item_links = ItemLinksBuilder(request=request)
+
+        items: list[Item] = item_collection.get("features", [])
+        if base_item_cache is not None:
+            items = await self._hydrate_items(items, request, base_item_cache)
+
+        item_collection["features"] = [
+            self._format_item(
+                item,
+                item_links=item_links,
+                fields=fields_projection,
+                api_hydrated=base_item_cache is not None,
+            )
+            for item in items
+        ]
+        item_collection["links"] = await PagingLinks(
+            request=request,
+            next=next,
+            prev=prev,
+        ).get_links()
+
+        return item_collection
+
+    def _use_search_passthrough(
+        self,
+        search_request: PgstacSearch,
+        request: Request,
+    ) -> bool:
+        """Check if the search results can be passed through as pre-encoded JSON."""
+        settings: Settings = request.app.state.settings
+        if (
+            not settings.use_search_passthrough
+            or settings.use_api_hydrate
+            or settings.enable_response_models
+        ):
+            return False
 
         fields = getattr(search_request, "fields", None)
-        include: set[str] = fields.include if fields and fields.include else set()
-        exclude: set[str] = fields.exclude if fields and fields.exclude else set()
-
-        async def _add_item_links(
-            feature: Item,
-            collection_id: str | None = None,
-            item_id: str | None = None,
-        ) -> None:
-            """Add ItemLinks to the Item.
-
-            If the fields extension is excluding links, then don't add them.
-            Also skip links if the item doesn't provide collection and item ids.
-            """
-            collection_id = feature.get("collection") or collection_id
-            item_id = feature.get("id") or item_id
-
-            if not exclude or "links" not in exclude and all([collection_id, item_id]):
-                feature["links"] = await ItemLinks(
-                    collection_id=collection_id,  # type: ignore
-                    item_id=item_id,  # type: ignore
-                    request=request,
-                ).get_links(extra_links=feature.get("links"))
-
-        items: list[Item] = []
-        if settings.use_api_hydrate:
+        return not (fields and (fields.include or fields.exclude))
 
-            async def _get_base_item(collection_id: str) -> dict[str, Any]:
-                return await self._get_base_item(collection_id, request=request)
+    async def _search_passthrough(
+        self,
+        search_request: PgstacSearch,
+        request: Request,
+    ) -> Response:
+        """Cross catalog search, passing the features through as pre-encoded JSON.
 
-            base_item_cache = settings.base_item_cache(
-                fetch_base_item=_get_base_item, request=request
-            )
+        The features returned by pgstac are not decoded: they are received as JSON
+        encoded bytes (without their links), along with the collection/item ids and
+        links needed to create the ItemLinks, which are then added at the byte level.
+        Only used when the items are hydrated by pgstac and the fields extension is
+        not used, as both need the decoded items, and when the response models are
+        not enabled.
 
-            for item in item_collection.get("features", []):
-                base_item = await base_item_cache.get(item.get("collection"))
-                # Exclude None values
-                base_item = {k: v for k, v in base_item.items() if v is not None}
+        Args:
+            search_request: search request parameters.
 
-                item = hydrate(  # type: ignore
-                    base_item,
-                    dict(item),
-                    strip_unmatched_markers=settings.exclude_hydrate_markers,
-                )
+        Returns:
+            Response with the ItemCollection which match the search criteria.
+        """
+        search_request.conf = search_request.conf or {}
+        search_request.conf["nohydrate"] = False
+
+        search_request_json = search_request.model_dump_json(
+            exclude_none=True, by_alias=True
+        )
 
-                # Grab ids needed for links that may be removed by the fields extension.
-                collection_id = item.get("collection")
-                item_id = item.get("id")
+        async def _fetch() -> Any:
+            async with request.app.state.get_connection(request, "r") as conn:
+                return await SEARCH_PASSTHROUGH.fetchrow(conn, req=search_request_json)
 
-                item = filter_fields(item, include, exclude)
-                await _add_item_links(item, collection_id, item_id)
-                items.append(item)
+        fetch = _fetch()
+        if request.app.state.settings.cancel_on_disconnect:
+            fetch = cancel_on_disconnect(request, fetch)
 
-        else:
-            for item in item_collection.get("features", []):
-                await _add_item_links(item)
-                items.append(item)
+        try:
+            item_collection, features, refs = await fetch
 
-        item_collection["features"] = items
-        item_collection["links"] = await PagingLinks(
+        except InvalidDatetimeFormatError as e:
+            raise InvalidQueryParameter(
+                f"Datetime parameter {search_request.datetime} is invalid."
+            ) from e
+
+        next, prev = self._pop_paging_tokens(item_collection)
+
+        item_links = ItemLinksBuilder(request=request)
+        for i, (collection_id, item_id, links) in enumerate(refs):
+            if collection_id and item_id:
+                links = item_links.get_links(
+                    collection_id=collection_id,
+                    item_id=item_id,
+                    extra_links=links,
+                )
+
+            if links is not None:
+                features[i] = add_json_links(features[i], links)
+
+        links = await PagingLinks(
             request=request,
             next=next,
             prev=prev,
         ).get_links()
+        item_collection["links"] = await SearchLinks(request=request).get_links(
+            extra_links=links
+        )
 
-        return item_collection
+        content = orjson.dumps(item_collection)
+        content = content[:-1] + b',"features":[' + b",".join(features) + b"]}"
+
+        return Response(content, media_type=MimeTypes.geojson.value)
+
+    async def _stream_search(
+        self,
+        search_request: PgstacSearch,
+        request: Request,
+        media_type: str,
+    ) -> StreamingResponse:
+        """Stream the items matching the search, one GeoJSON Feature per line.
+
+        Items are read from a server-side cursor in chunks of `stream_chunk_size`
+        and formatted (hydration, fields, links) as they flow, so the memory used
+        does not depend on the number of items requested.
+
+        Args:
+            search_request: search request parameters.
+            media_type: the streaming media type requested by the client.
+
+        Returns:
+            StreamingResponse with the items which match the search criteria.
+        """
+        settings: Settings = request.app.state.settings
+
+        if getattr(search_request, "token", None):
+            raise InvalidQueryParameter(
+                "Pagination token is not supported when streaming search results."
+            )
+
+        search_request.conf = search_request.conf or {}
+        search_request.conf["nohydrate"] = settings.use_api_hydrate
+
+        search = search_request.model_dump(mode="json", exclude_none=True, by_alias=True)
+
+        fields = getattr(search_request, "fields", None)
+        fields_projection = FieldsProjection(
+            include=fields.include if fields and fields.include else set(),
+            exclude=fields.exclude if fields and fields.exclude else set(),
+        )
+
+        base_item_cache = (
+            self._get_base_item_cache(request) if settings.use_api_hydrate else None
+        )
+        item_links = ItemLinksBuilder(request=request)
+        separator = STREAMING_MEDIA_TYPES[media_type]
+
+        search_args = {
+            "req": json.dumps(search),
+            "fields": json.dumps(search.get("fields", {})),
+            "hydrate": not settings.use_api_hydrate,
+            "limit": search_request.limit,
+        }
+
+        async def _features() -> AsyncGenerator[bytes, None]:
+            async with request.app.state.get_connection(request, "r") as conn:
+                # Server-side cursors only live within a transaction
+                async with conn.transaction():
+                    cursor = await SEARCH_ROWS.cursor(conn, **search_args)
+                    while records := await cursor.fetch(settings.stream_chunk_size):
+                        items = [item for (item,) in records]
+                        if base_item_cache is not None:
+                            items = await self._hydrate_items(
+                                items, request, base_item_cache
+                            )
+
+                        yield b"".join(
+                            separator
+                            + orjson.dumps(
+                                self._format_item(
+                                    item,
+                                    item_links=item_links,
+                                    fields=fields_projection,
+                                    api_hydrated=base_item_cache is not None,
+                                )
+                            )
+                            + b"\n"
+                            for item in items
+                        )
+
+        features = _features()
+
+        # Fetch the first chunk before sending the response headers so that
+        # errors raised by the query can still be returned to the client.
+        try:
+            first_chunk = await anext(features)
+        except StopAsyncIteration:
+            first_chunk = b""
+        except InvalidDatetimeFormatError as e:
+            raise InvalidQueryParameter(
+                f"Datetime parameter {search_request.datetime} is invalid."
+            ) from e
+
+        async def _stream() -> AsyncIterator[bytes]:
+            try:
+                yield first_chunk
+                async for chunk in features:
+                    yield chunk
+            finally:
+                # Release the cursor and its connection right away when the stream
+                # is closed early (e.g. the client disconnected).
+                await features.aclose()
+
+        return StreamingResponse(_stream(), media_type=media_type)
 
     async def item_collection(  # type: ignore [override]
         self,
@@ -431,35 +806,58 @@ class CoreCrudClient(AsyncBaseCoreClient):
         Returns:
             An ItemCollection.
         """
-        # If collection does not exist, NotFoundError wil be raised
-        await self.get_collection(collection_id, request=request)
+        settings: Settings = request.app.state.settings
 
-        base_args = {
-            "collections": [collection_id],
-            "bbox": bbox,
-            "datetime": datetime,
-            "limit": limit,
-            "token": token,
-            "query": orjson.loads(unquote_plus(query)) if query else query,
-        }
+        async def _search() -> tuple[PgstacSearch, ItemCollection]:
+            base_args = {
+                "collections": [collection_id],
+                "bbox": bbox,
+                "datetime": datetime,
+                "limit": limit,
+                "token": token,
+                "query": orjson.loads(unquote_plus(query)) if query else query,
+            }
 
-        clean = self._clean_search_args(
-            base_args=base_args,
-            filter_query=filter_expr,
-            filter_lang=filter_lang,
-            fields=fields,
-            sortby=sortby,
-            **kwargs,
-        )
+            clean = self._clean_search_args(
+                base_args=base_args,
+                filter_query=filter_expr,
+                filter_lang=filter_lang,
+                fields=fields,
+                sortby=sortby,
+                **kwargs,
+            )
 
-        try:
-            search_request = self.pgstac_search_model(**clean)
-        except ValidationError as e:
-            raise HTTPException(
-                status_code=400, detail=f"Invalid parameters provided {e}"
-            ) from e
+            try:
+                search_request = self.pgstac_search_model(**clean)
+            except ValidationError as e:
+                raise HTTPException(
+                    status_code=400, detail=f"Invalid parameters provided {e}"
+                ) from e
+
+            item_collection = await self._search_base(search_request, request=request)
+            return search_request, item_collection
+
+        if settings.concurrent_collection_check:
+            # Check the collection and search the items concurrently (on separate
+            # connections). If the collection does not exist, the NotFoundError
+            # takes precedence over the search result or error.
+            collection_check, search_result = await asyncio.gather(
+                self._check_collection(collection_id, request=request),
+                _search(),
+                return_exceptions=True,
+            )
+            for result in (collection_check, search_result):
+                if isinstance(result, BaseException):
+                    raise result
 
-        item_collection = await self._search_base(search_request, request=request)
+            search_request, item_collection = cast(
+                tuple[PgstacSearch, ItemCollection], search_result
+            )
+
+        else:
+            # If collection does not exist, NotFoundError wil be raised
+            await self._check_collection(collection_id, request=request)
+            search_request, item_collection = await _search()
 
         links = await ItemCollectionLinks(
             collection_id=collection_id, request=request
@@ -493,19 +891,50 @@ class CoreCrudClient(AsyncBaseCoreClient):
         Returns:
             Item.
         """
-        # If collection does not exist, NotFoundError wil be raised
-        await self.get_collection(collection_id, request=request)
+        settings: Settings = request.app.state.settings
 
-        search_request = self.pgstac_search_model(
-            ids=[item_id], collections=[collection_id], limit=1
-        )
-        item_collection = await self._search_base(search_request, request=request)
-        if not item_collection["features"]:
+        # Check the collection and get the item (and the collection's base item, when
+        # hydrating within the API and not in the shared cache) in a single query.
+        base_item_store = getattr(request.app.state, "base_item_store", None)
+        async with request.app.state.get_connection(request, "r") as conn:
+            row = await GET_ITEM.fetchrow(
+                conn,
+                collection_id=collection_id,
+                item_id=item_id,
+                api_hydrate=settings.use_api_hydrate,
+                base_item=settings.use_api_hydrate
+                and (base_item_store is None or collection_id not in base_item_store),
+            )
+
+        # Ensure the collection exists and is actually a Collection
+        if row is None or row[0] != "Collection":
+            raise NotFoundError(f"Collection {collection_id} does not exist.")
+
+        _, base_item, item = row
+        if item is None:
             raise NotFoundError(
                 f"Item {item_id} in Collection {collection_id} does not exist."
             )
 
-        return item_collection["features"][0]
+        if settings.use_api_hydrate:
+
+            async def _get_base_item(collection_id: str) -> dict[str, Any]:
+                if base_item is not None:
+                    return base_item
+                # e.g. the cached base item expired meanwhile
+                return await self._get_base_item(collection_id, request=request)
+
+            base_item_cache = settings.base_item_cache(
+                fetch_base_item=_get_base_item, request=request
+            )
+            (item,) = await self._hydrate_items([item], request, base_item_cache)
+
+        return self._format_item(
+            item,
+            item_links=ItemLinksBuilder(request=request),
+            fields=FieldsProjection(),
+            api_hydrated=settings.use_api_hydrate,
+        )
 
     async def post_search(  # type: ignore [override]
         self,
@@ -523,6 +952,16 @@ class CoreCrudClient(AsyncBaseCoreClient):
         Returns:
             ItemCollection containing items which match the search criteria.
         """
+        if media_type := get_stream_media_type(request):
+            return await self._stream_search(  # type: ignore [return-value]
+                search_request, request=request, media_type=media_type
+            )
+
+        if self._use_search_passthrough(search_request, request):
+            return await self._search_passthrough(  # type: ignore [return-value]
+                search_request, request=request
+            )
+
         item_collection = await self._search_base(search_request, request=request)
 
         # If we have the `fields` extension enabled
@@ -592,6 +1031,16 @@ class CoreCrudClient(AsyncBaseCoreClient):
                 status_code=400, detail=f"Invalid parameters provided {e}"
             ) from e
 
+        if media_type := get_stream_media_type(request):
+            return await self._stream_search(  # type: ignore [return-value]
+                search_request, request=request, media_type=media_type
+            )
+
+        if self._use_search_passthrough(search_request, request):
+            return await self._search_passthrough(  # type: ignore [return-value]
+                search_request, request=request
+            )
+
         item_collection = await self._search_base(search_request, request=request)
 
         links = await SearchLinks(request=request).get_links(
@@ -677,7 +1126,7 @@ class CoreCrudClient(AsyncBaseCoreClient):
 
 async def health_check(request: Request) -> dict | JSONResponse:
     """PgSTAC HealthCheck."""
-    resp = {
+    resp: dict[str, Any] = {
         "status": "UP",
         "lifespan": {
             "status": "UP",
@@ -701,10 +1150,7 @@ async def health_check(request: Request) -> dict | JSONResponse:
 
     try:
         async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """SELECT pgstac.get_version();""",
-            )
-            version = await conn.fetchval(q, *p)
+            version = await GET_VERSION.fetchval(conn)
     except Exception as e:
         resp["status"] = "DOWN"
         resp["pgstac"] = {
@@ -718,4 +1164,22 @@ async def health_check(request: Request) -> dict | JSONResponse:
         "pgstac_version": version,
     }
 
+    if admissions := getattr(request.app.state, "pool_admissions", None):
+        resp["pgstac"]["pools"] = {
+            "read" if readwrite == "r" else "write": admission.stats()
+            for readwrite, admission in admissions.items()
+        }
+
+    caches = {
+        name: cache.stats()
+        for name, state_name in (
+            ("search", "search_cache"),
+            ("collections", "collection_store"),
+            ("base_items", "base_item_store"),
+        )
+        if (cache := getattr(request.app.state, state_name, None)) is not None
+    }
+    if caches:
+        resp["caches"] = caches
+
     return resp
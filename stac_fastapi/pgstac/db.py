@@ -1,10 +1,23 @@
 """Database connection handling."""
 
+import asyncio
+import functools
 import json
-from collections.abc import AsyncIterator, Callable, Generator
-from contextlib import asynccontextmanager, contextmanager
-from typing import Literal
+import logging
+import struct
+import time
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generator,
+    Iterable,
+    Mapping,
+)
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from typing import Any, Literal, TypeVar
 
+import attr
 import orjson
 from asyncpg import Connection, Pool, exceptions
 from buildpg import V, asyncpg, render
@@ -18,6 +31,10 @@ from stac_fastapi.types.errors import (
 
 from stac_fastapi.pgstac.config import PostgresSettings
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 async def con_init(conn):
     """Use orjson for json returns."""
@@ -35,22 +52,270 @@ async def con_init(conn):
     )
 
 
+# Version of the jsonb binary format, prefixing the JSON text of binary jsonb values
+JSONB_BINARY_VERSION = b"\x01"
+
+
+def _encode_jsonb_binary(value: Any) -> bytes:
+    return JSONB_BINARY_VERSION + orjson.dumps(value)
+
+
+def _decode_jsonb_binary(data: bytes) -> Any:
+    # Skip the version byte without copying the value
+    return orjson.loads(memoryview(data)[1:])
+
+
+async def con_init_binary(conn):
+    """Use orjson for json returns, with the binary transport of json values.
+
+    Values are decoded from the bytes received from the server, without creating
+    intermediate `str` objects.
+    """
+    await conn.set_type_codec(
+        "json",
+        encoder=orjson.dumps,
+        decoder=orjson.loads,
+        schema="pg_catalog",
+        format="binary",
+    )
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=_encode_jsonb_binary,
+        decoder=_decode_jsonb_binary,
+        schema="pg_catalog",
+        format="binary",
+    )
+
+
 ConnectionGetter = Callable[[Request, Literal["r", "w"]], AsyncIterator[Connection]]
 
 
-async def _create_pool(settings: PostgresSettings) -> Pool:
+async def _create_pool(
+    settings: PostgresSettings, connection_string: str | None = None
+) -> Pool:
     """Create a connection pool."""
     return await asyncpg.create_pool(
-        settings.connection_string,
+        connection_string or settings.connection_string,
         min_size=settings.db_min_conn_size,
         max_size=settings.db_max_conn_size,
         max_queries=settings.db_max_queries,
         max_inactive_connection_lifetime=settings.db_max_inactive_conn_lifetime,
-        init=con_init,
+        # Prepared statements only live in the server session they were created in,
+        # which PgBouncer doesn't pin to a client connection.
+        statement_cache_size=(
+            0 if settings.db_pgbouncer_mode else settings.db_statement_cache_size
+        ),
+        init=con_init_binary if settings.db_json_codec == "binary" else con_init,
         server_settings=settings.server_settings.model_dump(),
     )
 
 
+# Errors raised when a database server can't be reached (or stops responding)
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    exceptions.ConnectionDoesNotExistError,
+    exceptions.CannotConnectNowError,
+    exceptions.PostgresConnectionError,
+)
+
+
+@attr.s
+class Replica:
+    """The connection pool of a read replica.
+
+    The pool is created (by `connect`) on first use, if not given.
+    """
+
+    pool: Pool | None = attr.ib(default=None)
+    connect: Callable[[], Awaitable[Pool]] | None = attr.ib(default=None)
+    outstanding: int = attr.ib(init=False, default=0)
+    ejected_until: float = attr.ib(init=False, default=0)
+    _lock: asyncio.Lock = attr.ib(init=False, factory=asyncio.Lock)
+
+    @property
+    def healthy(self) -> bool:
+        """Check if the replica is not ejected."""
+        return self.ejected_until <= time.monotonic()
+
+    async def get_pool(self) -> Pool:
+        """Return the pool of the replica, creating it if needed."""
+        if self.pool is None:
+            async with self._lock:
+                if self.pool is None:
+                    assert self.connect is not None
+                    self.pool = await self.connect()
+
+        return self.pool
+
+
+@attr.s
+class ReadPools:
+    """Balance the read connections over the pools of read replicas.
+
+    Each connection is acquired from the healthy replica with the fewest outstanding
+    acquires (i.e. connections being acquired or in use). A replica failing to
+    connect (or losing its connection) is ejected for `eject_time` seconds, a replica
+    unreachable at startup being created ejected. When no
+    replica is healthy, or when acquiring a connection from the chosen replica
+    fails, connections are acquired from the primary pool.
+
+    Attributes:
+        replicas: the read replicas.
+        primary: the pool of the primary database.
+        eject_time: number of seconds a failing replica is ejected.
+    """
+
+    replicas: list[Replica] = attr.ib()
+    primary: Pool = attr.ib()
+    eject_time: float = attr.ib(default=30)
+    _next: int = attr.ib(init=False, default=0)
+
+    def choose(self) -> Replica | None:
+        """Return the healthy replica with the fewest outstanding acquires."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+
+        # Rotate the replicas so ties don't always go to the first one
+        self._next = (self._next + 1) % len(healthy)
+        healthy = healthy[self._next :] + healthy[: self._next]
+        return min(healthy, key=lambda replica: replica.outstanding)
+
+    def eject(self, replica: Replica, error: Exception) -> None:
+        """Eject a failing replica."""
+        logger.warning(f"Ejecting read replica for {self.eject_time}s: {error!r}")
+        replica.ejected_until = time.monotonic() + self.eject_time
+
+    async def connect(self) -> None:
+        """Create the pools of the replicas, ejecting the unreachable ones."""
+
+        async def _connect(replica: Replica) -> None:
+            try:
+                await replica.get_pool()
+            except CONNECTION_ERRORS as e:
+                self.eject(replica, e)
+
+        await asyncio.gather(*(_connect(replica) for replica in self.replicas))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Connection]:
+        """Acquire a read connection."""
+        if (replica := self.choose()) is not None:
+            replica.outstanding += 1
+            try:
+                pool = await replica.get_pool()
+                conn = await pool.acquire()
+            except CONNECTION_ERRORS as e:
+                self.eject(replica, e)
+            else:
+                try:
+                    yield conn
+                    return
+                except exceptions.ConnectionDoesNotExistError as e:
+                    self.eject(replica, e)
+                    raise
+                finally:
+                    await pool.release(conn)
+            finally:
+                replica.outstanding -= 1
+
+        async with self.primary.acquire() as conn:
+            yield conn
+
+    async def close(self) -> None:
+        """Close the pools of the replicas."""
+        await asyncio.gather(
+            *(
+                replica.pool.close()
+                for replica in self.replicas
+                if replica.pool is not None
+            )
+        )
+
+
+@attr.s
+class PoolAdmission:
+    """Bound the wait for the connections of a pool.
+
+    Requests which would wait for more than `timeout` seconds, or find `max_waiters`
+    requests already waiting, are rejected with a `503 Service Unavailable` error
+    (and a `Retry-After` header), instead of queuing without bound.
+
+    Attributes:
+        timeout: maximum number of seconds to wait for a connection.
+        max_waiters: maximum number of requests waiting for a connection.
+        retry_after: number of seconds sent in the `Retry-After` header.
+        waiting: number of requests waiting for a connection.
+        acquired: number of connections acquired.
+        rejected: number of requests rejected because too many were waiting.
+        timed_out: number of requests rejected because they waited too long.
+    """
+
+    timeout: float | None = attr.ib(default=None)
+    max_waiters: int | None = attr.ib(default=None)
+    retry_after: int = attr.ib(default=1)
+    waiting: int = attr.ib(init=False, default=0)
+    acquired: int = attr.ib(init=False, default=0)
+    rejected: int = attr.ib(init=False, default=0)
+    timed_out: int = attr.ib(init=False, default=0)
+    _wait_time: float = attr.ib(init=False, default=0)
+    _max_wait_time: float = attr.ib(init=False, default=0)
+
+    def _overloaded(self, reason: str) -> HTTPException:
+        logger.warning(f"Rejecting request: {reason}")
+        return HTTPException(
+            status_code=503,
+            detail=f"Service overloaded, {reason}",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    @asynccontextmanager
+    async def acquire(self, pool: Pool | ReadPools) -> AsyncIterator[Connection]:
+        """Acquire a connection of the pool."""
+        if self.max_waiters is not None and self.waiting >= self.max_waiters:
+            self.rejected += 1
+            raise self._overloaded("too many requests waiting for a connection")
+
+        async with AsyncExitStack() as stack:
+            self.waiting += 1
+            start = time.monotonic()
+            try:
+                async with asyncio.timeout(self.timeout):
+                    conn = await stack.enter_async_context(pool.acquire())
+            except TimeoutError:
+                self.timed_out += 1
+                raise self._overloaded("timed out waiting for a connection") from None
+            finally:
+                self.waiting -= 1
+                wait_time = time.monotonic() - start
+                self._wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+
+            self.acquired += 1
+            yield conn
+
+    def stats(self) -> dict[str, Any]:
+        """Return the admission statistics."""
+        requests = self.acquired + self.timed_out
+        return {
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_time_avg": self._wait_time / requests if requests else 0,
+            "wait_time_max": self._max_wait_time,
+        }
+
+
+def _pool_admission(settings: PostgresSettings) -> PoolAdmission:
+    return PoolAdmission(
+        timeout=settings.db_acquire_timeout,
+        max_waiters=settings.db_max_waiters,
+        retry_after=settings.db_retry_after,
+    )
+
+
 async def connect_to_db(
     app: FastAPI,
     get_conn: ConnectionGetter | None = None,
@@ -64,18 +329,38 @@ async def connect_to_db(
         postgres_settings = PostgresSettings()  # type: ignore
 
     app.state.readpool = await _create_pool(postgres_settings)
+    app.state.pool_admissions = {"r": _pool_admission(postgres_settings)}
+
+    app.state.readpools = None
+    if reader_connection_strings := postgres_settings.reader_connection_strings:
+        app.state.readpools = ReadPools(
+            replicas=[
+                Replica(
+                    connect=functools.partial(
+                        _create_pool, postgres_settings, connection_string
+                    )
+                )
+                for connection_string in reader_connection_strings
+            ],
+            primary=app.state.readpool,
+            eject_time=postgres_settings.db_reader_eject_time,
+        )
+        await app.state.readpools.connect()
 
     if add_write_connection_pool:
         if not write_postgres_settings:
             write_postgres_settings = postgres_settings
 
         app.state.writepool = await _create_pool(write_postgres_settings)
+        app.state.pool_admissions["w"] = _pool_admission(write_postgres_settings)
 
     app.state.get_connection = get_conn if get_conn else get_connection
 
 
 async def close_db_connection(app: FastAPI) -> None:
     """Close connection."""
+    if readpools := getattr(app.state, "readpools", None):
+        await readpools.close()
     if pool := getattr(app.state, "readpool", None):
         await pool.close()
     if pool := getattr(app.state, "writepool", None):
@@ -97,9 +382,66 @@ async def get_connection(
                 detail="Could not find connection pool for write operations",
             )
 
+    # Balance the read connections over the read replicas, if any
+    elif readpools := getattr(request.app.state, "readpools", None):
+        pool = readpools
+
+    admissions = getattr(request.app.state, "pool_admissions", {})
+    if (admission := admissions.get(readwrite)) is not None:
+        acquire = admission.acquire(pool)
+    else:
+        acquire = pool.acquire()
+
     with translate_pgstac_errors():
-        async with pool.acquire() as conn:
-            yield conn
+        async with acquire as conn:
+            if readwrite == "r" and (timeout := statement_timeout(request)) is not None:
+                # NOTE: set for the transaction only, so the setting doesn't leak to
+                # the other clients of a server session (e.g. with PgBouncer).
+                async with conn.transaction():
+                    await conn.execute(
+                        "SELECT set_config('statement_timeout', $1, true);",
+                        str(int(timeout * 1000)),
+                    )
+                    yield conn
+            else:
+                yield conn
+
+
+def statement_timeout(request: Request) -> float | None:
+    """Return the statement timeout of the endpoint called by the request."""
+    timeouts = request.app.state.settings.statement_timeouts
+    if not timeouts:
+        return None
+
+    route = request.scope.get("route")
+    return timeouts.get(getattr(route, "name", None), timeouts.get("*"))
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """Wait for `awaitable`, cancelling it if the client disconnects meanwhile.
+
+    Cancelling a task running a query makes asyncpg cancel the query on the
+    server, releasing its connection (and the database resources) right away.
+    """
+    task = asyncio.ensure_future(awaitable)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        disconnected.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+
+    if task.cancelled():
+        raise HTTPException(status_code=499, detail="Client closed the request")
+
+    return task.result()
 
 
 async def dbfunc(conn: Connection, func: str, arg: str | dict | list):
@@ -132,6 +474,47 @@ async def dbfunc(conn: Connection, func: str, arg: str | dict | list):
             return await conn.fetchval(q, *p)
 
 
+# Signature, flags and header extension length of the binary COPY format
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+
+
+async def copy_items(
+    conn: Connection,
+    table: str,
+    items: Iterable[Mapping[str, Any]],
+    chunk_size: int = 1000,
+) -> None:
+    """Load items into a pgstac staging table with COPY.
+
+    The pgstac staging tables (`items_staging`, `items_staging_ignore` and
+    `items_staging_upsert`) move the rows copied into them to the (partitioned)
+    `items` table at the end of the statement, like `create_items` (resp.
+    `upsert_items`) do. The items are encoded one by one into the binary COPY
+    stream, sent in chunks of `chunk_size` items, instead of as a single JSON
+    document.
+    """
+
+    async def _rows() -> AsyncIterator[bytes]:
+        chunk = [COPY_BINARY_HEADER]
+        for i, item in enumerate(items, start=1):
+            content = orjson.dumps(item)
+            # A single `jsonb` field (length prefixed, with its version byte)
+            chunk.append(struct.pack("!hi", 1, len(content) + 1))
+            chunk.append(JSONB_BINARY_VERSION + content)
+            if i % chunk_size == 0:
+                yield b"".join(chunk)
+                chunk = []
+
+        chunk.append(COPY_BINARY_TRAILER)
+        yield b"".join(chunk)
+
+    with translate_pgstac_errors():
+        await conn.copy_to_table(
+            table, source=_rows(), columns=["content"], format="binary"
+        )
+
+
 @contextmanager
 def translate_pgstac_errors() -> Generator[None, None, None]:
     """Context manager that translates pgstac errors into FastAPI errors."""
@@ -145,3 +528,7 @@ def translate_pgstac_errors() -> Generator[None, None, None]:
         raise DatabaseError from e
     except exceptions.ForeignKeyViolationError as e:
         raise ForeignKeyError from e
+    except exceptions.QueryCanceledError as e:
+        raise HTTPException(
+            status_code=504, detail=f"Database query canceled: {e}"
+        ) from e
@@ -1,11 +1,15 @@
 """pgstac extension customisations."""
 
+from .bulk_stream import BulkStreamExtension
 from .filter import FiltersClient
 from .free_text import FreeTextExtension
+from .jobs import JobsExtension
 from .query import QueryExtension
 
 __all__ = [
     "QueryExtension",
     "FiltersClient",
     "FreeTextExtension",
+    "BulkStreamExtension",
+    "JobsExtension",
 ]
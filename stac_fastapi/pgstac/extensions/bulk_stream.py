@@ -0,0 +1,85 @@
+"""Streaming bulk ingestion extension."""
+
+from collections.abc import Sequence
+from typing import Annotated
+
+import attr
+from fastapi import APIRouter, FastAPI, HTTPException, Path, Query, Request
+from fastapi.params import Depends
+from stac_fastapi.extensions.bulk_transactions import BulkTransactionMethod
+from stac_fastapi.types.extension import ApiExtension
+
+from stac_fastapi.pgstac.transactions import BulkTransactionsClient
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@attr.s
+class BulkStreamExtension(ApiExtension):
+    """Streaming bulk ingestion extension.
+
+    Adds the `POST /collections/{collection_id}/items/bulk-stream` endpoint, which
+    takes the items as newline-delimited JSON (`application/x-ndjson`, one item per
+    line), other content types being rejected with a `415` response. The items are
+    validated as they are read, and written in batches of `bulk_stream_batch_size`
+    items, so ingesting a large collection runs in constant memory. The response
+    reports the number of items of each batch:
+
+        {"method": "insert", "items": 2500, "batches": [1000, 1000, 500]}
+
+    The `method` query parameter is either "insert" (default) or "upsert", as for
+    the Bulk Transactions extension.
+    """
+
+    client: BulkTransactionsClient = attr.ib(factory=BulkTransactionsClient)
+    conformance_classes: list[str] = attr.ib(factory=list)
+    schema_href: str | None = attr.ib(default=None)
+    route_dependencies: Sequence[Depends] | None = attr.ib(default=None)
+
+    def register(self, app: FastAPI) -> None:
+        """Register the extension with a FastAPI application.
+
+        Args:
+            app: target FastAPI application.
+
+        Returns:
+            None
+        """
+        client = self.client
+
+        async def bulk_item_stream(
+            request: Request,
+            collection_id: Annotated[str, Path(description="Collection ID")],
+            method: Annotated[
+                BulkTransactionMethod, Query(description="Bulk transaction method")
+            ] = BulkTransactionMethod.INSERT,
+        ):
+            """Bulk item insertion from newline-delimited JSON."""
+            content_type = request.headers.get("content-type", "")
+            if content_type.split(";")[0].strip().lower() != NDJSON_MEDIA_TYPE:
+                raise HTTPException(
+                    status_code=415,
+                    detail=f"Unsupported Content-Type, expected {NDJSON_MEDIA_TYPE}",
+                )
+
+            return await client.bulk_item_stream(collection_id, method, request)
+
+        router = APIRouter(prefix=app.state.router_prefix)
+        router.add_api_route(
+            name="Bulk Stream Items",
+            path="/collections/{collection_id}/items/bulk-stream",
+            methods=["POST"],
+            endpoint=bulk_item_stream,
+            dependencies=self.route_dependencies,
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        NDJSON_MEDIA_TYPE: {
+                            "schema": {"type": "string", "format": "binary"}
+                        }
+                    },
+                }
+            },
+        )
+        app.include_router(router, tags=["Bulk Transaction Extension"])
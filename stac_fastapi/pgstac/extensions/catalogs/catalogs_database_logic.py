@@ -6,6 +6,7 @@ from urllib.parse import parse_qs, urlparse
 from buildpg import render
 from stac_fastapi.types.errors import NotFoundError
 
+from stac_fastapi.pgstac.cache import invalidate_collection
 from stac_fastapi.pgstac.db import dbfunc
 
 logger = logging.getLogger(__name__)
@@ -238,6 +239,7 @@ class CatalogsDatabaseLogic:
         try:
             async with request.app.state.get_connection(request, "w") as conn:
                 await dbfunc(conn, "create_collection", dict(catalog))
+            invalidate_collection(request, catalog["id"])
             return True
         except Exception as e:
             logger.error(
@@ -286,6 +288,7 @@ class CatalogsDatabaseLogic:
                     item=json.dumps(catalog),
                 )
                 await conn.fetchval(q, *p)
+            invalidate_collection(request, catalog_id)
             logger.info(f"Successfully updated catalog {catalog_id}")
         except Exception as e:
             logger.error(f"Error updating catalog {catalog_id}: {e}", exc_info=True)
@@ -307,6 +310,7 @@ class CatalogsDatabaseLogic:
         try:
             async with request.app.state.get_connection(request, "w") as conn:
                 await dbfunc(conn, "delete_collection", catalog_id)
+            invalidate_collection(request, catalog_id)
             logger.info(f"Successfully deleted catalog {catalog_id}")
         except Exception as e:
             logger.error(f"Error deleting catalog {catalog_id}: {e}", exc_info=True)
@@ -560,6 +564,7 @@ class CatalogsDatabaseLogic:
         try:
             async with request.app.state.get_connection(request, "w") as conn:
                 await dbfunc(conn, "create_collection", dict(collection))
+            invalidate_collection(request, collection["id"])
             return True
         except Exception as e:
             logger.error(
@@ -594,6 +599,7 @@ class CatalogsDatabaseLogic:
                     item=json.dumps(collection),
                 )
                 await conn.fetchval(q, *p)
+            invalidate_collection(request, collection_id)
         except Exception as e:
             logger.error(f"Error updating collection {collection_id}: {e}", exc_info=True)
             raise
@@ -640,6 +646,7 @@ class CatalogsDatabaseLogic:
                     item=json.dumps(collection),
                 )
                 await conn.fetchval(q, *p)
+            invalidate_collection(request, collection_id)
 
             logger.info(f"Successfully updated catalog collection {collection_id}")
             return collection
@@ -783,6 +790,7 @@ class CatalogsDatabaseLogic:
                     item=json.dumps(sub_catalog),
                 )
                 await conn.fetchval(q, *p)
+            invalidate_collection(request, sub_catalog_id)
             logger.info(f"Unlinked sub-catalog {sub_catalog_id} from parent {catalog_id}")
         except Exception as e:
             logger.error(f"Error unlinking sub-catalog: {e}", exc_info=True)
@@ -836,6 +844,7 @@ class CatalogsDatabaseLogic:
                     item=json.dumps(collection),
                 )
                 await conn.fetchval(q, *p)
+            invalidate_collection(request, collection_id)
             logger.info(f"Unlinked collection {collection_id} from catalog {catalog_id}")
         except Exception as e:
             logger.error(f"Error unlinking collection: {e}", exc_info=True)
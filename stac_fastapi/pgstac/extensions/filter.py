@@ -2,11 +2,12 @@
 
 from typing import Any
 
-from buildpg import render
 from fastapi import Request
 from stac_fastapi.extensions.filter.client import AsyncBaseFiltersClient
 from stac_fastapi.types.errors import NotFoundError
 
+from stac_fastapi.pgstac.queries import GET_QUERYABLES
+
 
 class FiltersClient(AsyncBaseFiltersClient):
     """Defines a pattern for implementing the STAC filter extension."""
@@ -26,13 +27,7 @@ class FiltersClient(AsyncBaseFiltersClient):
         https://github.com/radiantearth/stac-api-spec/tree/master/fragments/filter#queryables
         """
         async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                    SELECT * FROM get_queryables(:collection::text);
-                """,
-                collection=collection_id,
-            )
-            queryables = await conn.fetchval(q, *p)
+            queryables = await GET_QUERYABLES.fetchval(conn, collection=collection_id)
             if not queryables:
                 raise NotFoundError(f"Collection {collection_id} not found")
 
@@ -0,0 +1,70 @@
+"""Asynchronous ingestion jobs extension."""
+
+import uuid
+from collections.abc import Sequence
+from typing import Annotated
+
+import attr
+from fastapi import APIRouter, FastAPI, Path, Request
+from fastapi.params import Depends
+from stac_fastapi.types.extension import ApiExtension
+
+from stac_fastapi.pgstac.jobs import get_job
+
+
+@attr.s
+class JobsExtension(ApiExtension):
+    """Asynchronous ingestion jobs extension.
+
+    Bulk transactions (`POST /collections/{collection_id}/bulk_items`) sent with a
+    `Prefer: respond-async` header are accepted with a `202 Accepted` response, and
+    written by a background job. This extension adds the `GET /jobs/{job_id}`
+    endpoint (the `Location` of the `202` response), returning the state of a job:
+
+        {
+            "id": "…",
+            "collection": "…",
+            "method": "insert",
+            "status": "running",
+            "total": 2500,
+            "written": 1000,
+            "failed": 0,
+            "errors": [],
+            "created": "…",
+            "updated": "…"
+        }
+
+    `status` is one of "accepted", "running", "completed" or "failed" (the job
+    stopped on an error). `errors` lists the `id` and `error` of the failed items.
+    """
+
+    conformance_classes: list[str] = attr.ib(factory=list)
+    schema_href: str | None = attr.ib(default=None)
+    route_dependencies: Sequence[Depends] | None = attr.ib(default=None)
+
+    def register(self, app: FastAPI) -> None:
+        """Register the extension with a FastAPI application.
+
+        Args:
+            app: target FastAPI application.
+
+        Returns:
+            None
+        """
+
+        async def get_job_endpoint(
+            request: Request,
+            job_id: Annotated[uuid.UUID, Path(description="Job ID")],
+        ):
+            """Get the state of an asynchronous ingestion job."""
+            return await get_job(request, job_id)
+
+        router = APIRouter(prefix=app.state.router_prefix)
+        router.add_api_route(
+            name="Get Job",
+            path="/jobs/{job_id}",
+            methods=["GET"],
+            endpoint=get_job_endpoint,
+            dependencies=self.route_dependencies,
+        )
+        app.include_router(router, tags=["Jobs Extension"])
@@ -0,0 +1,293 @@
+"""Asynchronous ingestion jobs."""
+
+import asyncio
+import logging
+import uuid
+from typing import Any
+
+import attr
+import orjson
+from asyncpg import Connection, exceptions
+from fastapi import FastAPI, HTTPException, Request
+from stac_fastapi.extensions.bulk_transactions import BulkTransactionMethod
+from stac_fastapi.types.errors import NotFoundError
+
+from stac_fastapi.pgstac.cache import invalidate_items
+from stac_fastapi.pgstac.db import CONNECTION_ERRORS, dbfunc
+from stac_fastapi.pgstac.queries import GET_JOB, INSERT_JOB, UPDATE_JOB
+
+logger = logging.getLogger(__name__)
+
+# State of the jobs. Created (in the first schema of the `search_path`) on first use
+# if missing and the role is allowed to, or beforehand by the database administrator.
+JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS stac_fastapi_jobs (
+    id uuid PRIMARY KEY,
+    collection text NOT NULL,
+    method text NOT NULL,
+    status text NOT NULL,
+    total int NOT NULL,
+    written int NOT NULL DEFAULT 0,
+    failed int NOT NULL DEFAULT 0,
+    errors jsonb NOT NULL DEFAULT '[]',
+    created timestamptz NOT NULL DEFAULT now(),
+    updated timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# pgstac functions writing items with the semantic of a bulk method
+BATCH_FUNCTIONS = {
+    BulkTransactionMethod.INSERT: "create_items",
+    BulkTransactionMethod.UPSERT: "upsert_items",
+}
+ITEM_FUNCTIONS = {
+    BulkTransactionMethod.INSERT: "create_item",
+    BulkTransactionMethod.UPSERT: "upsert_item",
+}
+
+
+class JobsUnavailableError(Exception):
+    """The jobs table doesn't exist, and can't be created."""
+
+
+@attr.s
+class Job:
+    """An ingestion job: items of a collection to write with a bulk method."""
+
+    request: Request = attr.ib()
+    collection_id: str = attr.ib()
+    method: BulkTransactionMethod = attr.ib()
+    items: list[dict[str, Any]] = attr.ib()
+    id: uuid.UUID = attr.ib(factory=uuid.uuid4)
+
+
+@attr.s
+class JobQueue:
+    """A bounded queue of ingestion jobs, run by background workers.
+
+    Jobs are recorded in the `stac_fastapi_jobs` table when submitted, then run by
+    `workers` tasks, writing their items `batch_size` at a time. The progress of a
+    job (number of items written and failed, with the error of each failed item) is
+    recorded after each batch.
+
+    The items of the queued jobs are kept in the process memory: the jobs of a
+    process which stops are lost (and stay `accepted` or `running`).
+
+    Attributes:
+        maxsize: maximum number of jobs waiting to be run.
+        workers: number of jobs run concurrently.
+        batch_size: number of items written at once.
+        retry_after: number of seconds sent in the `Retry-After` header of the
+            requests rejected because the queue is full.
+    """
+
+    maxsize: int = attr.ib(default=100)
+    workers: int = attr.ib(default=2)
+    batch_size: int = attr.ib(default=1000)
+    retry_after: int = attr.ib(default=1)
+    _queue: asyncio.Queue = attr.ib(init=False)
+    _tasks: list[asyncio.Task] = attr.ib(init=False, factory=list)
+    _reserved: int = attr.ib(init=False, default=0)
+
+    @_queue.default
+    def _create_queue(self) -> asyncio.Queue:
+        return asyncio.Queue(maxsize=self.maxsize)
+
+    def __len__(self) -> int:
+        """Return the number of jobs waiting to be run."""
+        return self._queue.qsize()
+
+    def _overloaded(self) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Service overloaded, too many ingestion jobs waiting",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def _record(self, conn: Connection, job: Job) -> None:
+        kwargs = {
+            "id": job.id,
+            "collection": job.collection_id,
+            "method": job.method.value,
+            "total": len(job.items),
+        }
+        try:
+            await INSERT_JOB.fetchval(conn, **kwargs)
+            return
+        except exceptions.UndefinedTableError:
+            pass
+
+        try:
+            await conn.execute(JOBS_TABLE)
+        except (exceptions.UniqueViolationError, exceptions.DuplicateTableError):
+            # Created concurrently (e.g by another process)
+            pass
+        except exceptions.InsufficientPrivilegeError as e:
+            raise JobsUnavailableError(
+                "The stac_fastapi_jobs table doesn't exist and can't be created"
+            ) from e
+
+        await INSERT_JOB.fetchval(conn, **kwargs)
+
+    async def submit(self, job: Job) -> None:
+        """Record and queue a job.
+
+        Raises `JobsUnavailableError` if the jobs table doesn't exist and can't be
+        created.
+        """
+        # Reserve a slot of the queue while the job is recorded, so concurrent
+        # submissions can't exceed its size.
+        if 0 < self.maxsize <= self._queue.qsize() + self._reserved:
+            raise self._overloaded()
+
+        request = job.request
+        self._reserved += 1
+        try:
+            async with request.app.state.get_connection(request, "w") as conn:
+                await self._record(conn, job)
+        finally:
+            self._reserved -= 1
+
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            async with request.app.state.get_connection(request, "w") as conn:
+                await UPDATE_JOB.fetchval(
+                    conn,
+                    id=job.id,
+                    status="failed",
+                    written=0,
+                    failed=0,
+                    errors=orjson.dumps([{"error": "Too many jobs waiting"}]).decode(),
+                )
+            raise self._overloaded() from None
+
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._work()) for _ in range(max(self.workers, 1))
+            ]
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception:
+                logger.exception(f"Ingestion job {job.id} failed")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        request = job.request
+        get_connection = request.app.state.get_connection
+        try:
+            for i in range(0, len(job.items), self.batch_size):
+                batch = job.items[i : i + self.batch_size]
+                async with get_connection(request, "w") as conn:
+                    errors = await self._write(conn, job.method, batch)
+                    await UPDATE_JOB.fetchval(
+                        conn,
+                        id=job.id,
+                        status="running",
+                        written=len(batch) - len(errors),
+                        failed=len(errors),
+                        errors=orjson.dumps(errors).decode(),
+                    )
+
+                invalidate_items(request, job.collection_id)
+
+            status, errors = "completed", []
+
+        except Exception as err:
+            status, errors = "failed", [{"error": str(err)}]
+
+        async with get_connection(request, "w") as conn:
+            await UPDATE_JOB.fetchval(
+                conn,
+                id=job.id,
+                status=status,
+                written=0,
+                failed=0,
+                errors=orjson.dumps(errors).decode(),
+            )
+
+    async def _write(
+        self,
+        conn: Connection,
+        method: BulkTransactionMethod,
+        items: list[dict[str, Any]],
+    ) -> list[dict[str, Any]]:
+        """Write a batch of items, returning the errors of the failed items."""
+        try:
+            await dbfunc(conn, BATCH_FUNCTIONS[method], items)
+            return []
+        except CONNECTION_ERRORS:
+            raise
+        except Exception as err:
+            if len(items) == 1:
+                return [_item_error(items[0], err)]
+
+        # Find which items failed the batch
+        errors = []
+        for item in items:
+            try:
+                await dbfunc(conn, ITEM_FUNCTIONS[method], item)
+            except CONNECTION_ERRORS:
+                raise
+            except Exception as err:
+                errors.append(_item_error(item, err))
+
+        return errors
+
+    async def close(self) -> None:
+        """Stop the workers."""
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def _item_error(item: dict[str, Any], err: Exception) -> dict[str, Any]:
+    # The errors translated by `translate_pgstac_errors` have no message of their own
+    return {"id": item.get("id"), "error": str(err) or str(err.__cause__)}
+
+
+def get_job_queue(app: FastAPI) -> JobQueue:
+    """Return the ingestion jobs queue of the application.
+
+    The queue is created on first use, following the `job_queue_size`,
+    `job_workers` and `job_batch_size` application settings.
+    """
+    queue = getattr(app.state, "job_queue", None)
+    if queue is None:
+        settings = app.state.settings
+        queue = JobQueue(
+            maxsize=settings.job_queue_size,
+            workers=settings.job_workers,
+            batch_size=settings.job_batch_size,
+        )
+        app.state.job_queue = queue
+
+    return queue
+
+
+async def close_job_queue(app: FastAPI) -> None:
+    """Stop the workers of the ingestion jobs queue of the application, if any."""
+    if (queue := getattr(app.state, "job_queue", None)) is not None:
+        await queue.close()
+        app.state.job_queue = None
+
+
+async def get_job(request: Request, job_id: uuid.UUID) -> dict[str, Any]:
+    """Return the state of an ingestion job."""
+    async with request.app.state.get_connection(request, "w") as conn:
+        try:
+            job = await GET_JOB.fetchval(conn, id=job_id)
+        except exceptions.UndefinedTableError:
+            job = None
+
+    if job is None:
+        raise NotFoundError(f"Job {job_id} does not exist.")
+
+    return job
@@ -0,0 +1,310 @@
+"""Middlewares."""
+
+import hashlib
+import logging
+from typing import Any
+
+import orjson
+from asyncpg import exceptions
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from stac_fastapi.pgstac.queries import (
+    CLAIM_IDEMPOTENCY_KEY,
+    GET_IDEMPOTENCY_KEY,
+    RELEASE_IDEMPOTENCY_KEY,
+    STORE_IDEMPOTENCY_KEY,
+    Query,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStatusMiddleware:
+    """Add a `Cache-Status` header to the responses which used an API cache.
+
+    Endpoints using a cache set its status on the request state
+    (`request.state.cache_status`): `hit`, `miss`, or `stored` for a miss whose
+    response was stored in the cache.
+
+    ref: https://www.rfc-editor.org/rfc/rfc9211
+    """
+
+    def __init__(self, app: ASGIApp, cache_name: str = "stac-fastapi-pgstac") -> None:
+        """Create the middleware."""
+        self.app = app
+        self.cache_name = cache_name
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle call."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Make sure the request state is shared with the endpoints
+        state = scope.setdefault("state", {})
+
+        async def send_with_cache_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status = state.get("cache_status")
+                if status is not None:
+                    headers = MutableHeaders(scope=message)
+                    if status == "hit":
+                        headers.append("Cache-Status", f"{self.cache_name}; hit")
+                    elif status == "stored":
+                        headers.append(
+                            "Cache-Status", f"{self.cache_name}; fwd=miss; stored"
+                        )
+                    else:
+                        headers.append("Cache-Status", f"{self.cache_name}; fwd={status}")
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_status)
+
+
+# Outcome of the write requests sent with an `Idempotency-Key`. Created (in the first
+# schema of the `search_path`) on first use if missing and the role is allowed to, or
+# beforehand by the database administrator.
+IDEMPOTENCY_KEYS_TABLE = """
+CREATE TABLE IF NOT EXISTS stac_fastapi_idempotency_keys (
+    key text NOT NULL,
+    method text NOT NULL,
+    path text NOT NULL,
+    request_hash text,
+    status_code int,
+    headers jsonb,
+    body bytea,
+    created timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (key, method, path)
+);
+"""
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+class IdempotencyKeysUnavailableError(Exception):
+    """The idempotency keys table doesn't exist, and can't be created."""
+
+
+class _RequestBody:
+    """Hash the body of a request as it is received."""
+
+    def __init__(self, receive: Receive) -> None:
+        self._receive = receive
+        self._digest = hashlib.sha256()
+        self.complete = False
+        self.disconnected = False
+
+    async def receive(self) -> Message:
+        message = await self._receive()
+        if message["type"] == "http.request":
+            self._digest.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                self.complete = True
+        elif message["type"] == "http.disconnect":
+            self.disconnected = True
+
+        return message
+
+    async def drain(self) -> None:
+        """Receive (and hash) the part of the body not read by the application."""
+        while not self.complete and not self.disconnected:
+            await self.receive()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+class IdempotencyMiddleware:
+    """Replay the outcome of the write requests sent with an `Idempotency-Key` header.
+
+    The first request with a key (for a method and path) is processed, and its
+    response is recorded with a hash of the request body, in the
+    `stac_fastapi_idempotency_keys` table. A retry with the same key and body gets
+    the recorded response (with an `Idempotent-Replayed: true` header), without
+    running the request again: e.g. retrying a bulk insertion which timed out doesn't
+    fail with a conflict, nor writes the items twice.
+
+    A key is rejected with a `409 Conflict` while its first request is processed, and
+    with a `422 Unprocessable Content` when reused with a different body. Server
+    errors (5xx) are not recorded, so the request can be retried. Keys expire after
+    `ttl` seconds. When the table doesn't exist and can't be created, the requests are
+    processed without the `Idempotency-Key` support.
+
+    ref: https://datatracker.ietf.org/doc/draft-ietf-httpapi-idempotency-key-header/
+    """
+
+    methods = ("POST", "PUT", "PATCH", "DELETE")
+
+    def __init__(self, app: ASGIApp, ttl: float = 86400) -> None:
+        """Create the middleware."""
+        self.app = app
+        self.ttl = ttl
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle call."""
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            # Searches are not writes
+            or (scope["method"] == "POST" and scope["path"].endswith("/search"))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            response: Response = _error_response(
+                400,
+                "InvalidParameterValue",
+                "Idempotency-Key must be between 1 and "
+                f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters.",
+            )
+            await response(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        ident = {"key": key, "method": scope["method"], "path": scope["path"]}
+        body = _RequestBody(receive)
+        try:
+            claimed = await self._fetch(
+                request, CLAIM_IDEMPOTENCY_KEY, ttl=self.ttl, **ident
+            )
+            if claimed is None:
+                response = await self._replay(request, ident, body)
+                await response(scope, body.receive, send)
+                return
+        except HTTPException as e:
+            # e.g. the write connections are overloaded
+            response = JSONResponse(
+                {"detail": e.detail}, status_code=e.status_code, headers=e.headers
+            )
+            await response(scope, receive, send)
+            return
+        except IdempotencyKeysUnavailableError as e:
+            logger.warning(f"Ignoring Idempotency-Key: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        await self._process(scope, request, ident, body, send)
+
+    async def _fetch(self, request: Request, query: Query, **kwargs: Any) -> Any:
+        async with request.app.state.get_connection(request, "w") as conn:
+            try:
+                return await query.fetchrow(conn, **kwargs)
+            except exceptions.UndefinedTableError:
+                pass
+
+            try:
+                await conn.execute(IDEMPOTENCY_KEYS_TABLE)
+            except (exceptions.UniqueViolationError, exceptions.DuplicateTableError):
+                # Created concurrently (e.g by another process)
+                pass
+            except exceptions.InsufficientPrivilegeError as e:
+                raise IdempotencyKeysUnavailableError(
+                    "The stac_fastapi_idempotency_keys table doesn't exist and can't "
+                    "be created"
+                ) from e
+
+            return await query.fetchrow(conn, **kwargs)
+
+    async def _replay(
+        self, request: Request, ident: dict[str, str], body: _RequestBody
+    ) -> Response:
+        outcome = await self._fetch(request, GET_IDEMPOTENCY_KEY, **ident)
+        if outcome is None or outcome["status_code"] is None:
+            return _error_response(
+                409,
+                "ConflictError",
+                "A request with this Idempotency-Key is being processed.",
+            )
+
+        await body.drain()
+        if body.hexdigest() != outcome["request_hash"]:
+            return _error_response(
+                422,
+                "IdempotencyKeyMismatch",
+                "Idempotency-Key was already used for a different request.",
+            )
+
+        response = Response(outcome["body"], status_code=outcome["status_code"])
+        response.raw_headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in outcome["headers"]
+        ]
+        response.raw_headers.append((b"idempotent-replayed", b"true"))
+        return response
+
+    async def _process(
+        self,
+        scope: Scope,
+        request: Request,
+        ident: dict[str, str],
+        body: _RequestBody,
+        send: Send,
+    ) -> None:
+        status_code = 500
+        headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+        stored = False
+
+        async def send_recording(message: Message) -> None:
+            nonlocal status_code, headers, stored
+            if message["type"] == "http.response.start":
+                # The body is part of the request hash, even if not read by the endpoint
+                await body.drain()
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                # Record the outcome before the client gets it, so a retry replays it
+                if (
+                    not message.get("more_body", False)
+                    and status_code < 500
+                    and body.complete
+                ):
+                    try:
+                        await self._fetch(
+                            request,
+                            STORE_IDEMPOTENCY_KEY,
+                            request_hash=body.hexdigest(),
+                            status_code=status_code,
+                            headers=orjson.dumps(
+                                [
+                                    [name.decode("latin-1"), value.decode("latin-1")]
+                                    for name, value in headers
+                                ]
+                            ).decode(),
+                            body=b"".join(chunks),
+                            **ident,
+                        )
+                        stored = True
+                    except Exception:
+                        logger.exception("Could not record the Idempotency-Key outcome")
+
+            await send(message)
+
+        try:
+            await self.app(scope, body.receive, send_recording)
+        finally:
+            if not stored:
+                # Release the key, so the request can be retried
+                try:
+                    await self._fetch(request, RELEASE_IDEMPOTENCY_KEY, **ident)
+                except Exception:
+                    logger.exception("Could not release the Idempotency-Key")
+
+
+def _error_response(status_code: int, code: str, description: str) -> JSONResponse:
+    return JSONResponse(
+        {"code": code, "description": description}, status_code=status_code
+    )
@@ -24,7 +24,12 @@ from stac_fastapi.extensions.third_party import BulkTransactionExtension
 from stac_fastapi.types.extension import ApiExtension
 
 from stac_fastapi.pgstac.config import Settings
-from stac_fastapi.pgstac.extensions import FreeTextExtension, QueryExtension
+from stac_fastapi.pgstac.extensions import (
+    BulkStreamExtension,
+    FreeTextExtension,
+    JobsExtension,
+    QueryExtension,
+)
 from stac_fastapi.pgstac.extensions.filter import FiltersClient
 from stac_fastapi.pgstac.transactions import BulkTransactionsClient, TransactionsClient
 
@@ -143,6 +148,11 @@ class Extensions:
             extensions_enabled.append(
                 BulkTransactionExtension(client=BulkTransactionsClient()),
             )
+            extensions_enabled.append(
+                BulkStreamExtension(client=BulkTransactionsClient()),
+            )
+            if self.settings.enable_jobs_extension:
+                extensions_enabled.append(JobsExtension())
         return extensions_enabled
 
     @property
@@ -13,12 +13,28 @@ from starlette.requests import Request
 # Instead they are dynamically generated when querying the database using the classes defined below
 INFERRED_LINK_RELS = ["self", "item", "parent", "collection", "root", "items", "child"]
 
+# Characters which `urljoin` would interpret (or strip) when found in an id. Hrefs for
+# ids containing them can't be built by simple string formatting.
+URL_RESERVED_ID_CHARS = frozenset("/?#;\t\n\r")
+
 
 def filter_links(links: list[dict]) -> list[dict]:
     """Remove inferred links."""
     return [link for link in links if link["rel"] not in INFERRED_LINK_RELS]
 
 
+async def get_request_json(request: Request) -> Any:
+    """Get the parsed JSON body of the request.
+
+    The body is parsed only once per request and stored in the request state, so
+    it is shared by every link generator (and `Request` instance) of a response.
+    """
+    if not hasattr(request.state, "json_body"):
+        request.state.json_body = await request.json()
+
+    return request.state.json_body
+
+
 def merge_params(url: str, newparams: dict) -> str:
     """Merge url parameters."""
     u = urlparse(url)
@@ -115,9 +131,8 @@ class BaseLinks:
         Get the links object for a stac resource by iterating through
         available methods on this class that start with link_.
         """
-        # TODO: Pass request.json() into function so this doesn't need to be coroutine
         if self.request.method == "POST":
-            self._body = await self.request.json()
+            self._body = await get_request_json(self.request)
 
         # join passed in links with generated links
         # and update relative paths
@@ -343,3 +358,82 @@ class ItemLinks(CollectionLinksBase):
     def link_collection(self) -> dict:
         """Create the `collection` link."""
         return self.collection_link()
+
+
+@attr.s
+class ItemLinksBuilder:
+    """Create inferred links for the items of a response.
+
+    Produces the same links as `ItemLinks`, but the base url is resolved only once
+    per request and the collection/item hrefs are created from pre-compiled string
+    templates, avoiding the per-item reflection and url joining done by
+    `BaseLinks.create_links`.
+    """
+
+    request: Request = attr.ib()
+    base_url: str = attr.ib(init=False)
+    _collection_href: str = attr.ib(init=False)
+    _item_href: str = attr.ib(init=False)
+
+    def __attrs_post_init__(self):
+        """Resolve the base url and compile the href templates."""
+        self.base_url = get_base_url(self.request)
+        collections_url = urljoin(self.base_url, "collections/")
+        collections_url = collections_url.replace("{", "{{").replace("}", "}}")
+        self._collection_href = collections_url + "{collection_id}"
+        self._item_href = collections_url + "{collection_id}/items/{item_id}"
+
+    @staticmethod
+    def _is_plain_id(id: str) -> bool:
+        """Check if the id can be appended to a url without being resolved."""
+        return id not in (".", "..") and URL_RESERVED_ID_CHARS.isdisjoint(id)
+
+    def get_links(
+        self,
+        collection_id: str,
+        item_id: str,
+        extra_links: list[dict[str, Any]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Generate all the links of an item."""
+        if self._is_plain_id(collection_id) and self._is_plain_id(item_id):
+            collection_href = self._collection_href.format(collection_id=collection_id)
+            self_href = self._item_href.format(
+                collection_id=collection_id, item_id=item_id
+            )
+        else:
+            collection_href = urljoin(self.base_url, f"collections/{collection_id}")
+            self_href = urljoin(
+                self.base_url, f"collections/{collection_id}/items/{item_id}"
+            )
+
+        links = [
+            {
+                "rel": Relations.collection.value,
+                "type": MimeTypes.json.value,
+                "href": collection_href,
+            },
+            {
+                "rel": Relations.parent.value,
+                "type": MimeTypes.json.value,
+                "href": collection_href,
+            },
+            {
+                "rel": Relations.root.value,
+                "type": MimeTypes.json.value,
+                "href": self.base_url,
+            },
+            {
+                "rel": Relations.self.value,
+                "type": MimeTypes.geojson.value,
+                "href": self_href,
+            },
+        ]
+
+        if extra_links:
+            links += [
+                {**link, "href": urljoin(self.base_url, str(link["href"]))}
+                for link in extra_links
+                if link["rel"] not in INFERRED_LINK_RELS
+            ]
+
+        return links
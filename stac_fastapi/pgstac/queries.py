@@ -0,0 +1,217 @@
+"""Fixed SQL statements of the API.
+
+The statements are rendered once, at import time, and run with positional
+parameters. asyncpg prepares the statements it runs as named server-side prepared
+statements, cached per connection (see the `db_statement_cache_size` setting), and
+keyed on their SQL text: each statement is parsed and planned once per connection
+instead of once per request.
+"""
+
+import re
+from typing import Any
+
+import attr
+from asyncpg import Connection
+from asyncpg.cursor import CursorFactory
+from buildpg import render
+
+# Named parameters (`:name`) of a statement, as matched by `buildpg.render`.
+PARAM_REGEX = re.compile(r"(?<!:):([a-z][a-z\d_]*)", flags=re.A)
+
+
+@attr.s(frozen=True)
+class Query:
+    """A SQL statement rendered once.
+
+    Attributes:
+        sql: the SQL statement, with positional parameters (`$1`, `$2`, ...).
+        params: the names of the positional parameters, in order.
+    """
+
+    sql: str = attr.ib()
+    params: tuple[str, ...] = attr.ib()
+
+    @classmethod
+    def from_template(cls, template: str) -> "Query":
+        """Render a statement using named parameters (e.g `:collection_id`)."""
+        names = dict.fromkeys(PARAM_REGEX.findall(template))
+        # Render the parameter names as values to get the order of the positional
+        # parameters (a parameter used twice is rendered once).
+        sql, values = render(template, **{name: name for name in names})
+        return cls(sql=sql, params=tuple(values))
+
+    def args(self, **kwargs: Any) -> list[Any]:
+        """Return the positional arguments of the statement."""
+        return [kwargs[name] for name in self.params]
+
+    async def fetchval(self, conn: Connection, **kwargs: Any) -> Any:
+        """Run the statement and return the first column of the first row."""
+        return await conn.fetchval(self.sql, *self.args(**kwargs))
+
+    async def fetchrow(self, conn: Connection, **kwargs: Any) -> Any:
+        """Run the statement and return the first row."""
+        return await conn.fetchrow(self.sql, *self.args(**kwargs))
+
+    def cursor(self, conn: Connection, **kwargs: Any) -> CursorFactory:
+        """Return a cursor over the rows of the statement."""
+        return conn.cursor(self.sql, *self.args(**kwargs))
+
+
+GET_VERSION = Query.from_template("SELECT pgstac.get_version();")
+
+GET_COLLECTION = Query.from_template("SELECT * FROM get_collection(:id::text);")
+
+COLLECTION_SEARCH = Query.from_template(
+    "SELECT * FROM collection_search(:req::text::jsonb);"
+)
+
+COLLECTION_BASE_ITEM = Query.from_template(
+    "SELECT * FROM collection_base_item(:collection_id::text);"
+)
+
+GET_QUERYABLES = Query.from_template("SELECT * FROM get_queryables(:collection::text);")
+
+SEARCH = Query.from_template("SELECT * FROM search(:req::text::jsonb);")
+
+# The page of a search, with the features encoded (without their links) by the
+# database and the links of each feature to resolve within the API.
+SEARCH_PASSTHROUGH = Query.from_template(
+    """
+    SELECT
+        s.r - 'features',
+        coalesce(f.features, '{}'),
+        coalesce(f.refs, '[]'::jsonb)
+    FROM
+        search(:req::text::jsonb) s(r),
+        LATERAL (
+            SELECT
+                array_agg(
+                    convert_to((e.f - 'links')::text, 'UTF8')
+                    ORDER BY e.n
+                ) AS features,
+                jsonb_agg(
+                    jsonb_build_array(
+                        e.f->'collection', e.f->'id', e.f->'links'
+                    )
+                    ORDER BY e.n
+                ) AS refs
+            FROM jsonb_array_elements(s.r->'features') WITH ORDINALITY e(f, n)
+        ) f;
+    """
+)
+
+# All the items of a search, to stream with a server-side cursor.
+SEARCH_ROWS = Query.from_template(
+    """
+    SELECT format_item(i, :fields::text::jsonb, :hydrate)
+    FROM
+        search_query(:req::text::jsonb) s,
+        search_rows(s._where, s.orderby, NULL, :limit) i;
+    """
+)
+
+# The type of the collection, its base item when hydrating within the API (and not
+# cached), and the item (NULL if the collection or the item doesn't exist).
+GET_ITEM = Query.from_template(
+    """
+    SELECT
+        c.content->>'type',
+        CASE WHEN :base_item::boolean THEN c.base_item END,
+        (
+            SELECT
+                CASE
+                    WHEN :api_hydrate::boolean THEN content_nonhydrated(i)
+                    ELSE content_hydrate(i, c)
+                END
+            FROM items i
+            WHERE i.collection = :collection_id::text
+            AND i.id = :item_id::text
+        )
+    FROM collections c
+    WHERE c.id = :collection_id::text;
+    """
+)
+
+GET_HYDRATED_ITEM = Query.from_template(
+    "SELECT * FROM get_item(:item_id::text, :collection_id::text);"
+)
+
+# Serialize the read-modify-write transactions of an item (e.g patches). A row lock
+# doesn't: pgstac updates an item by deleting and inserting it again.
+LOCK_ITEM = Query.from_template(
+    """
+    SELECT pg_advisory_xact_lock(
+        hashtextextended(:collection_id::text || '/' || :item_id::text, 0)
+    );
+    """
+)
+
+DELETE_ITEM = Query.from_template(
+    "SELECT * FROM delete_item(:item::text, :collection::text);"
+)
+
+# Asynchronous ingestion jobs (see `jobs.JOBS_TABLE`)
+INSERT_JOB = Query.from_template(
+    """
+    INSERT INTO stac_fastapi_jobs (id, collection, method, status, total)
+    VALUES (:id::uuid, :collection::text, :method::text, 'accepted', :total::int);
+    """
+)
+
+UPDATE_JOB = Query.from_template(
+    """
+    UPDATE stac_fastapi_jobs
+    SET
+        status = :status::text,
+        written = written + :written::int,
+        failed = failed + :failed::int,
+        errors = errors || :errors::text::jsonb,
+        updated = now()
+    WHERE id = :id::uuid;
+    """
+)
+
+GET_JOB = Query.from_template(
+    "SELECT to_jsonb(j) FROM stac_fastapi_jobs j WHERE j.id = :id::uuid;"
+)
+
+# Idempotency keys of the write requests (see `middleware.IDEMPOTENCY_KEYS_TABLE`).
+# A key is claimed if new, or if its previous request expired.
+CLAIM_IDEMPOTENCY_KEY = Query.from_template(
+    """
+    INSERT INTO stac_fastapi_idempotency_keys AS k (key, method, path)
+    VALUES (:key::text, :method::text, :path::text)
+    ON CONFLICT (key, method, path) DO UPDATE
+    SET request_hash = NULL, status_code = NULL, headers = NULL, body = NULL,
+        created = now()
+    WHERE k.created < now() - make_interval(secs => :ttl::float8)
+    RETURNING true;
+    """
+)
+
+GET_IDEMPOTENCY_KEY = Query.from_template(
+    """
+    SELECT request_hash, status_code, headers, body
+    FROM stac_fastapi_idempotency_keys
+    WHERE key = :key::text AND method = :method::text AND path = :path::text;
+    """
+)
+
+STORE_IDEMPOTENCY_KEY = Query.from_template(
+    """
+    UPDATE stac_fastapi_idempotency_keys
+    SET
+        request_hash = :request_hash::text,
+        status_code = :status_code::int,
+        headers = :headers::text::jsonb,
+        body = :body::bytea
+    WHERE key = :key::text AND method = :method::text AND path = :path::text;
+    """
+)
+
+RELEASE_IDEMPOTENCY_KEY = Query.from_template(
+    """
+    DELETE FROM stac_fastapi_idempotency_keys
+    WHERE key = :key::text AND method = :method::text AND path = :path::text;
+    """
+)
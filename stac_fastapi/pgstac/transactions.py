@@ -2,11 +2,13 @@
 
 import logging
 import re
+from copy import deepcopy
 from typing import Any, cast
 
 import attr
 import jsonpatch
-from buildpg import render
+import orjson
+from asyncpg import Connection
 from fastapi import HTTPException, Request
 from json_merge_patch import merge
 from stac_fastapi.extensions.bulk_transactions import (
@@ -21,18 +23,44 @@ from stac_fastapi.extensions.transaction.request import (
     PatchOperation,
 )
 from stac_fastapi.types import stac as stac_types
-from stac_fastapi.types.errors import NotFoundError
+from stac_fastapi.types.errors import NotFoundError, StacApiError
 from stac_pydantic import Collection, Item, ItemCollection
-from stac_pydantic.extensions import validate_extensions
 from starlette.responses import JSONResponse, Response
 
+from stac_fastapi.pgstac.batching import get_write_batcher
+from stac_fastapi.pgstac.cache import invalidate_collection, invalidate_items
 from stac_fastapi.pgstac.config import Settings
-from stac_fastapi.pgstac.db import dbfunc
+from stac_fastapi.pgstac.db import copy_items, dbfunc
+from stac_fastapi.pgstac.jobs import Job, JobsUnavailableError, get_job_queue
 from stac_fastapi.pgstac.models.links import CollectionLinks, ItemLinks
+from stac_fastapi.pgstac.queries import (
+    DELETE_ITEM,
+    GET_COLLECTION,
+    GET_HYDRATED_ITEM,
+    LOCK_ITEM,
+)
+from stac_fastapi.pgstac.utils import iter_ndjson_lines
+from stac_fastapi.pgstac.validation import (
+    ValidatorRegistry,
+    extensions_errors,
+    get_validator_registry,
+    shared_validator_registry,
+    validate_extensions_batch,
+)
 
 logger = logging.getLogger("uvicorn")
 logger.setLevel(logging.INFO)
 
+# pgstac staging tables loading the items with the semantic of a bulk method
+BULK_STAGING_TABLES = {
+    BulkTransactionMethod.INSERT: "items_staging",
+    BulkTransactionMethod.UPSERT: "items_staging_upsert",
+}
+BULK_METHOD_VERBS = {
+    BulkTransactionMethod.INSERT: "added",
+    BulkTransactionMethod.UPSERT: "upserted",
+}
+
 
 class ClientValidateMixIn:
     def _validate_id(self, id: str, settings: Settings):
@@ -52,29 +80,52 @@ class ClientValidateMixIn:
         | stac_types.Catalog
         | dict[str, Any],
         settings: Settings,
+        registry: ValidatorRegistry | None = None,
     ) -> None:
-        """Validate extensions of the STAC object data."""
+        """Validate extensions of the STAC object data.
+
+        The schemas are compiled by `registry` (the application validator registry,
+        see `validation.get_validator_registry`), or by the registry shared by the
+        callers with the same settings when not set.
+        """
         if not settings.validate_extensions:
             return
 
-        if isinstance(stac_object, dict):
-            if not stac_object.get("stac_extensions"):
-                return
-        else:
-            if not stac_object.stac_extensions:
-                return
+        if registry is None:
+            registry = shared_validator_registry(settings)
 
-        try:
-            validate_extensions(dict(stac_object), reraise_exception=True)
-        except Exception as err:
+        errors = extensions_errors([stac_object], registry)
+        if errors:
+            _, err = errors[0]
+            raise HTTPException(
+                status_code=422,
+                detail=f"STAC Extensions failed validation: {err}",
+            )
+
+    async def _validate_items_extensions(
+        self,
+        request: Request,
+        items: list[stac_types.Item],
+    ) -> None:
+        """Validate extensions of a batch of items."""
+        if not request.app.state.settings.validate_extensions:
+            return
+
+        errors = await validate_extensions_batch(request.app, items)
+        if errors:
             raise HTTPException(
                 status_code=422,
-                detail=f"STAC Extensions failed validation: {err!s}",
-            ) from err
+                detail="STAC Extensions failed validation: "
+                + "; ".join(f"Item ({item_id}): {err}" for item_id, err in errors),
+            )
 
     def _validate_collection(self, request: Request, collection: stac_types.Collection):
         self._validate_id(collection["id"], request.app.state.settings)
-        self._validate_extensions(collection, request.app.state.settings)
+        self._validate_extensions(
+            collection,
+            request.app.state.settings,
+            registry=get_validator_registry(request.app),
+        )
 
     def _validate_item(
         self,
@@ -82,13 +133,23 @@ class ClientValidateMixIn:
         item: stac_types.Item,
         collection_id: str,
         expected_item_id: str | None = None,
+        validate_extensions: bool = True,
     ) -> None:
-        """Validate item."""
+        """Validate item.
+
+        Set `validate_extensions=False` for the items of a batch, whose extensions
+        are validated with `_validate_items_extensions`.
+        """
         body_collection_id = item.get("collection")
         body_item_id = item.get("id")
 
         self._validate_id(body_item_id, request.app.state.settings)
-        self._validate_extensions(item, request.app.state.settings)
+        if validate_extensions:
+            self._validate_extensions(
+                item,
+                request.app.state.settings,
+                registry=get_validator_registry(request.app),
+            )
 
         if item.get("geometry", None) is None:
             raise HTTPException(
@@ -130,12 +191,21 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         if item_dict["type"] == "FeatureCollection":
             valid_items: list[stac_types.Item] = []
             for feature in item_dict["features"]:  # noqa: B020
-                self._validate_item(request, feature, collection_id)
+                self._validate_item(
+                    request, feature, collection_id, validate_extensions=False
+                )
                 feature["collection"] = collection_id
                 valid_items.append(feature)
 
+            await self._validate_items_extensions(request, valid_items)
+
             async with request.app.state.get_connection(request, "w") as conn:
-                await dbfunc(conn, "create_items", valid_items)
+                if request.app.state.settings.use_copy_ingest:
+                    await copy_items(conn, "items_staging", valid_items)
+                else:
+                    await dbfunc(conn, "create_items", valid_items)
+
+            invalidate_items(request, collection_id)
 
             return Response(status_code=201)
 
@@ -144,8 +214,13 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
             self._validate_item(request, item_dict, collection_id)
             item_dict["collection"] = collection_id
 
-            async with request.app.state.get_connection(request, "w") as conn:
-                await dbfunc(conn, "create_item", dict(item_dict))
+            if (batcher := get_write_batcher(request.app)) is not None:
+                await batcher.write(request, dict(item_dict))
+            else:
+                async with request.app.state.get_connection(request, "w") as conn:
+                    await dbfunc(conn, "create_item", dict(item_dict))
+
+            invalidate_items(request, collection_id)
 
             item_dict["links"] = await ItemLinks(
                 collection_id=collection_id,
@@ -168,14 +243,24 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         item: Item,
         **kwargs,
     ) -> stac_types.Item:
-        """Update item."""
+        """Update item.
+
+        The item is written holding the same lock as the patches (see `patch_item`),
+        so an update isn't overwritten by a patch of the previous item.
+        """
         item_dict = cast(stac_types.Item, item.model_dump(mode="json"))
 
         self._validate_item(request, item_dict, collection_id, item_id)
         item_dict["collection"] = collection_id
 
         async with request.app.state.get_connection(request, "w") as conn:
-            await dbfunc(conn, "update_item", dict(item_dict))
+            async with conn.transaction():
+                await LOCK_ITEM.fetchval(
+                    conn, item_id=item_id, collection_id=collection_id
+                )
+                await dbfunc(conn, "update_item", dict(item_dict))
+
+        invalidate_items(request, collection_id)
 
         item_dict["links"] = await ItemLinks(
             collection_id=collection_id,
@@ -199,6 +284,8 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         async with request.app.state.get_connection(request, "w") as conn:
             await dbfunc(conn, "create_collection", dict(collection_dict))
 
+        invalidate_collection(request, collection_dict["id"])
+
         collection_dict["links"] = await CollectionLinks(
             collection_id=collection_dict["id"], request=request
         ).get_links(extra_links=collection_dict["links"])
@@ -219,6 +306,8 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         async with request.app.state.get_connection(request, "w") as conn:
             await dbfunc(conn, "update_collection", dict(collection_dict))
 
+        invalidate_collection(request, collection_dict["id"])
+
         collection_dict["links"] = await CollectionLinks(
             collection_id=collection_dict["id"], request=request
         ).get_links(extra_links=collection_dict.get("links"))
@@ -233,13 +322,10 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         **kwargs,
     ) -> Response:
         """Delete item."""
-        q, p = render(
-            "SELECT * FROM delete_item(:item::text, :collection::text);",
-            item=item_id,
-            collection=collection_id,
-        )
         async with request.app.state.get_connection(request, "w") as conn:
-            await conn.fetchval(q, *p)
+            await DELETE_ITEM.fetchval(conn, item=item_id, collection=collection_id)
+
+        invalidate_items(request, collection_id)
 
         return JSONResponse({"deleted item": item_id})
 
@@ -253,6 +339,8 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         async with request.app.state.get_connection(request, "w") as conn:
             await dbfunc(conn, "delete_collection", collection_id)
 
+        invalidate_collection(request, collection_id)
+
         return JSONResponse({"deleted collection": collection_id})
 
     async def patch_item(  # type: ignore [override]
@@ -263,48 +351,77 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         request: Request,
         **kwargs,
     ) -> stac_types.Item:
-        """Patch Item."""
+        """Patch Item.
+
+        The item is read, patched and written back in a single transaction of the
+        write connection, holding a lock on the item (also taken by `update_item`):
+        concurrent patches of an item are applied one after the other, none of them
+        being lost. The patched item is validated before taking the lock, so fetching
+        the schemas of its extensions doesn't hold it; it is only validated again if
+        the item was modified meanwhile.
+        """
+        async with request.app.state.get_connection(request, "w") as conn:
+            existing = await self._get_item_to_patch(conn, collection_id, item_id)
 
-        # Get Existing Item to Patch
-        async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                SELECT * FROM get_item(:item_id::text, :collection_id::text);
-                """,
-                item_id=item_id,
-                collection_id=collection_id,
-            )
-            existing: stac_types.Item | None = await conn.fetchval(q, *p)
+        item = self._apply_item_patch(existing, patch)
+        self._validate_item(request, item, collection_id, item_id)
+
+        async with request.app.state.get_connection(request, "w") as conn:
+            async with conn.transaction():
+                await LOCK_ITEM.fetchval(
+                    conn, item_id=item_id, collection_id=collection_id
+                )
+                current = await self._get_item_to_patch(conn, collection_id, item_id)
+                if current != existing:
+                    existing = current
+                    item = self._apply_item_patch(existing, patch)
+                    self._validate_item(request, item, collection_id, item_id)
+
+                item["collection"] = collection_id
+
+                # Nothing to write if the patch doesn't change the item
+                changed = item != existing
+                if changed:
+                    await dbfunc(conn, "update_item", dict(item))
+
+        if changed:
+            invalidate_items(request, collection_id)
+
+        item["links"] = await ItemLinks(
+            collection_id=collection_id,
+            item_id=item["id"],
+            request=request,
+        ).get_links(extra_links=item.get("links"))
+
+        return item
 
+    async def _get_item_to_patch(
+        self, conn: Connection, collection_id: str, item_id: str
+    ) -> stac_types.Item:
+        """Get the item to patch."""
+        existing: stac_types.Item | None = await GET_HYDRATED_ITEM.fetchval(
+            conn, item_id=item_id, collection_id=collection_id
+        )
         if existing is None:
             raise NotFoundError(
                 f"Item {item_id} does not exist in collection {collection_id}."
             )
 
-        # Merge Patch with Existing Item
+        return existing
+
+    def _apply_item_patch(
+        self, existing: stac_types.Item, patch: PartialItem | list[PatchOperation]
+    ) -> stac_types.Item:
+        """Merge a patch with an existing item."""
         if isinstance(patch, list):
             patchjson = [op.model_dump(mode="json") for op in patch]
             p = jsonpatch.JsonPatch(patchjson)
-            item = p.apply(existing)
+            return cast(stac_types.Item, p.apply(existing))
         elif isinstance(patch, PartialItem):
             partial = patch.model_dump(mode="json")
-            item = merge(existing, partial)
-        else:
-            raise Exception("Patch must be a list of PatchOperations or a PartialItem.")
-
-        self._validate_item(request, item, collection_id, item_id)
-        item["collection"] = collection_id
-
-        async with request.app.state.get_connection(request, "w") as conn:
-            await dbfunc(conn, "update_item", item)
-
-        item["links"] = await ItemLinks(
-            collection_id=collection_id,
-            item_id=item["id"],
-            request=request,
-        ).get_links(extra_links=item.get("links"))
+            return cast(stac_types.Item, merge(deepcopy(existing), partial))
 
-        return cast(stac_types.Item, item)
+        raise Exception("Patch must be a list of PatchOperations or a PartialItem.")
 
     async def patch_collection(  # type: ignore [override]
         self,
@@ -317,13 +434,9 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
 
         # Get Existing Collection to Patch
         async with request.app.state.get_connection(request, "r") as conn:
-            q, p = render(
-                """
-                SELECT * FROM get_collection(:id::text);
-                """,
-                id=collection_id,
+            existing: stac_types.Collection | None = await GET_COLLECTION.fetchval(
+                conn, id=collection_id
             )
-            existing: stac_types.Collection | None = await conn.fetchval(q, *p)
 
         if existing is None:
             raise NotFoundError(f"Collection {collection_id} does not exist.")
@@ -344,6 +457,8 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
         async with request.app.state.get_connection(request, "w") as conn:
             await dbfunc(conn, "update_collection", col)
 
+        invalidate_collection(request, collection_id)
+
         col["links"] = await CollectionLinks(
             collection_id=col["id"], request=request
         ).get_links(extra_links=col.get("links"))
@@ -355,23 +470,165 @@ class TransactionsClient(AsyncBaseTransactionsClient, ClientValidateMixIn):
 class BulkTransactionsClient(AsyncBaseBulkTransactionsClient, ClientValidateMixIn):
     """Postgres bulk transactions."""
 
-    async def bulk_item_insert(self, items: Items, request: Request, **kwargs) -> str:  # type: ignore [override]
-        """Bulk item insertion using pgstac."""
+    async def _write_items(
+        self,
+        request: Request,
+        method: BulkTransactionMethod,
+        items: list[stac_types.Item],
+    ) -> None:
+        """Write validated items with the semantic of a bulk method."""
+        async with request.app.state.get_connection(request, "w") as conn:
+            if request.app.state.settings.use_copy_ingest:
+                await copy_items(conn, BULK_STAGING_TABLES[method], items)
+            elif method == BulkTransactionMethod.INSERT:
+                await dbfunc(conn, "create_items", items)
+            elif method == BulkTransactionMethod.UPSERT:
+                await dbfunc(conn, "upsert_items", items)
+
+    async def _submit_job(
+        self,
+        request: Request,
+        collection_id: str,
+        method: BulkTransactionMethod,
+        items: list[stac_types.Item],
+    ) -> Response | None:
+        """Write validated items in an asynchronous ingestion job.
+
+        Returns `None` if the jobs are not available, the items being then written
+        synchronously.
+        """
+        job = Job(
+            request=request,
+            collection_id=collection_id,
+            method=method,
+            items=cast(list[dict[str, Any]], items),
+        )
+        try:
+            await get_job_queue(request.app).submit(job)
+        except JobsUnavailableError as e:
+            logger.warning(f"Ignoring Prefer: respond-async: {e}")
+            return None
+
+        return JSONResponse(
+            {"id": str(job.id), "status": "accepted"},
+            status_code=202,
+            headers={
+                "Location": str(request.url_for("Get Job", job_id=str(job.id))),
+                "Preference-Applied": "respond-async",
+            },
+        )
+
+    async def bulk_item_insert(  # type: ignore [override]
+        self, items: Items, request: Request, **kwargs
+    ) -> str | Response:
+        """Bulk item insertion using pgstac.
+
+        With a `Prefer: respond-async` header, and the jobs extension enabled
+        (`enable_jobs_extension`), the items are written by an asynchronous ingestion
+        job, whose state is returned by `GET /jobs/{id}`.
+        """
         collection_id = request.path_params["collection_id"]
 
         for item_id, item in items.items.items():
-            self._validate_item(request, item, collection_id, item_id)
+            self._validate_item(
+                request, item, collection_id, item_id, validate_extensions=False
+            )
             item["collection"] = collection_id
 
         items_to_insert = list(items.items.values())
+        await self._validate_items_extensions(request, items_to_insert)
 
-        async with request.app.state.get_connection(request, "w") as conn:
-            if items.method == BulkTransactionMethod.INSERT:
-                method_verb = "added"
-                await dbfunc(conn, "create_items", items_to_insert)
-            elif items.method == BulkTransactionMethod.UPSERT:
-                method_verb = "upserted"
-                await dbfunc(conn, "upsert_items", items_to_insert)
+        if request.app.state.settings.enable_jobs_extension and (
+            "respond-async" in request.headers.get("Prefer", "")
+        ):
+            response = await self._submit_job(
+                request, collection_id, items.method, items_to_insert
+            )
+            if response is not None:
+                return response
 
+        await self._write_items(request, items.method, items_to_insert)
+
+        invalidate_items(request, collection_id)
+
+        method_verb = BULK_METHOD_VERBS[items.method]
         return_msg = f"Successfully {method_verb} {len(items_to_insert)} items."
         return return_msg
+
+    async def bulk_item_stream(
+        self,
+        collection_id: str,
+        method: BulkTransactionMethod,
+        request: Request,
+        **kwargs,
+    ) -> dict[str, Any]:
+        """Bulk item insertion from a newline-delimited JSON stream.
+
+        The items are read and validated line by line (their extensions batch by
+        batch), and written in batches of `bulk_stream_batch_size` items, so the
+        memory used doesn't depend on the size of the request. Each batch is written
+        in its own transaction: the batches written before an invalid line (or a
+        failed batch) are kept, the error reporting the number of items written.
+        """
+        batch_size = max(request.app.state.settings.bulk_stream_batch_size, 1)
+
+        batches: list[int] = []
+        batch: list[stac_types.Item] = []
+
+        async def flush() -> None:
+            # Report the items written before a failed batch
+            written = (
+                f"Batch {len(batches) + 1} failed, "
+                f"{sum(batches)} items were written before it."
+            )
+            try:
+                await self._validate_items_extensions(request, batch)
+                await self._write_items(request, method, batch)
+            except HTTPException as err:
+                raise HTTPException(
+                    status_code=err.status_code,
+                    detail=f"{err.detail}. {written}",
+                    headers=err.headers,
+                ) from err
+            except StacApiError as err:
+                raise type(err)(f"{err}. {written}") from err
+
+            invalidate_items(request, collection_id)
+            batches.append(len(batch))
+            batch.clear()
+
+        async for lineno, line in iter_ndjson_lines(request.stream()):
+            try:
+                data = orjson.loads(line)
+                if not isinstance(data, dict):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Expected an Item, got {type(data).__name__}",
+                    )
+                item = cast(stac_types.Item, data)
+                self._validate_item(
+                    request, item, collection_id, validate_extensions=False
+                )
+            except (orjson.JSONDecodeError, HTTPException) as err:
+                detail = err.detail if isinstance(err, HTTPException) else str(err)
+                raise HTTPException(
+                    status_code=400,
+                    detail=(
+                        f"Invalid Item at line {lineno}: {detail}. "
+                        f"{sum(batches)} items were written before this line."
+                    ),
+                ) from err
+
+            item["collection"] = collection_id
+            batch.append(item)
+            if len(batch) >= batch_size:
+                await flush()
+
+        if batch:
+            await flush()
+
+        return {
+            "method": method.value,
+            "items": sum(batches),
+            "batches": batches,
+        }
@@ -6,6 +6,8 @@ from typing import Any
 
 from starlette.requests import Request
 
+from stac_fastapi.pgstac.cache import LRUCache, get_cache_generations
+
 
 class BaseItemCache(abc.ABC):
     """
@@ -55,3 +57,53 @@ class DefaultBaseItemCache(BaseItemCache):
                 collection_id,
             )
         return self._base_items[collection_id]
+
+
+def get_shared_base_item_cache(app: Any) -> LRUCache:
+    """Return the process-wide base item cache of the application.
+
+    The cache is created on first use, bounded and expired following the
+    `base_item_cache_size` and `base_item_cache_ttl` application settings.
+    """
+    cache = getattr(app.state, "base_item_store", None)
+    if cache is None:
+        settings = app.state.settings
+        cache = LRUCache(
+            maxsize=settings.base_item_cache_size,
+            ttl=settings.base_item_cache_ttl,
+        )
+        app.state.base_item_store = cache
+
+    return cache
+
+
+class LRUBaseItemCache(BaseItemCache):
+    """Implementation of the BaseItemCache shared by all the requests of a process.
+
+    Base items are stored in a LRU cache on the application state (`app.state.base_item_store`),
+    bounded by `base_item_cache_size` entries, which expire after `base_item_cache_ttl`
+    seconds. Entries are invalidated when collections are written through the
+    Transactions extension (see `cache.invalidate_collection`).
+    """
+
+    def __init__(
+        self,
+        fetch_base_item: Callable[[str], Coroutine[Any, Any, dict[str, Any]]],
+        request: Request,
+    ):
+        """Initialize the base item cache."""
+        super().__init__(fetch_base_item, request)
+        self._base_items = get_shared_base_item_cache(request.app)
+        self._generations = get_cache_generations(request.app)
+
+    async def get(self, collection_id: str):
+        """Return the base item for the collection and cache by collection id."""
+        base_item = self._base_items.get(collection_id)
+        if base_item is None:
+            # Don't cache a base item read before a write of its collection
+            generation = self._generations.get((collection_id,))
+            base_item = await self._fetch_base_item(collection_id)
+            if self._generations.get((collection_id,)) == generation:
+                self._base_items.set(collection_id, base_item)
+
+        return base_item
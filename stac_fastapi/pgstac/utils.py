@@ -1,7 +1,9 @@
 """stac-fastapi utility methods."""
 
+from collections.abc import AsyncIterable, AsyncIterator
 from typing import Any, cast
 
+import attr
 from stac_fastapi.types.stac import Item
 
 
@@ -49,70 +51,128 @@ def dict_deep_update(merge_to: dict[str, Any], merge_from: dict[str, Any]) -> No
             merge_to[k] = v
 
 
-def include_fields(source: dict[str, Any], fields: set[str]) -> dict[str, Any]:
-    # Build a shallow copy of included fields on an item, or a sub-tree of an item
-    if not fields:
-        return source
+# A tree of the keys selected by dotted field paths (e.g. `properties.eo:cloud_cover`).
+# A `None` node selects the whole value of its key.
+FieldsTree = dict[str, "FieldsTree | None"]
 
-    clean_item: dict[str, Any] = {}
+
+def compile_fields_tree(fields: set[str]) -> FieldsTree:
+    """Compile a set of dotted field paths into a tree of keys.
+
+    Selecting a whole key takes precedence over selecting some of its sub-keys,
+    e.g. `{"properties", "properties.datetime"}` selects the whole `properties`.
+    """
+    tree: FieldsTree = {}
     for key_path in fields:
-        key_path_parts = key_path.split(".")
-        key_root = key_path_parts[0]
-        if key_root in source:
-            if isinstance(source[key_root], dict) and len(key_path_parts) > 1:
-                # The root of this key path on the item is a dict, and the
-                # key path indicates a sub-key to be included. Walk the dict
-                # from the root key and get the full nested value to include.
-                value = include_fields(
-                    source[key_root], fields={".".join(key_path_parts[1:])}
-                )
-
-                if isinstance(clean_item.get(key_root), dict):
-                    # A previously specified key and sub-keys may have been included
-                    # already, so do a deep merge update if the root key already exists.
-                    dict_deep_update(clean_item[key_root], value)
-                else:
-                    # The root key does not exist, so add it. Fields
-                    # extension only allows nested referencing on dicts, so
-                    # this won't overwrite anything.
-                    clean_item[key_root] = value
-            else:
-                # The item value to include is not a dict, or, it is a dict but the
-                # key path is for the whole value, not a sub-key. Include the entire
-                # value in the cleaned item.
-                clean_item[key_root] = source[key_root]
+        *key_parents, key_leaf = key_path.split(".")
+
+        node = tree
+        for key in key_parents:
+            sub_tree = node.setdefault(key, {})
+            if sub_tree is None:
+                # The parent key is already selected as a whole
+                break
+            node = sub_tree
         else:
-            # The key, or root key of a multi-part key, is not present in the item,
-            # so it is ignored
-            pass
+            node[key_leaf] = None
+
+    return tree
+
+
+def _include_fields_tree(source: dict[str, Any], tree: FieldsTree) -> dict[str, Any]:
+    # Build a shallow copy of included fields on an item, or a sub-tree of an item
+    clean_item: dict[str, Any] = {}
+    for key, sub_tree in tree.items():
+        if key in source:
+            value = source[key]
+            if sub_tree is not None and isinstance(value, dict):
+                # The value is a dict and the tree indicates sub-keys to be included.
+                clean_item[key] = _include_fields_tree(value, sub_tree)
+            else:
+                # The value to include is not a dict, or, it is a dict but the tree
+                # selects the whole value. Include the entire value in the cleaned item.
+                clean_item[key] = value
 
     return clean_item
 
 
-def exclude_fields(source: dict[str, Any], fields: set[str]) -> None:
+def _exclude_fields_tree(source: dict[str, Any], tree: FieldsTree) -> None:
     # For an item built up for included fields, remove excluded fields. This
     # modifies `source` in place.
-    for key_path in fields:
-        key_path_part = key_path.split(".")
-        key_root = key_path_part[0]
-        if key_root in source:
-            if isinstance(source[key_root], dict) and len(key_path_part) > 1:
-                # Walk the nested path of this key to remove the leaf-key
-                exclude_fields(source[key_root], fields={".".join(key_path_part[1:])})
-                # If, after removing the leaf-key, the root is now an empty
+    for key, sub_tree in tree.items():
+        if key in source:
+            value = source[key]
+            if sub_tree is not None and isinstance(value, dict):
+                # Walk the nested keys to remove the leaf-keys
+                _exclude_fields_tree(value, sub_tree)
+                # If, after removing the leaf-keys, the value is now an empty
                 # dict, remove it entirely
-                if not source[key_root]:
-                    del source[key_root]
+                if not value:
+                    del source[key]
             else:
-                # The key's value is not a dict, or there is no sub-key to remove. The
+                # The value is not a dict, or there is no sub-key to remove. The
                 # entire key can be removed from the source.
-                source.pop(key_root, None)
+                del source[key]
+
+
+def include_fields(source: dict[str, Any], fields: set[str]) -> dict[str, Any]:
+    """Build a shallow copy of the included fields of an item, or a sub-tree of an item."""
+    if not fields:
+        return source
+
+    return _include_fields_tree(source, compile_fields_tree(fields))
+
+
+def exclude_fields(source: dict[str, Any], fields: set[str]) -> None:
+    """Remove the excluded fields of an item. This modifies `source` in place."""
+    _exclude_fields_tree(source, compile_fields_tree(fields))
+
+
+@attr.s(frozen=True)
+class FieldsProjection:
+    """Fields extension include/exclude sets, compiled once to filter many items.
+
+    The `exclude` set is expected to be cleaned with `clean_exclude_set`, as done
+    when validating search requests.
+    """
+
+    include: set[str] = attr.ib(factory=set)
+    exclude: set[str] = attr.ib(factory=set)
+    _include_tree: FieldsTree | None = attr.ib(init=False)
+    _exclude_tree: FieldsTree = attr.ib(init=False)
+
+    @_include_tree.default
+    def _compile_include(self) -> FieldsTree | None:
+        return compile_fields_tree(self.include) if self.include else None
+
+    @_exclude_tree.default
+    def _compile_exclude(self) -> FieldsTree:
+        return compile_fields_tree(self.exclude)
+
+    def apply(self, item: Item) -> Item:
+        """Preserve and remove fields of the Item.
+
+        Returns a shallow copy of the Item with the fields filtered.
+        """
+        if not self.include and not self.exclude:
+            return item
+
+        if self._include_tree is None:
+            clean_item = dict(item)
         else:
-            # The key to remove does not exist on the source, so it is ignored
-            pass
+            clean_item = _include_fields_tree(item, self._include_tree)  # type: ignore [arg-type]
 
+        # If, after including all the specified fields, there are no included
+        # properties, return just id and collection.
+        if not clean_item:
+            return Item({"id": item["id"], "collection": item["collection"]})  # type: ignore
 
-def filter_fields(  # noqa: C901
+        _exclude_fields_tree(clean_item, self._exclude_tree)
+
+        return cast(Item, clean_item)
+
+
+def filter_fields(
     item: Item,
     include: set[str],
     exclude: set[str],
@@ -122,18 +182,36 @@ def filter_fields(  # noqa: C901
     Returns a shallow copy of the Item with the fields filtered.
 
     This will not perform a deep copy; values of the original item will be referenced
-    in the return item.
+    in the return item. To filter many items with the same sets, use `FieldsProjection`
+    which compiles the sets only once.
     """
-    if not include and not exclude:
-        return item
+    return FieldsProjection(include=include, exclude=exclude).apply(item)
 
-    clean_item = include_fields(dict(item), include)
 
-    # If, after including all the specified fields, there are no included properties,
-    # return just id and collection.
-    if not clean_item:
-        return Item({"id": item["id"], "collection": item["collection"]})  # type: ignore
+async def iter_ndjson_lines(
+    chunks: AsyncIterable[bytes],
+) -> AsyncIterator[tuple[int, bytes]]:
+    """Split a stream of newline-delimited JSON into its (non-empty) lines.
 
-    exclude_fields(clean_item, exclude)
-
-    return cast(Item, clean_item)
+    Yields the line number (starting at 1) and the content of each line, reading the
+    stream chunk by chunk: only the line being read is kept in memory.
+    """
+    lineno = 0
+    pending: list[bytes] = []
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        for line in lines:
+            lineno += 1
+            if pending:
+                pending.append(line)
+                line = b"".join(pending)
+                pending = []
+            if line.strip():
+                yield lineno, line
+
+        if rest:
+            pending.append(rest)
+
+    line = b"".join(pending)
+    if line.strip():
+        yield lineno + 1, line
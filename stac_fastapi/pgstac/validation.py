@@ -0,0 +1,318 @@
+"""STAC extensions validation of the transactions."""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import tempfile
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import attr
+import orjson
+from fastapi import FastAPI
+
+from stac_fastapi.pgstac.cache import LRUCache
+
+try:
+    import requests
+except ImportError:  # pragma: nocover
+    requests = None  # type: ignore
+
+try:
+    import jsonschema
+    from referencing import Registry, Resource
+    from referencing.jsonschema import DRAFT7
+except ImportError:  # pragma: nocover
+    jsonschema = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+@attr.s
+class SchemaStore:
+    """JSON schemas, by URL.
+
+    The schemas are read from a local directory mirroring their URLs, e.g the
+    `https://stac-extensions.github.io/eo/v1.1.0/schema.json` schema is read from
+    `{directory}/stac-extensions.github.io/eo/v1.1.0/schema.json`. Missing schemas
+    are fetched, if allowed, and written to the directory: a directory filled by a
+    previous run (or shipped with the application) makes the validation work
+    offline.
+
+    Attributes:
+        directory: local directory of the schemas. `None` to always fetch them.
+        fetch: fetch the schemas missing from the directory.
+        timeout: number of seconds to wait for a schema to be fetched.
+    """
+
+    directory: str | None = attr.ib(default=None)
+    fetch: bool = attr.ib(default=True)
+    timeout: float = attr.ib(default=10)
+
+    def path(self, url: str) -> Path | None:
+        """Return the local path of a schema, if any."""
+        if self.directory is None:
+            return None
+
+        root = Path(self.directory).resolve()
+        parts = urlsplit(url)
+        path = (root / parts.netloc / parts.path.lstrip("/")).resolve()
+        # Don't resolve URLs (e.g with `..`) outside of the directory
+        if not path.is_relative_to(root) or path == root:
+            return None
+
+        return path
+
+    def load(self, url: str) -> dict[str, Any]:
+        """Return the schema of a URL."""
+        path = self.path(url)
+        if path is not None and path.is_file():
+            return orjson.loads(path.read_bytes())
+
+        if not self.fetch:
+            raise LookupError(f"Schema {url} not found in {self.directory}")
+
+        assert requests is not None, "requests must be installed to fetch schemas"
+        resp = requests.get(url, timeout=self.timeout)
+        resp.raise_for_status()
+        schema = resp.json()
+
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write atomically, other processes may read the schema
+                with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+                    f.write(orjson.dumps(schema))
+                os.replace(f.name, path)
+            except OSError as err:
+                logger.warning("Could not store schema %s in %s: %s", url, path, err)
+
+        return schema
+
+
+@attr.s
+class ValidatorRegistry:
+    """Compiled validators of the `stac_extensions` schemas, by URL.
+
+    Each schema (and the schemas it references) is loaded from the schema store and
+    checked once, the validators being kept in a LRU cache: validating an object
+    only runs the validators of its extensions.
+
+    Attributes:
+        store: store of the schemas.
+        maxsize: maximum number of validators (and of referenced schemas) kept.
+    """
+
+    store: SchemaStore = attr.ib(factory=SchemaStore)
+    maxsize: int = attr.ib(default=64)
+    _validators: LRUCache = attr.ib(init=False)
+    _schemas: LRUCache = attr.ib(init=False)
+
+    @_validators.default
+    def _create_validators(self) -> LRUCache:
+        return LRUCache(maxsize=self.maxsize)
+
+    @_schemas.default
+    def _create_schemas(self) -> LRUCache:
+        return LRUCache(maxsize=self.maxsize)
+
+    def _schema(self, url: str) -> dict[str, Any]:
+        schema = self._schemas.get(url)
+        if schema is None:
+            schema = self.store.load(url)
+            self._schemas.set(url, schema)
+
+        return schema
+
+    def _retrieve(self, uri: str) -> "Resource":
+        # NOTE: the STAC schemas without `$schema` are JSON Schema draft 7
+        return Resource.from_contents(self._schema(uri), default_specification=DRAFT7)
+
+    def validator(self, url: str) -> Any:
+        """Return the validator of a schema."""
+        assert jsonschema is not None, "jsonschema must be installed to validate"
+
+        validator = self._validators.get(url)
+        if validator is None:
+            schema = self._schema(url)
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            registry = Registry(retrieve=self._retrieve)  # type: ignore [call-arg]
+            validator = cls(schema, registry=registry)
+            self._validators.set(url, validator)
+
+        return validator
+
+    def validate(self, stac_object: Mapping[str, Any]) -> None:
+        """Validate a STAC object against the schemas of its `stac_extensions`.
+
+        Raises the (best matching) `jsonschema.ValidationError` of the first invalid
+        schema.
+        """
+        for url in stac_object.get("stac_extensions") or []:
+            validator = self.validator(url)
+            error = jsonschema.exceptions.best_match(validator.iter_errors(stac_object))
+            if error is not None:
+                raise error
+
+    def stats(self) -> dict[str, Any]:
+        """Return the validators cache statistics."""
+        return self._validators.stats()
+
+
+def get_validator_registry(app: FastAPI) -> ValidatorRegistry:
+    """Return the validator registry of the application.
+
+    The registry is created on first use (see `create_validator_registry`).
+    """
+    registry = getattr(app.state, "validator_registry", None)
+    if registry is None:
+        registry = create_validator_registry(app.state.settings)
+        app.state.validator_registry = registry
+
+    return registry
+
+
+def create_validator_registry(settings: Any) -> ValidatorRegistry:
+    """Create a validator registry from the application settings.
+
+    The registry follows the `validation_schema_dir`, `validation_schema_fetch` and
+    `validation_cache_size` settings.
+    """
+    return ValidatorRegistry(
+        store=SchemaStore(
+            directory=settings.validation_schema_dir,
+            fetch=settings.validation_schema_fetch,
+        ),
+        maxsize=settings.validation_cache_size,
+    )
+
+
+def shared_validator_registry(settings: Any) -> ValidatorRegistry:
+    """Return the validator registry shared by the callers with the same settings.
+
+    Used when no application (and its validator registry) is at hand, so the schemas
+    are still loaded and compiled only once.
+    """
+    return _shared_validator_registry(
+        settings.validation_schema_dir,
+        settings.validation_schema_fetch,
+        settings.validation_cache_size,
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _shared_validator_registry(
+    schema_dir: str | None, fetch: bool, cache_size: int
+) -> ValidatorRegistry:
+    return ValidatorRegistry(
+        store=SchemaStore(directory=schema_dir, fetch=fetch), maxsize=cache_size
+    )
+
+
+def extensions_errors(
+    stac_objects: Sequence[Mapping[str, Any]],
+    registry: ValidatorRegistry,
+) -> list[tuple[str, str]]:
+    """Validate the `stac_extensions` schemas of STAC objects.
+
+    Returns the id and the validation error of each invalid object.
+    """
+    errors = []
+    for stac_object in stac_objects:
+        if not stac_object.get("stac_extensions"):
+            continue
+
+        try:
+            registry.validate(stac_object)
+        except Exception as err:
+            errors.append((str(stac_object.get("id")), str(err)))
+
+    return errors
+
+
+# Validator registry of a validation worker process
+_worker_registry: ValidatorRegistry | None = None
+
+
+def _init_worker(registry: ValidatorRegistry) -> None:
+    global _worker_registry
+    _worker_registry = registry
+
+
+def _worker_extensions_errors(
+    stac_objects: Sequence[Mapping[str, Any]],
+) -> list[tuple[str, str]]:
+    assert _worker_registry is not None
+    return extensions_errors(stac_objects, _worker_registry)
+
+
+def get_validation_pool(app: FastAPI) -> ProcessPoolExecutor | None:
+    """Return the validation process pool of the application, if enabled.
+
+    The pool is created on first use, with `validation_workers` processes. Each
+    process has its own validator registry.
+    """
+    pool = getattr(app.state, "validation_pool", None)
+    if pool is None:
+        settings = app.state.settings
+        workers = settings.validation_workers
+        if workers <= 0:
+            return None
+
+        # NOTE: workers are spawned, not forked from the (multi-threaded) event loop
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(create_validator_registry(settings),),
+        )
+        app.state.validation_pool = pool
+
+    return pool
+
+
+def close_validation_pool(app: FastAPI) -> None:
+    """Shut down the validation process pool of the application, if any."""
+    pool = getattr(app.state, "validation_pool", None)
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+        app.state.validation_pool = None
+
+
+async def validate_extensions_batch(
+    app: FastAPI,
+    stac_objects: Sequence[Mapping[str, Any]],
+) -> list[tuple[str, str]]:
+    """Validate the `stac_extensions` schemas of a batch of STAC objects.
+
+    With a validation process pool (`validation_workers`), batches of more than
+    `validation_chunk_size` objects are split into chunks validated in the worker
+    processes, so the validation doesn't block the event loop. Smaller batches are
+    validated in the current process.
+
+    Returns the id and the validation error of each invalid object, in order.
+    """
+    stac_objects = [obj for obj in stac_objects if obj.get("stac_extensions")]
+
+    chunk_size = max(app.state.settings.validation_chunk_size, 1)
+    pool = get_validation_pool(app)
+    if pool is None or len(stac_objects) <= chunk_size:
+        return extensions_errors(stac_objects, get_validator_registry(app))
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                pool, _worker_extensions_errors, stac_objects[i : i + chunk_size]
+            )
+            for i in range(0, len(stac_objects), chunk_size)
+        )
+    )
+
+    return [error for errors in results for error in errors]
@@ -1,4 +1,5 @@
 import os
+from copy import deepcopy
 from datetime import datetime, timedelta
 from typing import Any, Callable, Coroutine, Dict, List, Optional, TypeVar
 from urllib.parse import quote_plus
@@ -45,8 +46,10 @@ STAC_CORE_ROUTES = [
 STAC_TRANSACTION_ROUTES = [
     "DELETE /collections/{collection_id}",
     "DELETE /collections/{collection_id}/items/{item_id}",
+    "GET /jobs/{job_id}",
     "POST /collections",
     "POST /collections/{collection_id}/items",
+    "POST /collections/{collection_id}/items/bulk-stream",
     "PUT /collections/{collection_id}",
     "PUT /collections/{collection_id}/items/{item_id}",
 ]
@@ -1119,3 +1122,43 @@ async def test_app_transactions_validate_extension(
         f"/collections/{coll['id']}/items", json=item
     )
     assert resp.status_code == 201
+
+
+async def test_app_transactions_validate_extension_workers(
+    app_client_validate_ext, load_test_data, monkeypatch
+):
+    settings = app_client_validate_ext.app.state.settings
+    monkeypatch.setattr(settings, "validation_workers", 2)
+    monkeypatch.setattr(settings, "validation_chunk_size", 1)
+
+    coll = load_test_data("test_collection.json")
+    resp = await app_client_validate_ext.post("/collections", json=coll)
+    assert resp.status_code == 201
+
+    item = load_test_data("test_item.json")
+    item["stac_extensions"].append(
+        "https://stac-extensions.github.io/attribution/v0.1.0/schema.json",
+    )
+    features = []
+    for i in range(3):
+        feature = deepcopy(item)
+        feature["id"] = f"item-{i}"
+        if i != 1:
+            feature["properties"]["attribution"] = "something"
+        features.append(feature)
+
+    feature_collection = {"type": "FeatureCollection", "features": features}
+    resp = await app_client_validate_ext.post(
+        f"/collections/{coll['id']}/items", json=feature_collection
+    )
+    assert resp.status_code == 422
+    detail = resp.json()["detail"]
+    assert "Item (item-1)" in detail
+    assert "Item (item-0)" not in detail
+    assert "Item (item-2)" not in detail
+
+    features[1]["properties"]["attribution"] = "something"
+    resp = await app_client_validate_ext.post(
+        f"/collections/{coll['id']}/items", json=feature_collection
+    )
+    assert resp.status_code == 201
@@ -140,3 +140,71 @@ def tests_app_links(prefix, root_path):  # noqa: C901
                 assert params["intersects"][0] == json.dumps(polygon)
                 r = client.get(link["href"])
                 assert r.status_code == 200
+
+
+@pytest.mark.parametrize("root_path", ["", "/api/v1"])
+@pytest.mark.parametrize("prefix", ["", "/stac"])
+@pytest.mark.parametrize(
+    "collection_id,item_id",
+    [
+        ("test-collection", "test-item"),
+        ("test.collection", "LC08_L1TP_2020.tif"),
+        ("test collection", "item:1"),
+        ("..", "."),
+        ("collection", "item?query#fragment"),
+        ("collection;params", "item/sub"),
+    ],
+)
+def test_item_links_builder(prefix, root_path, collection_id, item_id):
+    """ItemLinksBuilder should return the same links as ItemLinks."""
+    app = FastAPI(root_path=root_path)
+    router = APIRouter(prefix=prefix)
+    app.state.router_prefix = router.prefix
+
+    extra_links = [
+        {"rel": "self", "href": "./self.json"},
+        {"rel": "license", "href": "./LICENSE", "type": "text/plain"},
+        {"rel": "via", "href": "https://example.com/item.json"},
+    ]
+
+    @router.get("/items")
+    async def items(request: Request):
+        return {
+            "item_links": await app_links.ItemLinks(
+                collection_id=collection_id, item_id=item_id, request=request
+            ).get_links(extra_links=extra_links),
+            "builder": app_links.ItemLinksBuilder(request=request).get_links(
+                collection_id=collection_id,
+                item_id=item_id,
+                extra_links=extra_links,
+            ),
+        }
+
+    app.include_router(router)
+
+    with TestClient(app, base_url="http://stac.io", root_path=root_path) as client:
+        response = client.get(f"{prefix}/items")
+        assert response.status_code == 200
+        assert response.json()["builder"] == response.json()["item_links"]
+
+
+def test_request_json_parsed_once():
+    """The request body should be parsed once and shared by all link generators."""
+    app = FastAPI()
+    app.state.router_prefix = ""
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await app_links.get_request_json(request)
+        # Another Request object for the same ASGI scope
+        other_request = Request(request.scope, request.receive)
+        assert await app_links.get_request_json(other_request) is body
+
+        links = app_links.PagingLinks(other_request, next="yo:2")
+        return await links.get_links()
+
+    with TestClient(app, base_url="http://stac.io") as client:
+        response = client.post("/search", json={"collections": ["a"]})
+        assert response.status_code == 200
+        (next_link,) = [link for link in response.json() if link["rel"] == "next"]
+        assert next_link["body"] == {"collections": ["a"], "token": "next:yo:2"}
@@ -0,0 +1,191 @@
+"""Benchmarks.
+
+Run with `uv run --with pytest-benchmark pytest tests/benchmarks.py --benchmark-only`
+"""
+
+import asyncio
+import copy
+import json
+import os
+import tracemalloc
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from hydraters import dehydrate, hydrate
+from starlette.requests import Request
+
+from stac_fastapi.pgstac.config import Settings
+from stac_fastapi.pgstac.core import CoreCrudClient
+from stac_fastapi.pgstac.db import JSONB_BINARY_VERSION, _decode_jsonb_binary
+from stac_fastapi.pgstac.models.links import ItemLinks, PagingLinks
+from stac_fastapi.pgstac.types.base_item_cache import DefaultBaseItemCache
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def _request(method: str = "GET", body: dict | None = None) -> Request:
+    """Create a Request for a `/search` endpoint."""
+    app = FastAPI()
+    app.state.router_prefix = ""
+    app.state.settings = Settings(use_api_hydrate=True)
+
+    content = json.dumps(body).encode() if body is not None else b""
+
+    async def receive():
+        return {"type": "http.request", "body": content, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "app": app,
+        "method": method,
+        "path": "/search",
+        "root_path": "",
+        "scheme": "http",
+        "server": ("stac.io", 80),
+        "query_string": b"",
+        "headers": [
+            (b"host", b"stac.io"),
+            (b"content-type", b"application/json"),
+        ],
+    }
+    return Request(scope, receive)
+
+
+@pytest.fixture(scope="module")
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+# A POST body with a large `intersects` geometry, which is costly to parse.
+SEARCH_BODY = {
+    "collections": ["test-collection"],
+    "limit": 500,
+    "intersects": {
+        "type": "Polygon",
+        "coordinates": [[[i / 1000, (i % 7) / 1000] for i in range(5000)]],
+    },
+}
+
+
+@pytest.mark.parametrize("nitems", [1, 100, 500])
+def test_post_search_links(benchmark, event_loop_runner, nitems):
+    """Links generation for a POST search page, the body should be parsed only once."""
+    benchmark.group = "POST links"
+
+    async def _links():
+        request = _request("POST", SEARCH_BODY)
+        for i in range(nitems):
+            await ItemLinks(
+                collection_id="test-collection", item_id=f"item-{i}", request=request
+            ).get_links()
+
+        await PagingLinks(request=request, next="test-collection:item-1").get_links()
+
+    benchmark(lambda: event_loop_runner(_links()))
+
+
+def _dehydrated_items(nitems: int) -> tuple[dict, list[dict]]:
+    """Create a base item and `nitems` items dehydrated against it."""
+    with open(os.path.join(DATA_DIR, "test_item.json")) as f:
+        item = json.load(f)
+
+    # Fields shared by all the items of the collection, as in pgstac `base_item`
+    base_item = {
+        "type": "Feature",
+        "stac_version": item["stac_version"],
+        "collection": item["collection"],
+        "assets": {
+            key: {k: v for k, v in asset.items() if k != "href"}
+            for key, asset in item["assets"].items()
+        },
+        "properties": None,
+    }
+    dehydrated = dehydrate(base_item, copy.deepcopy(item))
+
+    return base_item, [
+        {**dehydrated, "id": f"item-{i}", "collection": item["collection"]}
+        for i in range(nitems)
+    ]
+
+
+@pytest.mark.parametrize("nitems", [100, 1_000, 10_000])
+@pytest.mark.parametrize("method", ["per-item", "batched"])
+def test_api_hydrate(benchmark, event_loop_runner, method, nitems):
+    """Hydration of a page of items within the API (`USE_API_HYDRATE`)."""
+    benchmark.group = f"API hydrate {nitems} items"
+
+    base_item, items = _dehydrated_items(nitems)
+    request = _request()
+
+    async def _fetch_base_item(collection_id: str) -> dict:
+        return base_item
+
+    base_item_cache = DefaultBaseItemCache(_fetch_base_item, request)
+    client = CoreCrudClient()
+
+    async def _per_item(page):
+        # Base item cleaned and hydrated item by item
+        hydrated = []
+        for item in page:
+            base = await base_item_cache.get(item["collection"])
+            base = {k: v for k, v in base.items() if v is not None}
+            hydrated.append(hydrate(base, dict(item), strip_unmatched_markers=True))
+        return hydrated
+
+    async def _batched(page):
+        return await client._hydrate_items(page, request, base_item_cache)
+
+    hydrate_page = _per_item if method == "per-item" else _batched
+    assert event_loop_runner(_per_item(copy.deepcopy(items))) == event_loop_runner(
+        _batched(copy.deepcopy(items))
+    )
+
+    # hydrate updates the items in place, so each round needs a fresh page
+    benchmark.pedantic(
+        lambda page: event_loop_runner(hydrate_page(page)),
+        setup=lambda: ((copy.deepcopy(items),), {}),
+        rounds=20,
+    )
+
+
+def _search_payload(nitems: int) -> bytes:
+    """Create the JSON encoded ItemCollection returned by a pgstac search."""
+    with open(os.path.join(DATA_DIR, "test_item.json")) as f:
+        item = json.load(f)
+
+    return orjson.dumps(
+        {
+            "type": "FeatureCollection",
+            "features": [{**item, "id": f"item-{i}"} for i in range(nitems)],
+            "links": [],
+        }
+    )
+
+
+@pytest.mark.parametrize("nitems", [100, 1_000, 5_000])
+@pytest.mark.parametrize("codec", ["text", "binary"])
+def test_jsonb_decode(benchmark, codec, nitems):
+    """Decoding of a search result by the asyncpg jsonb codec (`DB_JSON_CODEC`)."""
+    benchmark.group = f"jsonb decode {nitems} items"
+
+    payload = _search_payload(nitems)
+    if codec == "text":
+        # The text codec gets the value decoded as `str` by asyncpg
+        def decode(data: bytes):
+            return orjson.loads(data.decode())
+
+        data = payload
+    else:
+        decode = _decode_jsonb_binary
+        data = JSONB_BINARY_VERSION + payload
+
+    tracemalloc.start()
+    decode(data)
+    benchmark.extra_info["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+    benchmark.extra_info["payload_mb"] = len(payload) / 1e6
+    tracemalloc.stop()
+
+    benchmark(decode, data)
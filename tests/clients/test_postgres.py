@@ -1,16 +1,24 @@
+import asyncio
 import logging
 import uuid
 from contextlib import asynccontextmanager
 from copy import deepcopy
 from typing import Callable, Literal
 
+import orjson
 import pytest
 from fastapi import Request
 from pydantic import ValidationError
+from stac_fastapi.extensions.bulk_transactions import BulkTransactionMethod
 from stac_pydantic import Collection, Item
 
+from stac_fastapi.pgstac.batching import WriteBatcher
+from stac_fastapi.pgstac.cache import LRUCache
 from stac_fastapi.pgstac.config import PostgresSettings
+from stac_fastapi.pgstac.core import CoreCrudClient
 from stac_fastapi.pgstac.db import close_db_connection, connect_to_db, get_connection
+from stac_fastapi.pgstac.jobs import Job, JobQueue, get_job
+from stac_fastapi.pgstac.types.base_item_cache import LRUBaseItemCache
 
 # from tests.conftest import MockStarletteRequest
 logger = logging.getLogger(__name__)
@@ -423,6 +431,156 @@ async def test_create_bulk_items_already_exist_upsert(
     assert resp.text == '"Successfully upserted 2 items."'
 
 
+async def test_create_bulk_items_copy(
+    app_client, load_test_data: Callable, load_test_collection, monkeypatch
+):
+    monkeypatch.setattr(app_client.app.state.settings, "use_copy_ingest", True)
+
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+
+    items = {}
+    for _ in range(3):
+        _item = deepcopy(item)
+        _item["id"] = str(uuid.uuid4())
+        items[_item["id"]] = _item
+
+    payload = {"items": items, "method": "insert"}
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items",
+        json=payload,
+    )
+    assert resp.status_code == 200
+    assert resp.text == '"Successfully added 3 items."'
+
+    for item_id in items.keys():
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{item_id}")
+        assert resp.status_code == 200
+        assert resp.json()["properties"] == item["properties"]
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items",
+        json=payload,
+    )
+    assert resp.status_code == 409
+
+    payload["method"] = "upsert"
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items",
+        json=payload,
+    )
+    assert resp.status_code == 200
+    assert resp.text == '"Successfully upserted 3 items."'
+
+    # Item Collection
+    feature_collection = {
+        "type": "FeatureCollection",
+        "features": [{**item, "id": str(uuid.uuid4())} for _ in range(2)],
+    }
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items", json=feature_collection
+    )
+    assert resp.status_code == 201
+
+    for feature in feature_collection["features"]:
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{feature['id']}")
+        assert resp.status_code == 200
+
+
+@pytest.mark.parametrize("use_copy_ingest", [False, True])
+async def test_create_bulk_items_stream(
+    app_client,
+    load_test_data: Callable,
+    load_test_collection,
+    monkeypatch,
+    use_copy_ingest,
+):
+    monkeypatch.setattr(app_client.app.state.settings, "bulk_stream_batch_size", 2)
+    monkeypatch.setattr(app_client.app.state.settings, "use_copy_ingest", use_copy_ingest)
+
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+
+    items = []
+    for _ in range(5):
+        _item = deepcopy(item)
+        _item["id"] = str(uuid.uuid4())
+        items.append(_item)
+
+    body = b"".join(orjson.dumps(_item) + b"\n" for _item in items)
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"method": "insert", "items": 5, "batches": [2, 2, 1]}
+
+    for _item in items:
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{_item['id']}")
+        assert resp.status_code == 200
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 409
+    assert "Batch 1 failed, 0 items were written before it" in resp.text
+
+    # The items written before a failed batch are reported
+    new_items = [deepcopy(item) for _ in range(2)]
+    for _item in new_items:
+        _item["id"] = str(uuid.uuid4())
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        content=b"".join(orjson.dumps(_item) + b"\n" for _item in new_items) + body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 409
+    assert "Batch 2 failed, 2 items were written before it" in resp.text
+
+    # Only newline-delimited JSON is accepted
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        content=body,
+        headers={"Content-Type": "application/json"},
+    )
+    assert resp.status_code == 415
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        params={"method": "upsert"},
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["items"] == 5
+
+    # The batches before an invalid line are written
+    new_items = [deepcopy(item) for _ in range(3)]
+    for _item in new_items:
+        _item["id"] = str(uuid.uuid4())
+
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items/bulk-stream",
+        content=orjson.dumps(new_items[0])
+        + b"\n"
+        + orjson.dumps(new_items[1])
+        + b"\n{invalid\n"
+        + orjson.dumps(new_items[2]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 400
+    assert "line 3" in resp.json()["detail"]
+
+    for _item, status in zip(new_items, (200, 200, 404), strict=True):
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{_item['id']}")
+        assert resp.status_code == status
+
+
 async def test_create_bulk_items_omit_collection(
     app_client, load_test_data: Callable, load_test_collection
 ):
@@ -599,3 +757,372 @@ class TestDbConnect:
         response = await app_client.get("/db-test")
         assert response.status_code == 200
         assert response.json() == "added-config"
+
+
+async def test_db_statement_timeout(api_client, app_client, monkeypatch):
+    @api_client.app.get(f"{api_client.router.prefix}/db-sleep", name="Sleep")
+    async def sleep_view(request: Request):
+        async with request.app.state.get_connection(request, "r") as conn:
+            return await conn.fetchval("SELECT pg_sleep(1)::text")
+
+    @api_client.app.get(f"{api_client.router.prefix}/db-timeout", name="Timeout")
+    async def timeout_view(request: Request):
+        async with request.app.state.get_connection(request, "r") as conn:
+            return {
+                "timeout": await conn.fetchval("SHOW statement_timeout"),
+                "transaction": conn.is_in_transaction(),
+            }
+
+    settings = api_client.app.state.settings
+    monkeypatch.setattr(settings, "statement_timeouts", {"Sleep": 0.1, "Timeout": 0.1})
+    response = await app_client.get("/db-sleep")
+    assert response.status_code == 504
+
+    # The timeout is set for the transaction of the request only
+    response = await app_client.get("/db-timeout")
+    assert response.json() == {"timeout": "100ms", "transaction": True}
+
+    # The timeout doesn't apply to the other endpoints (nor outlives the request)
+    response = await app_client.get("/_mgmt/health")
+    assert response.status_code == 200
+
+    async with api_client.app.state.readpool.acquire() as conn:
+        assert await conn.fetchval("SHOW statement_timeout") == "0"
+
+
+class TestDbReadReplicas:
+    @pytest.fixture
+    async def app(self, api_client, pgstac):
+        """
+        app fixture override to setup app with read replicas (the test database)
+        """
+        postgres_settings = PostgresSettings(
+            pguser=pgstac.user,
+            pgpassword=pgstac.password,
+            pghost=pgstac.host,
+            pgport=pgstac.port,
+            pgdatabase=pgstac.dbname,
+            db_reader_hosts=[f"{pgstac.host}:{pgstac.port}"] * 2,
+        )
+
+        await connect_to_db(
+            api_client.app,
+            postgres_settings=postgres_settings,
+            add_write_connection_pool=True,
+        )
+        yield api_client.app
+        await close_db_connection(api_client.app)
+
+    async def test_db_read_replicas(self, app, app_client, load_test_collection):
+        readpools = app.state.readpools
+        assert len(readpools.replicas) == 2
+
+        for _ in range(4):
+            resp = await app_client.get(f"/collections/{load_test_collection['id']}")
+            assert resp.status_code == 200
+
+        assert all(replica.outstanding == 0 for replica in readpools.replicas)
+        assert all(replica.healthy for replica in readpools.replicas)
+
+
+class TestDbBinaryJsonCodec:
+    @pytest.fixture
+    async def app(self, api_client, pgstac):
+        """
+        app fixture override to setup app with the binary json codec
+        """
+        postgres_settings = PostgresSettings(
+            pguser=pgstac.user,
+            pgpassword=pgstac.password,
+            pghost=pgstac.host,
+            pgport=pgstac.port,
+            pgdatabase=pgstac.dbname,
+            db_json_codec="binary",
+        )
+
+        await connect_to_db(
+            api_client.app,
+            postgres_settings=postgres_settings,
+            add_write_connection_pool=True,
+        )
+        yield api_client.app
+        await close_db_connection(api_client.app)
+
+    async def test_db_binary_json_codec(self, app, app_client, load_test_item):
+        async with app.state.readpool.acquire() as conn:
+            assert await conn.fetchval("SELECT '{\"a\": [1, 2]}'::jsonb") == {"a": [1, 2]}
+            assert await conn.fetchval("SELECT $1::jsonb", {"a": "é"}) == {"a": "é"}
+            assert await conn.fetchval("SELECT '{\"a\": null}'::json") == {"a": None}
+
+        resp = await app_client.get(
+            f"/collections/{load_test_item['collection']}/items/{load_test_item['id']}"
+        )
+        assert resp.status_code == 200
+        assert resp.json()["id"] == load_test_item["id"]
+
+        resp = await app_client.get("/search", params={"ids": load_test_item["id"]})
+        assert resp.status_code == 200
+        assert len(resp.json()["features"]) == 1
+
+
+async def test_create_items_batched(
+    app_client, load_test_data: Callable, load_test_collection, monkeypatch
+):
+    batcher = WriteBatcher(max_size=10, delay=0.05)
+    monkeypatch.setattr(app_client.app.state, "write_batcher", batcher, raising=False)
+
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+
+    existing = deepcopy(item)
+    existing["id"] = str(uuid.uuid4())
+    resp = await app_client.post(f"/collections/{coll['id']}/items", json=existing)
+    assert resp.status_code == 201
+
+    items = [existing]
+    for _ in range(4):
+        _item = deepcopy(item)
+        _item["id"] = str(uuid.uuid4())
+        items.append(_item)
+
+    responses = await asyncio.gather(
+        *(
+            app_client.post(f"/collections/{coll['id']}/items", json=_item)
+            for _item in items
+        )
+    )
+    assert [resp.status_code for resp in responses] == [409, 201, 201, 201, 201]
+
+    for _item in items:
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{_item['id']}")
+        assert resp.status_code == 200
+
+    assert batcher.retries == 5
+
+
+async def _wait_for_job(app_client, location: str) -> dict:
+    for _ in range(100):
+        resp = await app_client.get(location)
+        assert resp.status_code == 200
+        job = resp.json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.05)
+
+    raise AssertionError(f"Job {location} did not complete")
+
+
+async def test_create_bulk_items_async(
+    app_client, load_test_data: Callable, load_test_collection
+):
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+
+    items = {}
+    for _ in range(3):
+        _item = deepcopy(item)
+        _item["id"] = str(uuid.uuid4())
+        items[_item["id"]] = _item
+
+    payload = {"items": items, "method": "insert"}
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items",
+        json=payload,
+        headers={"Prefer": "respond-async"},
+    )
+    assert resp.status_code == 202
+    assert resp.headers["Preference-Applied"] == "respond-async"
+    job_id = resp.json()["id"]
+    location = resp.headers["Location"]
+    assert location.endswith(f"/jobs/{job_id}")
+
+    job = await _wait_for_job(app_client, location)
+    assert job["status"] == "completed"
+    assert (job["total"], job["written"], job["failed"]) == (3, 3, 0)
+
+    for item_id in items.keys():
+        resp = await app_client.get(f"/collections/{coll['id']}/items/{item_id}")
+        assert resp.status_code == 200
+
+    # The existing items are reported as errors of the job
+    new_item = deepcopy(item)
+    new_item["id"] = str(uuid.uuid4())
+    payload["items"][new_item["id"]] = new_item
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items",
+        json=payload,
+        headers={"Prefer": "respond-async"},
+    )
+    assert resp.status_code == 202
+
+    job = await _wait_for_job(app_client, resp.headers["Location"])
+    assert job["status"] == "completed"
+    assert (job["total"], job["written"], job["failed"]) == (4, 1, 3)
+    assert {error["id"] for error in job["errors"]} == set(items.keys())
+
+    resp = await app_client.get(f"/jobs/{uuid.uuid4()}")
+    assert resp.status_code == 404
+
+
+async def test_job_queue_status(app_client, load_test_data: Callable):
+    """The progress of the jobs is recorded through the pool's jsonb codec."""
+    item = load_test_data("test_item.json")
+    item["collection"] = "missing-collection"
+
+    queue = JobQueue(batch_size=2)
+    request = Request({"type": "http", "app": app_client.app})
+    job = Job(
+        request=request,
+        collection_id="missing-collection",
+        method=BulkTransactionMethod.INSERT,
+        items=[{**item, "id": str(uuid.uuid4())} for _ in range(3)],
+    )
+    try:
+        await queue.submit(job)
+        await asyncio.wait_for(queue._queue.join(), timeout=10)
+    finally:
+        await queue.close()
+
+    state = await get_job(request, job.id)
+    assert state["status"] == "completed"
+    assert (state["total"], state["written"], state["failed"]) == (3, 0, 3)
+    assert [error["id"] for error in state["errors"]] == [i["id"] for i in job.items]
+
+
+async def test_create_bulk_items_idempotency_key(
+    app_client, load_test_data: Callable, load_test_collection
+):
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+
+    items = {}
+    for _ in range(3):
+        _item = deepcopy(item)
+        _item["id"] = str(uuid.uuid4())
+        items[_item["id"]] = _item
+
+    payload = {"items": items, "method": "insert"}
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items", json=payload, headers=headers
+    )
+    assert resp.status_code == 200
+    assert "idempotent-replayed" not in resp.headers
+
+    # A retry gets the recorded response, instead of a conflict
+    retry = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items", json=payload, headers=headers
+    )
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["content-type"] == resp.headers["content-type"]
+    assert retry.content == resp.content
+
+    # Without the key, the items already exist
+    resp = await app_client.post(f"/collections/{coll['id']}/bulk_items", json=payload)
+    assert resp.status_code == 409
+
+    # The key can't be reused for a different request
+    payload["method"] = "upsert"
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/bulk_items", json=payload, headers=headers
+    )
+    assert resp.status_code == 422
+
+
+async def test_create_item_idempotency_key(
+    app_client, load_test_data: Callable, load_test_collection
+):
+    coll = load_test_collection
+    item = load_test_data("test_item.json")
+    item["id"] = str(uuid.uuid4())
+
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    resp = await app_client.post(
+        f"/collections/{coll['id']}/items", json=item, headers=headers
+    )
+    assert resp.status_code == 201
+
+    # The recorded status, headers and body are replayed from the database
+    retry = await app_client.post(
+        f"/collections/{coll['id']}/items", json=item, headers=headers
+    )
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["content-type"] == resp.headers["content-type"]
+    assert retry.json() == resp.json()
+
+    async with app_client.app.state.writepool.acquire() as conn:
+        outcome = await conn.fetchrow(
+            "SELECT status_code, headers FROM stac_fastapi_idempotency_keys "
+            "WHERE key = $1;",
+            headers["Idempotency-Key"],
+        )
+    assert outcome["status_code"] == 201
+    assert ["content-type", resp.headers["content-type"]] in outcome["headers"]
+
+
+async def test_search_coalescing_after_write(
+    app_client, load_test_data: Callable, load_test_collection, monkeypatch
+):
+    """A search made after a write doesn't wait for a search started before it."""
+    state = app_client.app.state
+    monkeypatch.setattr(state.settings, "coalesce_searches", True)
+    monkeypatch.setattr(state, "search_flights", None, raising=False)
+
+    coll = load_test_collection
+    started, release = asyncio.Event(), asyncio.Event()
+    calls = []
+    fetch_search = CoreCrudClient._fetch_search
+
+    async def _fetch_search(self, *args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            started.set()
+            await release.wait()
+        return await fetch_search(self, *args, **kwargs)
+
+    monkeypatch.setattr(CoreCrudClient, "_fetch_search", _fetch_search)
+
+    search = {"collections": [coll["id"]]}
+    first = asyncio.ensure_future(app_client.post("/search", json=search))
+    await asyncio.wait_for(started.wait(), 5)
+
+    item = load_test_data("test_item.json")
+    resp = await app_client.post(f"/collections/{coll['id']}/items", json=item)
+    assert resp.status_code == 201
+
+    # The search runs its own query, instead of joining the one started before
+    resp = await asyncio.wait_for(app_client.post("/search", json=search), 5)
+    assert resp.status_code == 200
+    assert [feature["id"] for feature in resp.json()["features"]] == [item["id"]]
+    assert len(calls) == 2
+
+    release.set()
+    resp = await first
+    assert resp.status_code == 200
+
+
+async def test_get_item_shared_base_item_cache(app_client, load_test_item, monkeypatch):
+    """Items hydrated within the API use the shared cache of the base items."""
+    state = app_client.app.state
+    monkeypatch.setattr(state.settings, "use_api_hydrate", True)
+    monkeypatch.setattr(state.settings, "base_item_cache", LRUBaseItemCache)
+    store = LRUCache(maxsize=10)
+    monkeypatch.setattr(state, "base_item_store", store, raising=False)
+
+    item = load_test_item
+    url = f"/collections/{item['collection']}/items/{item['id']}"
+    resp = await app_client.get(url)
+    assert resp.status_code == 200
+    assert item["collection"] in store
+    assert (store.hits, store.misses) == (0, 1)
+
+    # The base item is not selected again, but read from the cache
+    cached = await app_client.get(url)
+    assert cached.status_code == 200
+    assert cached.json() == resp.json()
+    assert (store.hits, store.misses) == (1, 1)
+
+    resp = await app_client.get("/_mgmt/health")
+    assert resp.json()["caches"]["base_items"] == store.stats()
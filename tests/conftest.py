@@ -55,14 +55,22 @@ from starlette.middleware.cors import CORSMiddleware
 from stac_fastapi.pgstac.config import PostgresSettings, Settings
 from stac_fastapi.pgstac.core import CoreCrudClient, health_check
 from stac_fastapi.pgstac.db import close_db_connection, connect_to_db
-from stac_fastapi.pgstac.extensions import FreeTextExtension, QueryExtension
+from stac_fastapi.pgstac.extensions import (
+    BulkStreamExtension,
+    FreeTextExtension,
+    JobsExtension,
+    QueryExtension,
+)
 from stac_fastapi.pgstac.extensions.catalogs.catalogs_client import CatalogsClient
 from stac_fastapi.pgstac.extensions.catalogs.catalogs_database_logic import (
     CatalogsDatabaseLogic,
 )
 from stac_fastapi.pgstac.extensions.filter import FiltersClient
+from stac_fastapi.pgstac.jobs import close_job_queue
+from stac_fastapi.pgstac.middleware import IdempotencyMiddleware
 from stac_fastapi.pgstac.transactions import BulkTransactionsClient, TransactionsClient
 from stac_fastapi.pgstac.types.search import PgstacSearch
+from stac_fastapi.pgstac.validation import close_validation_pool
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 
@@ -124,6 +132,7 @@ def api_client(request):
     hydrate, prefix, response_model = request.param
     api_settings = Settings(
         enable_response_models=response_model,
+        enable_jobs_extension=True,
         testing=True,
         use_api_hydrate=hydrate,
     )
@@ -140,6 +149,8 @@ def api_client(request):
     application_extensions = [
         TransactionExtension(client=TransactionsClient(), settings=api_settings),
         BulkTransactionExtension(client=BulkTransactionsClient()),
+        BulkStreamExtension(client=BulkTransactionsClient()),
+        JobsExtension(),
     ]
 
     # Add catalogs extension if available
@@ -237,6 +248,7 @@ def api_client(request):
                 allow_headers=api_settings.cors_headers,
                 max_age=600,
             ),
+            Middleware(IdempotencyMiddleware),
         ],
     )
 
@@ -267,6 +279,7 @@ async def app(api_client, postgres_settings):
 
     yield app
 
+    await close_job_queue(app)
     await close_db_connection(app)
 
     logger.info("Closed Pools.")
@@ -553,6 +566,7 @@ async def app_transaction_validation_ext(postgres_settings):
     )
     yield api.app
     await close_db_connection(api.app)
+    close_validation_pool(api.app)
 
     logger.info("Closed Pools.")
 
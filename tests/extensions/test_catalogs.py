@@ -912,6 +912,37 @@ async def test_unlink_collection_from_catalog(app_client):
     )
 
 
+@pytest.mark.asyncio
+async def test_unlink_collection_invalidates_cache(app_client, monkeypatch):
+    """Test that the catalog writes invalidate the cached collections."""
+    state = app_client.app.state
+    monkeypatch.setattr(state.settings, "collection_cache_size", 10)
+    monkeypatch.setattr(state, "collection_store", None, raising=False)
+
+    await create_catalog(app_client, "catalog-for-cache-unlink")
+    await create_catalog_collection(
+        app_client, "catalog-for-cache-unlink", "collection-for-cache-unlink"
+    )
+
+    resp = await app_client.get("/collections/collection-for-cache-unlink")
+    assert resp.status_code == 200
+    assert "collection-for-cache-unlink" in state.collection_store
+
+    resp = await app_client.delete(
+        "/catalogs/catalog-for-cache-unlink/collections/collection-for-cache-unlink"
+    )
+    assert resp.status_code == 204
+    assert "collection-for-cache-unlink" not in state.collection_store
+
+    # The collection is read again from the database
+    resp = await app_client.get("/collections/collection-for-cache-unlink")
+    assert resp.status_code == 200
+    cached = resp.json()
+    state.collection_store.clear()
+    resp = await app_client.get("/collections/collection-for-cache-unlink")
+    assert resp.json() == cached
+
+
 @pytest.mark.asyncio
 async def test_cycle_prevention(app_client):
     """Test that circular references are prevented."""
@@ -77,7 +77,11 @@ def test_extensions_enabled_no_collection_search():
 def test_extensions_enabled_transactions():
     settings = Settings(enable_transactions_extensions=True)
     extensions = Extensions(settings=settings)
-    assert len(extensions.transaction) == 2
+    assert len(extensions.transaction) == 3
+
+    settings = Settings(enable_transactions_extensions=True, enable_jobs_extension=True)
+    extensions = Extensions(settings=settings)
+    assert len(extensions.transaction) == 4
 
 
 def test_extensions_custom():
@@ -4,6 +4,8 @@ import pystac
 import pytest
 from stac_pydantic import Collection
 
+from stac_fastapi.pgstac.cache import LRUCache
+
 
 async def test_create_collection(app_client, load_test_data: Callable):
     in_json = load_test_data("test_collection.json")
@@ -664,3 +666,31 @@ async def test_get_collections_search_offset_1(
     prev_link = list(filter(lambda link: link["rel"] == "previous", links))[0]
     # offset=0 should not be in the previous link (because it's useless)
     assert "offset" not in prev_link["href"]
+
+
+async def test_collection_cache(app_client, load_test_collection, monkeypatch):
+    """Test collections cache and its invalidation"""
+    app = app_client._transport.app
+    monkeypatch.setattr(
+        app.state, "collection_store", LRUCache(maxsize=10), raising=False
+    )
+
+    in_coll = load_test_collection
+    resp = await app_client.get(f"/collections/{in_coll['id']}")
+    assert resp.status_code == 200
+    resp = await app_client.get(f"/collections/{in_coll['id']}/items")
+    assert resp.status_code == 200
+    assert app.state.collection_store.hits == 1
+
+    in_coll["keywords"].append("newkeyword")
+    resp = await app_client.put(f"/collections/{in_coll['id']}", json=in_coll)
+    assert resp.status_code == 200
+
+    resp = await app_client.get(f"/collections/{in_coll['id']}")
+    assert "newkeyword" in resp.json()["keywords"]
+
+    resp = await app_client.delete(f"/collections/{in_coll['id']}")
+    assert resp.status_code == 200
+
+    resp = await app_client.get(f"/collections/{in_coll['id']}/items")
+    assert resp.status_code == 404
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import random
 import uuid
@@ -16,7 +17,10 @@ from stac_fastapi.types.rfc3339 import rfc3339_str_to_datetime
 from stac_pydantic import Collection, Item
 from starlette.requests import Request
 
+from stac_fastapi.pgstac.cache import SearchCache, get_cache_generations
+from stac_fastapi.pgstac.core import CoreCrudClient
 from stac_fastapi.pgstac.models.links import CollectionLinks
+from stac_fastapi.pgstac.types.search import PgstacSearch
 
 
 async def test_create_collection(app_client, load_test_data: Callable):
@@ -243,6 +247,40 @@ async def test_patch_item_operations(
     assert get_item_json["properties"]["gsd"] == 20
 
 
+async def test_patch_item_concurrent(
+    app_client,
+    load_test_collection: Collection,
+    load_test_item: Item,
+):
+    """Test concurrent patches of an Item aren't lost."""
+    item_id = load_test_item["id"]
+    collection_id = load_test_item["collection"]
+
+    responses = await asyncio.gather(
+        *(
+            app_client.patch(
+                f"/collections/{collection_id}/items/{item_id}",
+                json=[{"op": "add", "path": f"/properties/test:{i}", "value": i}],
+            )
+            for i in range(5)
+        )
+    )
+    assert all(resp.status_code == 200 for resp in responses)
+
+    resp = await app_client.get(f"/collections/{collection_id}/items/{item_id}")
+    assert resp.status_code == 200
+    properties = resp.json()["properties"]
+    assert all(properties[f"test:{i}"] == i for i in range(5))
+
+    # A patch which doesn't change the item isn't written
+    resp = await app_client.patch(
+        f"/collections/{collection_id}/items/{item_id}",
+        json=[{"op": "replace", "path": "/properties/test:0", "value": 0}],
+    )
+    assert resp.status_code == 200
+    assert resp.json()["properties"] == properties
+
+
 async def test_update_item_mismatched_collection_id(
     app_client, load_test_data: Callable, load_test_collection, load_test_item
 ) -> None:
@@ -1817,3 +1855,216 @@ async def test_item_asset_change(app_client, load_test_data):
         # We get "𒍟※" because PgSTAC set it when ingesting (`description`is item-assets)
         # because we removed item-assets, pgstac cannot hydrate this field, and thus return "𒍟※"
         assert resp.json()["features"][0]["assets"]["qa_pixel"]["description"] == "𒍟※"
+
+
+@pytest.mark.parametrize(
+    "media_type,separator",
+    [("application/geo+json-seq", "\x1e"), ("application/x-ndjson", "")],
+)
+async def test_item_search_stream(
+    app_client, load_test_data, load_test_collection, media_type, separator
+):
+    """Test streaming search results (GeoJSON Text Sequences / NDJSON)"""
+    test_item = load_test_data("test_item.json")
+    collection_id = test_item["collection"]
+    for _ in range(5):
+        test_item["id"] = str(uuid.uuid4())
+        resp = await app_client.post(
+            f"/collections/{collection_id}/items", json=test_item
+        )
+        assert resp.status_code == 201
+
+    resp = await app_client.get(
+        "/search",
+        params={"collections": collection_id, "limit": 3},
+        headers={"Accept": media_type},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith(media_type)
+
+    lines = resp.text.splitlines()
+    assert len(lines) == 3
+    for line in lines:
+        assert line.startswith(separator)
+        feature = json.loads(line[len(separator) :])
+        assert feature["type"] == "Feature"
+        assert feature["collection"] == collection_id
+        assert {"self", "parent", "collection", "root"} <= {
+            link["rel"] for link in feature["links"]
+        }
+
+    resp = await app_client.post(
+        "/search",
+        json={
+            "collections": [collection_id],
+            "limit": 10,
+            "fields": {"include": ["id"], "exclude": ["links"]},
+        },
+        headers={"Accept": media_type},
+    )
+    assert resp.status_code == 200
+    lines = resp.text.splitlines()
+    assert len(lines) == 5
+    for line in lines:
+        feature = json.loads(line[len(separator) :])
+        assert "links" not in feature
+        assert "properties" not in feature
+
+
+async def test_item_search_stream_cancel(
+    app_client, load_test_data, load_test_collection, monkeypatch
+):
+    """Test the connection of a stream is released when the stream is closed early"""
+    app = app_client._transport.app
+    monkeypatch.setattr(app.state.settings, "stream_chunk_size", 1)
+
+    test_item = load_test_data("test_item.json")
+    collection_id = test_item["collection"]
+    for _ in range(3):
+        test_item["id"] = str(uuid.uuid4())
+        resp = await app_client.post(
+            f"/collections/{collection_id}/items", json=test_item
+        )
+        assert resp.status_code == 201
+
+    pool = app.state.readpool
+
+    def in_use() -> int:
+        return pool.get_size() - pool.get_idle_size()
+
+    before = in_use()
+    request = Request(
+        {
+            "type": "http",
+            "app": app,
+            "method": "POST",
+            "scheme": "http",
+            "server": ("test", 80),
+            "path": "/search",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+    resp = await CoreCrudClient()._stream_search(
+        PgstacSearch(collections=[collection_id]),
+        request=request,
+        media_type="application/x-ndjson",
+    )
+    # The first chunk is fetched before the response is sent
+    assert in_use() == before + 1
+
+    stream = resp.body_iterator
+    await anext(stream)
+    await anext(stream)
+    await stream.aclose()
+    assert in_use() == before
+
+
+async def test_item_search_stream_token(app_client, load_test_collection):
+    """Test pagination token is rejected when streaming search results"""
+    resp = await app_client.get(
+        "/search",
+        params={"token": "next:test-collection:test-item"},
+        headers={"Accept": "application/geo+json-seq"},
+    )
+    assert resp.status_code == 400
+
+
+async def test_item_search_passthrough(app_client, load_test_data, load_test_collection):
+    """Test search results passed through as pre-encoded JSON are the same"""
+    test_item = load_test_data("test_item.json")
+    collection_id = test_item["collection"]
+    for _ in range(3):
+        test_item["id"] = str(uuid.uuid4())
+        resp = await app_client.post(
+            f"/collections/{collection_id}/items", json=test_item
+        )
+        assert resp.status_code == 201
+
+    settings = app_client._transport.app.state.settings
+    requests = [
+        ("GET", {"params": {"collections": collection_id, "limit": 2}}),
+        ("POST", {"json": {"collections": [collection_id], "limit": 2}}),
+    ]
+    for method, kwargs in requests:
+        resp = await app_client.request(method, "/search", **kwargs)
+        assert resp.status_code == 200
+        expected = resp.json()
+
+        settings.use_search_passthrough = True
+        try:
+            resp = await app_client.request(method, "/search", **kwargs)
+        finally:
+            settings.use_search_passthrough = False
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/geo+json"
+        assert resp.json() == expected
+        assert len(resp.json()["features"]) == 2
+        assert "next" in {link["rel"] for link in resp.json()["links"]}
+
+
+async def test_item_search_cache(
+    app_client, load_test_data, load_test_collection, monkeypatch
+):
+    """Test search results cache and its invalidation"""
+    app = app_client._transport.app
+    cache = SearchCache(maxsize=10, generations=get_cache_generations(app))
+    monkeypatch.setattr(app.state, "search_cache", cache, raising=False)
+
+    test_item = load_test_data("test_item.json")
+    collection_id = test_item["collection"]
+    resp = await app_client.post(f"/collections/{collection_id}/items", json=test_item)
+    assert resp.status_code == 201
+
+    params = {"collections": collection_id}
+    resp = await app_client.get("/search", params=params)
+    assert resp.status_code == 200
+    assert len(resp.json()["features"]) == 1
+
+    resp = await app_client.get("/search", params=params)
+    assert len(resp.json()["features"]) == 1
+    assert app.state.search_cache.hits == 1
+
+    # Writing an item of the collection invalidates the cached searches
+    test_item["id"] = str(uuid.uuid4())
+    resp = await app_client.post(f"/collections/{collection_id}/items", json=test_item)
+    assert resp.status_code == 201
+
+    resp = await app_client.get("/search", params=params)
+    assert len(resp.json()["features"]) == 2
+    assert app.state.search_cache.hits == 1
+
+
+async def test_get_item_matches_search(app_client, load_test_item):
+    """Test an item read by id is the same as the item found by a search"""
+    item = load_test_item
+    resp = await app_client.get(f"/collections/{item['collection']}/items/{item['id']}")
+    assert resp.status_code == 200
+
+    search = await app_client.get(
+        "/search", params={"collections": item["collection"], "ids": item["id"]}
+    )
+    assert search.status_code == 200
+    assert resp.json() == search.json()["features"][0]
+
+
+async def test_item_collection_concurrent_check(app_client, load_test_item, monkeypatch):
+    """Test checking the collection concurrently with the items search"""
+    settings = app_client._transport.app.state.settings
+    monkeypatch.setattr(settings, "concurrent_collection_check", True)
+
+    item = load_test_item
+    resp = await app_client.get(f"/collections/{item['collection']}/items")
+    assert resp.status_code == 200
+    assert resp.json()["features"][0]["id"] == item["id"]
+
+    resp = await app_client.get("/collections/invalid-collection/items")
+    assert resp.status_code == 404
+
+    # A missing collection takes precedence over invalid parameters
+    resp = await app_client.get(
+        "/collections/invalid-collection/items", params={"datetime": "invalid"}
+    )
+    assert resp.status_code == 404
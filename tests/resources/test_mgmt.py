@@ -35,6 +35,8 @@ async def test_health(app_client):
     assert body["status"] == "UP"
     assert body["pgstac"]["status"] == "UP"
     assert body["pgstac"]["pgstac_version"]
+    assert body["pgstac"]["pools"]["read"]["acquired"] >= 1
+    assert body["pgstac"]["pools"]["read"]["waiting"] == 0
 
 
 async def test_health_503(pgstac):
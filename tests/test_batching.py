@@ -0,0 +1,101 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI, Request
+from stac_fastapi.types.errors import ConflictError
+
+from stac_fastapi.pgstac.batching import WriteBatcher, get_write_batcher
+from stac_fastapi.pgstac.config import Settings
+
+
+@asynccontextmanager
+async def fake_connection(request, readwrite="r"):
+    assert readwrite == "w"
+    yield "conn"
+
+
+def _request(**settings) -> Request:
+    app = FastAPI()
+    app.state.settings = Settings(**settings)
+    app.state.get_connection = fake_connection
+    return Request({"type": "http", "app": app})
+
+
+class FakeWrites:
+    """Record the writes, failing the ones of existing values."""
+
+    def __init__(self, existing=()):
+        self.batches = []
+        self.values = list(existing)
+
+    async def write_batch(self, conn, values):
+        assert conn == "conn"
+        if any(value in self.values for value in values):
+            raise ConflictError("exists")
+        self.batches.append(values)
+        self.values.extend(values)
+
+    async def write_one(self, conn, value):
+        await self.write_batch(conn, [value])
+
+
+def _batcher(writes: FakeWrites, **kwargs) -> WriteBatcher:
+    return WriteBatcher(
+        write_batch=writes.write_batch, write_one=writes.write_one, **kwargs
+    )
+
+
+async def test_write_batcher():
+    request = _request()
+    writes = FakeWrites()
+    batcher = _batcher(writes, max_size=3, delay=0.01)
+
+    await asyncio.gather(*(batcher.write(request, i) for i in range(5)))
+
+    # Flushed once full, then after the delay
+    assert writes.batches == [[0, 1, 2], [3, 4]]
+    assert batcher.stats() == {"pending": 0, "batches": 2, "writes": 5, "retries": 0}
+
+
+async def test_write_batcher_conflict():
+    request = _request()
+    writes = FakeWrites(existing=[1])
+    batcher = _batcher(writes, max_size=10, delay=0.01)
+
+    results = await asyncio.gather(
+        *(batcher.write(request, i) for i in range(3)), return_exceptions=True
+    )
+
+    # The writes of the failed batch are retried one by one
+    assert results[0] is None
+    assert isinstance(results[1], ConflictError)
+    assert results[2] is None
+    assert writes.batches == [[0], [2]]
+    assert batcher.stats()["retries"] == 3
+
+    with pytest.raises(ConflictError):
+        await batcher.write(request, 1)
+
+
+async def test_write_batcher_cancel():
+    request = _request()
+    writes = FakeWrites()
+    batcher = _batcher(writes, max_size=10, delay=0.01)
+
+    cancelled = asyncio.ensure_future(batcher.write(request, 0))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    await batcher.write(request, 1)
+    assert writes.batches == [[1]]
+
+
+def test_get_write_batcher():
+    assert get_write_batcher(_request().app) is None
+
+    app = _request(write_batch_size=50, write_batch_delay=0.1).app
+    batcher = get_write_batcher(app)
+    assert batcher is not None
+    assert (batcher.max_size, batcher.delay) == (50, 0.1)
+    assert get_write_batcher(app) is batcher
@@ -0,0 +1,374 @@
+"""test caches."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+from fastapi import FastAPI
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+from stac_fastapi.pgstac.cache import (
+    LRUCache,
+    SearchCache,
+    SingleFlight,
+    get_cache_generations,
+    get_collection_cache,
+    get_search_cache,
+    get_search_flights,
+    invalidate_collection,
+    invalidate_items,
+)
+from stac_fastapi.pgstac.config import Settings
+from stac_fastapi.pgstac.core import CoreCrudClient
+from stac_fastapi.pgstac.middleware import CacheStatusMiddleware
+from stac_fastapi.pgstac.types.base_item_cache import LRUBaseItemCache
+from stac_fastapi.pgstac.utils import FieldsProjection
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    # `b` is the least recently used entry
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1}
+
+    cache.pop("a")
+    assert cache.get("a", "default") == "default"
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_ttl(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled():
+    cache = LRUCache(maxsize=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+async def test_lru_base_item_cache():
+    app = FastAPI()
+    app.state.settings = Settings(base_item_cache=LRUBaseItemCache)
+    request = Request({"type": "http", "app": app})
+
+    calls = []
+
+    async def fetch_base_item(collection_id: str):
+        calls.append(collection_id)
+        return {"collection": collection_id}
+
+    cache = LRUBaseItemCache(fetch_base_item=fetch_base_item, request=request)
+    assert await cache.get("a") == {"collection": "a"}
+    assert await cache.get("a") == {"collection": "a"}
+    assert calls == ["a"]
+
+    # The cache is shared by all the requests
+    other = LRUBaseItemCache(fetch_base_item=fetch_base_item, request=request)
+    assert await other.get("a") == {"collection": "a"}
+    assert calls == ["a"]
+    assert app.state.base_item_store.hits == 2
+    assert app.state.base_item_store.misses == 1
+
+    invalidate_collection(request, "a")
+    assert await other.get("a") == {"collection": "a"}
+    assert calls == ["a", "a"]
+
+
+async def test_lru_base_item_cache_write_during_fetch():
+    app = FastAPI()
+    app.state.settings = Settings(base_item_cache=LRUBaseItemCache)
+    request = Request({"type": "http", "app": app})
+
+    async def fetch_base_item(collection_id: str):
+        # The collection is written while its base item is read
+        invalidate_collection(request, collection_id)
+        return {"collection": collection_id}
+
+    cache = LRUBaseItemCache(fetch_base_item=fetch_base_item, request=request)
+    assert await cache.get("a") == {"collection": "a"}
+    assert "a" not in app.state.base_item_store
+
+
+async def test_hydrate_items_shared_base_item():
+    app = FastAPI()
+    app.state.settings = Settings(base_item_cache=LRUBaseItemCache)
+    request = Request({"type": "http", "app": app})
+
+    async def fetch_base_item(collection_id: str):
+        return {"assets": {"thumbnail": {"title": "Thumbnail", "type": "image/png"}}}
+
+    client = CoreCrudClient()
+    cache = LRUBaseItemCache(fetch_base_item=fetch_base_item, request=request)
+    items = [
+        {"id": item_id, "collection": "a", "assets": {"data": {"href": item_id}}}
+        for item_id in ("1", "2")
+    ]
+    fields = FieldsProjection(exclude={"assets.thumbnail.title"})
+
+    # Filtering the hydrated items doesn't modify the cached base item
+    for _ in range(2):
+        hydrated = await client._hydrate_items(items, request, cache)
+        assert [fields.apply(item)["assets"]["thumbnail"] for item in hydrated] == [
+            {"type": "image/png"}
+        ] * 2
+        assert app.state.base_item_store.peek("a")["assets"]["thumbnail"] == {
+            "title": "Thumbnail",
+            "type": "image/png",
+        }
+
+
+async def test_fetch_collection_write_during_fetch():
+    app = FastAPI()
+    app.state.settings = Settings(collection_cache_size=10)
+    request = Request({"type": "http", "app": app})
+
+    class Connection:
+        async def fetchval(self, sql, *args):
+            # The collection is written while it is read
+            invalidate_collection(request, "a")
+            return {"id": "a", "type": "Collection"}
+
+    @asynccontextmanager
+    async def get_connection(request, readwrite="r"):
+        yield Connection()
+
+    app.state.get_connection = get_connection
+    client = CoreCrudClient()
+    assert await client._fetch_collection("a", request=request) == {
+        "id": "a",
+        "type": "Collection",
+    }
+    assert "a" not in get_collection_cache(app)
+
+
+def test_search_cache_key():
+    key = SearchCache.key("http://stac.io/", '{"filter": {"op": "=", "args": [1, 2]}}')
+    assert key == SearchCache.key(
+        "http://stac.io/", '{"filter": {"args": [1, 2], "op": "="}}'
+    )
+    assert key != SearchCache.key(
+        "http://stac.io/", '{"filter": {"op": "=", "args": [2, 1]}}'
+    )
+    assert key != SearchCache.key(
+        "http://other.io/", '{"filter": {"op": "=", "args": [1, 2]}}'
+    )
+
+
+def test_search_cache():
+    cache = SearchCache(maxsize=10)
+
+    tags = cache.tags(["b", "a", "b"])
+    assert tags == ("a", "b")
+    cache.set("a-b", {"features": []}, tags, cache.generation(tags))
+
+    all_tags = cache.tags(None)
+    assert all_tags == (None,)
+    cache.set("all", {"features": []}, all_tags, cache.generation(all_tags))
+
+    # Each hit returns a new copy
+    value = cache.get("a-b")
+    assert value == {"features": []}
+    value["features"].append({"id": "item"})
+    assert cache.get("a-b") == {"features": []}
+
+    # A write to a collection invalidates its searches and the cross-collection ones
+    cache.invalidate("c")
+    assert cache.get("a-b") == {"features": []}
+    assert cache.get("all") is None
+
+    # A result read before an invalidation is not cached
+    assert "a-b" in cache
+    generation = cache.generation(tags)
+    cache.invalidate("a")
+    assert "a-b" not in cache
+    cache.set("a-b", {"features": ["stale"]}, tags, generation)
+    assert "a-b" not in cache
+    assert cache.get("a-b") is None
+
+    assert cache.stats() == {"size": 0, "maxsize": 10, "hits": 3, "misses": 2}
+
+
+def test_search_cache_invalidation():
+    app = FastAPI()
+    app.state.settings = Settings()
+    assert get_search_cache(app) is None
+
+    app.state.settings = Settings(search_cache_size=10)
+    request = Request({"type": "http", "app": app})
+    cache = get_search_cache(app)
+    assert cache is get_search_cache(app)
+
+    tags = cache.tags(["a"])
+    cache.set("a", {}, tags, cache.generation(tags))
+    invalidate_items(request, "b")
+    assert cache.get("a") == {}
+    invalidate_items(request, "a")
+    assert cache.get("a") is None
+
+    # The generations are shared with the other caches of the application
+    generations = get_cache_generations(app)
+    assert cache.generations is generations
+    assert generations.get(("a", "b", None)) == (1, 1, 2)
+
+
+def test_cache_status_middleware():
+    app = FastAPI()
+    app.add_middleware(CacheStatusMiddleware)
+
+    @app.get("/cached/{status}")
+    def cached(status: str, request: Request):
+        request.state.cache_status = status
+        return {}
+
+    @app.get("/not-cached")
+    def not_cached():
+        return {}
+
+    with TestClient(app) as client:
+        resp = client.get("/cached/hit")
+        assert resp.headers["cache-status"] == "stac-fastapi-pgstac; hit"
+
+        resp = client.get("/cached/miss")
+        assert resp.headers["cache-status"] == "stac-fastapi-pgstac; fwd=miss"
+
+        resp = client.get("/cached/stored")
+        assert resp.headers["cache-status"] == "stac-fastapi-pgstac; fwd=miss; stored"
+
+        resp = client.get("/not-cached")
+        assert "cache-status" not in resp.headers
+
+
+async def test_single_flight():
+    flights = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"features": []}
+
+    results = await asyncio.gather(*[flights.run("a", call) for _ in range(3)])
+    assert len(calls) == 1
+    assert flights.coalesced == 2
+    assert len(flights) == 0
+
+    # Each caller gets its own copy of a shared result
+    assert results == [{"features": []}] * 3
+    assert len({id(result) for result in results}) == 3
+
+    # Calls with other keys, or made once a call is done, are not coalesced
+    await asyncio.gather(flights.run("a", call), flights.run("b", call))
+    await flights.run("a", call)
+    assert len(calls) == 4
+
+
+async def test_single_flight_cancel():
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return 1
+
+    leader = asyncio.ensure_future(flights.run("a", call))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flights.run("a", call))
+    await asyncio.sleep(0)
+
+    # A cancelled caller doesn't cancel the call for the others
+    leader.cancel()
+    assert await follower == 1
+    assert leader.cancelled()
+
+
+async def test_single_flight_error():
+    flights = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ValueError("error")
+
+    results = await asyncio.gather(
+        flights.run("a", call), flights.run("a", call), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(flights) == 0
+
+
+def test_get_search_flights():
+    app = FastAPI()
+    app.state.settings = Settings()
+    assert get_search_flights(app) is None
+
+    app.state.settings = Settings(coalesce_searches=True)
+    assert get_search_flights(app) is get_search_flights(app)
+
+
+def test_collection_cache_invalidation():
+    app = FastAPI()
+    app.state.settings = Settings()
+    assert get_collection_cache(app) is None
+
+    app.state.settings = Settings(collection_cache_size=10)
+    request = Request({"type": "http", "app": app})
+    cache = get_collection_cache(app)
+    assert cache is get_collection_cache(app)
+
+    cache.set("a", {"id": "a"})
+    invalidate_items(request, "a")
+    assert cache.get("a") == {"id": "a"}
+    invalidate_collection(request, "a")
+    assert cache.get("a") is None
+
+
+async def test_single_flight_cancel_all():
+    flights = SingleFlight()
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def call():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.ensure_future(flights.run("a", call)) for _ in range(2)]
+    await started.wait()
+
+    # The call is cancelled once all its callers are
+    callers[0].cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    callers[1].cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(flights) == 0
+
+    # A new call can run with the same key
+    async def other_call():
+        return 2
+
+    assert await flights.run("a", other_call) == 2
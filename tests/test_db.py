@@ -0,0 +1,322 @@
+import asyncio
+import struct
+from contextlib import asynccontextmanager
+
+import attr
+import orjson
+import pytest
+from asyncpg import exceptions
+from fastapi import FastAPI, HTTPException
+from starlette.requests import Request
+
+from stac_fastapi.pgstac.config import Settings
+from stac_fastapi.pgstac.db import (
+    PoolAdmission,
+    ReadPools,
+    Replica,
+    cancel_on_disconnect,
+    copy_items,
+    statement_timeout,
+)
+
+
+@attr.s
+class FakePool:
+    """A connection pool whose connections are its name."""
+
+    name: str = attr.ib()
+    fail: bool = attr.ib(default=False)
+    acquired: int = attr.ib(default=0)
+
+    def acquire(self) -> "FakeAcquireContext":
+        return FakeAcquireContext(self)
+
+    async def release(self, conn):
+        self.acquired -= 1
+
+    async def close(self):
+        pass
+
+
+@attr.s
+class FakeAcquireContext:
+    """Like asyncpg's, can be awaited or used as a context manager."""
+
+    pool: FakePool = attr.ib()
+
+    async def _acquire(self):
+        if self.pool.fail:
+            raise OSError("connection refused")
+        self.pool.acquired += 1
+        return self.pool.name
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        return await self._acquire()
+
+    async def __aexit__(self, *args):
+        await self.pool.release(self.pool.name)
+
+
+def _read_pools(*replicas: FakePool, eject_time: float = 30) -> ReadPools:
+    return ReadPools(
+        replicas=[Replica(pool=pool) for pool in replicas],
+        primary=FakePool("primary"),
+        eject_time=eject_time,
+    )
+
+
+async def test_read_pools_least_outstanding():
+    replica1, replica2 = FakePool("replica1"), FakePool("replica2")
+    pools = _read_pools(replica1, replica2)
+
+    async with pools.acquire() as conn1:
+        async with pools.acquire() as conn2:
+            # The second connection goes to the other (idle) replica
+            assert {conn1, conn2} == {"replica1", "replica2"}
+            assert [r.outstanding for r in pools.replicas] == [1, 1]
+
+    assert [r.outstanding for r in pools.replicas] == [0, 0]
+    assert replica1.acquired == replica2.acquired == 0
+
+    # Ties are rotated
+    conns = []
+    for _ in range(4):
+        async with pools.acquire() as conn:
+            conns.append(conn)
+    assert sorted(conns) == ["replica1", "replica1", "replica2", "replica2"]
+
+
+async def test_read_pools_failover():
+    replica1, replica2 = FakePool("replica1", fail=True), FakePool("replica2")
+    pools = _read_pools(replica1, replica2)
+
+    conns = []
+    for _ in range(4):
+        async with pools.acquire() as conn:
+            conns.append(conn)
+
+    # The failing replica is ejected (after falling back to the primary once)
+    assert conns.count("replica1") == 0
+    assert conns.count("primary") == 1
+    assert not pools.replicas[0].healthy
+    assert pools.replicas[1].healthy
+
+    # Lost connections eject the replica
+    with pytest.raises(exceptions.ConnectionDoesNotExistError):
+        async with pools.acquire() as conn:
+            assert conn == "replica2"
+            raise exceptions.ConnectionDoesNotExistError("connection lost")
+
+    assert not pools.replicas[1].healthy
+    assert replica2.acquired == 0
+
+    # Without healthy replicas, connections come from the primary
+    async with pools.acquire() as conn:
+        assert conn == "primary"
+
+
+async def test_read_pools_eject_time():
+    replica = FakePool("replica", fail=True)
+    pools = _read_pools(replica, eject_time=0.05)
+
+    async with pools.acquire() as conn:
+        assert conn == "primary"
+    assert not pools.replicas[0].healthy
+
+    replica.fail = False
+    await asyncio.sleep(0.05)
+    assert pools.replicas[0].healthy
+    async with pools.acquire() as conn:
+        assert conn == "replica"
+
+
+async def test_read_pools_connect():
+    replica = FakePool("replica")
+    attempts = []
+
+    async def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("connection refused")
+        return replica
+
+    pools = ReadPools(
+        replicas=[Replica(connect=connect)],
+        primary=FakePool("primary"),
+        eject_time=0.05,
+    )
+
+    # An unreachable replica is ejected instead of failing the startup
+    await pools.connect()
+    assert not pools.replicas[0].healthy
+    assert pools.replicas[0].pool is None
+    async with pools.acquire() as conn:
+        assert conn == "primary"
+
+    # Its pool is created once it is no longer ejected
+    await asyncio.sleep(0.05)
+    async with pools.acquire() as conn:
+        assert conn == "replica"
+    assert pools.replicas[0].pool is replica
+    assert len(attempts) == 2
+
+    await pools.close()
+
+
+@attr.s
+class BoundedPool:
+    """A connection pool of `size` connections."""
+
+    size: int = attr.ib(default=1)
+    _semaphore: asyncio.Semaphore = attr.ib(init=False)
+
+    @_semaphore.default
+    def _create_semaphore(self):
+        return asyncio.Semaphore(self.size)
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._semaphore:
+            yield "conn"
+
+
+async def test_pool_admission_timeout():
+    admission = PoolAdmission(timeout=0.05, retry_after=2)
+    pool = BoundedPool(size=1)
+
+    async with admission.acquire(pool) as conn:
+        assert conn == "conn"
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with admission.acquire(pool):
+                pass
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "2"}
+
+    stats = admission.stats()
+    assert stats["waiting"] == 0
+    assert stats["acquired"] == 1
+    assert stats["timed_out"] == 1
+    assert stats["rejected"] == 0
+    assert stats["wait_time_max"] >= 0.05
+
+    # The pool is usable again
+    async with admission.acquire(pool) as conn:
+        assert conn == "conn"
+
+
+async def test_pool_admission_max_waiters():
+    admission = PoolAdmission(max_waiters=1)
+    pool = BoundedPool(size=1)
+    released = asyncio.Event()
+
+    async def _use_connection():
+        async with admission.acquire(pool):
+            await released.wait()
+
+    holder = asyncio.create_task(_use_connection())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(_use_connection())
+    await asyncio.sleep(0)
+    assert admission.waiting == 1
+
+    # Rejected without waiting
+    with pytest.raises(HTTPException) as exc_info:
+        async with admission.acquire(pool):
+            pass
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+    released.set()
+    await asyncio.gather(holder, waiter)
+
+    stats = admission.stats()
+    assert stats["waiting"] == 0
+    assert stats["acquired"] == 2
+    assert stats["rejected"] == 1
+
+
+def _request(receive=None, route_name: str | None = None, **settings) -> Request:
+    app = FastAPI()
+    app.state.settings = Settings(**settings)
+    scope = {"type": "http", "app": app}
+    if route_name:
+        scope["route"] = type("Route", (), {"name": route_name})()
+    return Request(scope, receive=receive)
+
+
+def test_statement_timeout():
+    assert statement_timeout(_request(route_name="Search")) is None
+
+    timeouts = {"Search": 30, "*": 5}
+    request = _request(route_name="Search", statement_timeouts=timeouts)
+    assert statement_timeout(request) == 30
+    request = _request(route_name="Get Item", statement_timeouts=timeouts)
+    assert statement_timeout(request) == 5
+
+    request = _request(route_name="Get Item", statement_timeouts={"Search": 30})
+    assert statement_timeout(request) is None
+
+
+async def test_cancel_on_disconnect():
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def query():
+        await asyncio.sleep(0.01)
+        return 1
+
+    assert await cancel_on_disconnect(_request(receive), query()) == 1
+
+    cancelled = asyncio.Event()
+
+    async def slow_query():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.ensure_future(cancel_on_disconnect(_request(receive), slow_query()))
+    await asyncio.sleep(0)
+    disconnect.set()
+
+    with pytest.raises(HTTPException) as exc_info:
+        await task
+    assert exc_info.value.status_code == 499
+    assert cancelled.is_set()
+
+
+async def test_copy_items():
+    copies = []
+
+    class Connection:
+        async def copy_to_table(self, table, source, columns, format):
+            copies.append((table, columns, format, b"".join([c async for c in source])))
+
+    items = [{"id": f"item-{i}", "properties": {"é": i}} for i in range(5)]
+    await copy_items(Connection(), "items_staging", items, chunk_size=2)
+
+    ((table, columns, format, data),) = copies
+    assert (table, columns, format) == ("items_staging", ["content"], "binary")
+
+    # Decode the binary COPY stream
+    assert data[:19] == b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+    offset, rows = 19, []
+    while (nfields := struct.unpack_from("!h", data, offset)[0]) != -1:
+        assert nfields == 1
+        (size,) = struct.unpack_from("!i", data, offset + 2)
+        value = data[offset + 6 : offset + 6 + size]
+        assert value[:1] == b"\x01"
+        rows.append(orjson.loads(value[1:]))
+        offset += 6 + size
+
+    assert offset + 2 == len(data)
+    assert rows == items
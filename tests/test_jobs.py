@@ -0,0 +1,149 @@
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from asyncpg import exceptions
+from fastapi import FastAPI, HTTPException, Request
+from stac_fastapi.extensions.bulk_transactions import BulkTransactionMethod
+
+from stac_fastapi.pgstac.jobs import JOBS_TABLE, Job, JobQueue, JobsUnavailableError
+from stac_fastapi.pgstac.queries import INSERT_JOB, UPDATE_JOB
+
+
+class FakeConnection:
+    """Record the jobs statements, failing the creation of existing items."""
+
+    def __init__(self, existing=(), privileged=True):
+        self.existing = set(existing)
+        self.privileged = privileged
+        self.created = []
+        self.executed = []
+        self.jobs = {}
+
+    async def execute(self, sql):
+        if not self.privileged:
+            raise exceptions.InsufficientPrivilegeError("permission denied for schema")
+        self.executed.append(sql)
+
+    async def fetchval(self, sql, *args):
+        if sql == INSERT_JOB.sql:
+            if JOBS_TABLE not in self.executed:
+                raise exceptions.UndefinedTableError("stac_fastapi_jobs")
+            params = dict(zip(INSERT_JOB.params, args, strict=True))
+            self.jobs[params["id"]] = {
+                "status": "accepted",
+                "total": params["total"],
+                "written": 0,
+                "failed": 0,
+                "errors": [],
+            }
+        elif sql == UPDATE_JOB.sql:
+            params = dict(zip(UPDATE_JOB.params, args, strict=True))
+            job = self.jobs[params["id"]]
+            job["status"] = params["status"]
+            job["written"] += params["written"]
+            job["failed"] += params["failed"]
+            job["errors"] += json.loads(params["errors"])
+        else:
+            # pgstac create_items/create_item calls
+            items = json.loads(args[0])
+            items = items if isinstance(items, list) else [items]
+            if any(item["id"] in self.existing for item in items):
+                raise exceptions.UniqueViolationError("duplicate key")
+            self.existing.update(item["id"] for item in items)
+            self.created.append([item["id"] for item in items])
+
+
+def _request(conn: FakeConnection) -> Request:
+    @asynccontextmanager
+    async def get_connection(request, readwrite="r"):
+        assert readwrite == "w"
+        yield conn
+
+    app = FastAPI()
+    app.state.get_connection = get_connection
+    return Request({"type": "http", "app": app})
+
+
+def _job(request: Request, *item_ids: str) -> Job:
+    return Job(
+        request=request,
+        collection_id="collection",
+        method=BulkTransactionMethod.INSERT,
+        items=[{"id": item_id} for item_id in item_ids],
+    )
+
+
+async def test_job_queue():
+    conn = FakeConnection(existing=["1"])
+    queue = JobQueue(batch_size=2)
+
+    job = _job(_request(conn), "0", "1", "2", "3", "4")
+    await queue.submit(job)
+    assert conn.jobs[job.id]["status"] == "accepted"
+
+    await queue._queue.join()
+    await queue.close()
+
+    assert conn.executed == [JOBS_TABLE]
+    # The items of the failed batch are written one by one
+    assert conn.created == [["0"], ["2", "3"], ["4"]]
+    state = conn.jobs[job.id]
+    assert state["status"] == "completed"
+    assert (state["total"], state["written"], state["failed"]) == (5, 4, 1)
+    assert [error["id"] for error in state["errors"]] == ["1"]
+    assert "duplicate key" in state["errors"][0]["error"]
+
+
+async def test_job_queue_full():
+    conn = FakeConnection()
+    queue = JobQueue(maxsize=1)
+    request = _request(conn)
+
+    await queue.submit(_job(request, "0"))
+    with pytest.raises(HTTPException) as err:
+        await queue.submit(_job(request, "1"))
+
+    assert err.value.status_code == 503
+    assert err.value.headers == {"Retry-After": "1"}
+
+    await queue._queue.join()
+    await queue.close()
+    assert len(conn.jobs) == 1
+    assert isinstance(next(iter(conn.jobs)), uuid.UUID)
+
+
+async def test_job_queue_full_concurrent():
+    conn = FakeConnection()
+    queue = JobQueue(maxsize=2)
+    request = _request(conn)
+
+    # The slots are reserved before the jobs are recorded
+    results = await asyncio.gather(
+        *(queue.submit(_job(request, str(i))) for i in range(4)),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if result is not None]
+    assert len(errors) == 2
+    assert all(
+        isinstance(error, HTTPException) and error.status_code == 503 for error in errors
+    )
+
+    await queue._queue.join()
+    await queue.close()
+    assert len(conn.jobs) == 2
+    assert {state["status"] for state in conn.jobs.values()} == {"completed"}
+
+
+async def test_job_queue_unavailable():
+    conn = FakeConnection(privileged=False)
+    queue = JobQueue()
+
+    with pytest.raises(JobsUnavailableError):
+        await queue.submit(_job(_request(conn), "0"))
+
+    await queue.close()
+    assert conn.jobs == {}
+    assert len(queue) == 0
@@ -0,0 +1,187 @@
+"""test middlewares."""
+
+import json
+from contextlib import asynccontextmanager
+
+from asyncpg import exceptions
+from fastapi import FastAPI, Request
+from starlette.testclient import TestClient
+
+from stac_fastapi.pgstac.middleware import IDEMPOTENCY_KEYS_TABLE, IdempotencyMiddleware
+from stac_fastapi.pgstac.queries import (
+    CLAIM_IDEMPOTENCY_KEY,
+    GET_IDEMPOTENCY_KEY,
+    RELEASE_IDEMPOTENCY_KEY,
+    STORE_IDEMPOTENCY_KEY,
+)
+
+
+class FakeConnection:
+    """Emulate the idempotency keys table."""
+
+    def __init__(self, privileged=True):
+        self.table = None
+        self.privileged = privileged
+
+    async def execute(self, sql):
+        assert sql == IDEMPOTENCY_KEYS_TABLE
+        if not self.privileged:
+            raise exceptions.InsufficientPrivilegeError("permission denied for schema")
+        self.table = {}
+
+    async def fetchrow(self, sql, *args):
+        if self.table is None:
+            raise exceptions.UndefinedTableError("stac_fastapi_idempotency_keys")
+
+        for query in (
+            CLAIM_IDEMPOTENCY_KEY,
+            GET_IDEMPOTENCY_KEY,
+            STORE_IDEMPOTENCY_KEY,
+            RELEASE_IDEMPOTENCY_KEY,
+        ):
+            if sql == query.sql:
+                params = dict(zip(query.params, args, strict=True))
+                break
+
+        ident = (params["key"], params["method"], params["path"])
+        if sql == CLAIM_IDEMPOTENCY_KEY.sql:
+            if ident in self.table:
+                return None
+            self.table[ident] = {"status_code": None}
+            return {"bool": True}
+        elif sql == GET_IDEMPOTENCY_KEY.sql:
+            return self.table.get(ident)
+        elif sql == STORE_IDEMPOTENCY_KEY.sql:
+            self.table[ident] = {
+                "request_hash": params["request_hash"],
+                "status_code": params["status_code"],
+                # Bound as JSON text, decoded by the jsonb codec
+                "headers": json.loads(params["headers"]),
+                "body": params["body"],
+            }
+        else:
+            self.table.pop(ident, None)
+
+        return None
+
+
+def _app(conn: FakeConnection) -> tuple[FastAPI, list]:
+    writes = []
+
+    @asynccontextmanager
+    async def get_connection(request, readwrite="r"):
+        assert readwrite == "w"
+        yield conn
+
+    app = FastAPI()
+    app.state.get_connection = get_connection
+    app.add_middleware(IdempotencyMiddleware)
+
+    @app.post("/collections/{collection_id}/items")
+    async def create_item(collection_id: str, request: Request):
+        item = await request.json()
+        writes.append(item["id"])
+        if item["id"] == "error":
+            raise RuntimeError("database error")
+        return {"id": item["id"], "writes": len(writes)}
+
+    @app.delete("/collections/{collection_id}/items/{item_id}")
+    async def delete_item(collection_id: str, item_id: str):
+        writes.append(item_id)
+        return {"deleted": item_id}
+
+    @app.post("/search")
+    async def search(request: Request):
+        writes.append("search")
+        return {"type": "FeatureCollection"}
+
+    return app, writes
+
+
+def test_idempotency_middleware():
+    conn = FakeConnection()
+    app, writes = _app(conn)
+
+    with TestClient(app) as client:
+        headers = {"Idempotency-Key": "key"}
+        resp = client.post("/collections/c/items", json={"id": "a"}, headers=headers)
+        assert resp.status_code == 200
+        assert resp.json() == {"id": "a", "writes": 1}
+        assert "idempotent-replayed" not in resp.headers
+        assert conn.table is not None
+
+        # Retries replay the recorded response, without writing the item again
+        resp = client.post("/collections/c/items", json={"id": "a"}, headers=headers)
+        assert resp.status_code == 200
+        assert resp.json() == {"id": "a", "writes": 1}
+        assert resp.headers["idempotent-replayed"] == "true"
+        assert resp.headers["content-type"] == "application/json"
+        assert writes == ["a"]
+
+        # The key was used for a different request body
+        resp = client.post("/collections/c/items", json={"id": "b"}, headers=headers)
+        assert resp.status_code == 422
+        assert writes == ["a"]
+
+        # Keys are scoped to the method and path of the request
+        resp = client.post("/collections/d/items", json={"id": "a"}, headers=headers)
+        assert resp.json() == {"id": "a", "writes": 2}
+
+        # The body is part of the request hash, even if not read by the endpoint
+        for _ in range(2):
+            resp = client.delete("/collections/c/items/a", headers=headers)
+            assert resp.json() == {"deleted": "a"}
+        assert writes == ["a", "a", "a"]
+
+        # Requests without a key, and searches, are not recorded
+        for _ in range(2):
+            client.post("/collections/c/items", json={"id": "c"})
+            client.post("/search", json={}, headers={"Idempotency-Key": "search"})
+        assert writes == ["a", "a", "a", "c", "search", "c", "search"]
+        assert len(conn.table) == 3
+
+
+def test_idempotency_middleware_in_progress():
+    conn = FakeConnection()
+    conn.table = {("key", "POST", "/collections/c/items"): {"status_code": None}}
+    app, writes = _app(conn)
+
+    with TestClient(app) as client:
+        resp = client.post(
+            "/collections/c/items", json={"id": "a"}, headers={"Idempotency-Key": "key"}
+        )
+        assert resp.status_code == 409
+        assert writes == []
+
+
+def test_idempotency_middleware_server_error():
+    conn = FakeConnection()
+    app, writes = _app(conn)
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        headers = {"Idempotency-Key": "key"}
+        for _ in range(2):
+            resp = client.post(
+                "/collections/c/items", json={"id": "error"}, headers=headers
+            )
+            assert resp.status_code == 500
+
+        # Server errors are not recorded, the request can be retried
+        assert writes == ["error", "error"]
+        assert conn.table == {}
+
+
+def test_idempotency_middleware_unavailable():
+    conn = FakeConnection(privileged=False)
+    app, writes = _app(conn)
+
+    with TestClient(app) as client:
+        headers = {"Idempotency-Key": "key"}
+        for _ in range(2):
+            resp = client.post("/collections/c/items", json={"id": "a"}, headers=headers)
+            assert resp.status_code == 200
+            assert "idempotent-replayed" not in resp.headers
+
+        # The requests are processed without the Idempotency-Key support
+        assert writes == ["a", "a"]
+        assert conn.table is None
@@ -0,0 +1,20 @@
+import pytest
+
+from stac_fastapi.pgstac.queries import GET_ITEM, Query
+
+
+def test_query_from_template():
+    query = Query.from_template(
+        "SELECT * FROM f(:b::text, :a::int, :b::text, 'x::text', :a_1);"
+    )
+    assert query.sql == "SELECT * FROM f($1::text, $2::int, $1::text, 'x::text', $3);"
+    assert query.params == ("b", "a", "a_1")
+    assert query.args(a=1, b="b", a_1=None) == ["b", 1, None]
+
+    with pytest.raises(KeyError):
+        query.args(a=1)
+
+
+def test_get_item_query():
+    assert GET_ITEM.params == ("base_item", "api_hydrate", "collection_id", "item_id")
+    assert ":" not in GET_ITEM.sql.replace("::", "")
@@ -85,3 +85,54 @@ def test_filter_fields(include, exclude, exp):
     )
     res = utils.filter_fields(source, include=include, exclude=exclude)
     assert res == utils.Item(**exp)
+
+
+def test_compile_fields_tree():
+    fields = {"a", "c.c1", "c.c2.x", "d.d1", "d", "e.e1.x", "e.e1"}
+    res = utils.compile_fields_tree(fields)
+    exp = {"a": None, "c": {"c1": None, "c2": {"x": None}}, "d": None, "e": {"e1": None}}
+    assert res == exp
+
+
+def test_include_fields_not_dict():
+    # A sub-key of a value which is not a dict includes the whole value
+    source = {"a": 0, "b": [0, 1], "c": {}}
+    res = utils.include_fields(source, fields={"a.a1", "b.b1", "c.c1"})
+    assert res == {"a": 0, "b": [0, 1], "c": {}}
+
+
+def test_fields_projection():
+    projection = utils.FieldsProjection(
+        include={"id", "collection", "properties"},
+        exclude={"properties.prop_1"},
+    )
+    items = [
+        utils.Item(
+            id=f"test_id_{i}",
+            collection="test_collection",
+            properties={"prop_1": i, "prop_2": i},
+            assets={},
+        )
+        for i in range(3)
+    ]
+    for i, item in enumerate(items):
+        res = projection.apply(item)
+        assert res == utils.Item(
+            id=f"test_id_{i}",
+            collection="test_collection",
+            properties={"prop_2": i},
+        )
+        assert res == utils.filter_fields(
+            item, include=projection.include, exclude=projection.exclude
+        )
+
+    assert utils.FieldsProjection().apply(items[0]) is items[0]
+
+
+async def test_iter_ndjson_lines():
+    async def chunks():
+        for chunk in (b'{"a": 1}\n{"b"', b": 2}\r\n\n", b'{"c":', b" 3}"):
+            yield chunk
+
+    lines = [line async for line in utils.iter_ndjson_lines(chunks())]
+    assert lines == [(1, b'{"a": 1}'), (2, b'{"b": 2}\r'), (4, b'{"c": 3}')]
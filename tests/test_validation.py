@@ -0,0 +1,198 @@
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import jsonschema
+import orjson
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from stac_fastapi.pgstac.config import Settings
+from stac_fastapi.pgstac.transactions import TransactionsClient
+from stac_fastapi.pgstac.validation import (
+    SchemaStore,
+    ValidatorRegistry,
+    close_validation_pool,
+    create_validator_registry,
+    get_validation_pool,
+    get_validator_registry,
+    shared_validator_registry,
+    validate_extensions_batch,
+)
+
+# The schema can't be fetched: the validation of the items using it fails
+UNREACHABLE_SCHEMA = "http://127.0.0.1:1/schema.json"
+
+
+SCHEMA_URL = "https://stac-extensions.example.com/test/v1.0.0/schema.json"
+DEFINITIONS_URL = "https://stac-extensions.example.com/test/v1.0.0/definitions.json"
+
+
+@pytest.fixture
+def schema_dir(tmp_path):
+    """Local schemas of a `test:value` extension, referencing another schema."""
+    directory = tmp_path / "stac-extensions.example.com" / "test" / "v1.0.0"
+    directory.mkdir(parents=True)
+    (directory / "schema.json").write_bytes(
+        orjson.dumps(
+            {
+                "$schema": "http://json-schema.org/draft-07/schema#",
+                "type": "object",
+                "required": ["properties"],
+                "properties": {
+                    "properties": {
+                        "type": "object",
+                        "required": ["test:value"],
+                        "properties": {
+                            "test:value": {"$ref": f"{DEFINITIONS_URL}#/$defs/value"}
+                        },
+                    }
+                },
+            }
+        )
+    )
+    (directory / "definitions.json").write_bytes(
+        orjson.dumps({"$defs": {"value": {"type": "integer"}}})
+    )
+    return tmp_path
+
+
+def _item(item_id: str, value) -> dict:
+    return {
+        "id": item_id,
+        "stac_extensions": [SCHEMA_URL],
+        "properties": {"test:value": value},
+    }
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+    app.state.settings = Settings(**kwargs)
+    return app
+
+
+async def test_validate_extensions_batch():
+    app = _app(validation_workers=2, validation_chunk_size=2)
+    items = [
+        {
+            "id": f"item-{i}",
+            "stac_extensions": [UNREACHABLE_SCHEMA] if i % 3 else [],
+        }
+        for i in range(7)
+    ]
+    try:
+        errors = await validate_extensions_batch(app, items)
+        assert get_validation_pool(app) is app.state.validation_pool
+    finally:
+        close_validation_pool(app)
+
+    assert [item_id for item_id, _ in errors] == [
+        "item-1",
+        "item-2",
+        "item-4",
+        "item-5",
+    ]
+    assert app.state.validation_pool is None
+
+
+async def test_validate_extensions_batch_in_process():
+    app = _app()
+    errors = await validate_extensions_batch(
+        app, [{"id": "item", "stac_extensions": [UNREACHABLE_SCHEMA]}]
+    )
+    assert [item_id for item_id, _ in errors] == ["item"]
+    assert get_validation_pool(app) is None
+
+
+def test_schema_store(schema_dir):
+    store = SchemaStore(directory=str(schema_dir), fetch=False)
+    assert store.load(SCHEMA_URL)["type"] == "object"
+    assert store.path("https://example.com/../../schema.json") is None
+
+    with pytest.raises(LookupError):
+        store.load("https://stac-extensions.example.com/missing/schema.json")
+
+
+def test_schema_store_fetch(schema_dir, tmp_path_factory):
+    handler = functools.partial(
+        SimpleHTTPRequestHandler,
+        directory=str(schema_dir / "stac-extensions.example.com"),
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        host = f"127.0.0.1:{server.server_address[1]}"
+        url = f"http://{host}/test/v1.0.0/schema.json"
+
+        cache_dir = tmp_path_factory.mktemp("schemas")
+        schema = SchemaStore(directory=str(cache_dir)).load(url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Fetched schemas are stored, to be loaded offline
+    assert (cache_dir / host / "test" / "v1.0.0" / "schema.json").is_file()
+    assert SchemaStore(directory=str(cache_dir), fetch=False).load(url) == schema
+
+
+def test_validator_registry(schema_dir):
+    registry = ValidatorRegistry(
+        store=SchemaStore(directory=str(schema_dir), fetch=False), maxsize=2
+    )
+
+    registry.validate(_item("valid", 1))
+    with pytest.raises(jsonschema.ValidationError):
+        # Invalid against the referenced schema
+        registry.validate(_item("invalid", "one"))
+
+    # The validator is compiled once
+    assert registry.validator(SCHEMA_URL) is registry.validator(SCHEMA_URL)
+    assert registry.stats()["size"] == 1
+    assert registry.stats()["misses"] == 1
+
+
+async def test_validate_extensions_batch_offline(schema_dir):
+    app = _app(
+        validation_workers=1,
+        validation_chunk_size=1,
+        validation_schema_dir=str(schema_dir),
+        validation_schema_fetch=False,
+    )
+    items = [_item("item-0", 0), _item("item-1", "one"), _item("item-2", 2)]
+    try:
+        errors = await validate_extensions_batch(app, items)
+    finally:
+        close_validation_pool(app)
+
+    assert [item_id for item_id, _ in errors] == ["item-1"]
+    assert "'one' is not of type 'integer'" in errors[0][1]
+
+    # Validated in the API process
+    errors = await validate_extensions_batch(app, items[:1])
+    assert errors == []
+    assert get_validator_registry(app).stats()["size"] == 1
+
+
+def test_transactions_validate_extensions(schema_dir):
+    client = TransactionsClient()
+    settings = Settings(
+        validate_extensions=True,
+        validation_schema_dir=str(schema_dir),
+        validation_schema_fetch=False,
+    )
+    registry = create_validator_registry(settings)
+
+    client._validate_extensions(_item("valid", 1), settings, registry=registry)
+    with pytest.raises(HTTPException) as excinfo:
+        client._validate_extensions(_item("invalid", "one"), settings, registry=registry)
+    assert excinfo.value.status_code == 422
+
+    # Without a registry, the one shared by the same settings is used
+    with pytest.raises(HTTPException):
+        client._validate_extensions(_item("invalid", "one"), settings)
+    registry = shared_validator_registry(settings)
+    assert registry is shared_validator_registry(settings.model_copy())
+    assert registry.stats()["size"] == 1
+
+    settings = Settings(validate_extensions=False)
+    client._validate_extensions(_item("invalid", "one"), settings)